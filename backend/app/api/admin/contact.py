@@ -126,4 +126,9 @@ async def update_static_contact_info(
         
         # Get the updated info
         updated_info = cursor.fetchone()
+        
+        # Clear cache
+        from app.utils.cache import cache
+        cache.delete_prefix("home_contact_info")
+        
         return dict(updated_info)
\ No newline at end of file
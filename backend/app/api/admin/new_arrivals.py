@@ -1,14 +1,17 @@
 # app/api/admin/new_arrivals.py
 import os
+import json
 from datetime import date
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile, File, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile, File, Query, status
 from app.auth.dependencies import get_current_admin
 from app.auth.router import AdminUser
 from app.config import settings
 from app.database import DatabaseConnection
 from app.models.schemas import NewArrival, NewArrivalCreate, NewArrivalUpdate
-from app.utils.image_handler import save_image, delete_image, get_image_url, check_image_permissions
+from app.utils.image_handler import save_image_with_variants, delete_image, discard_saved_image, get_image_url, check_image_permissions
+from app.utils.events import event_broadcaster
+from app.utils.jobs import enqueue_image_upload, image_state_for
 from app.utils.logging import log_info, log_error, log_warning
 
 router = APIRouter()
@@ -52,45 +55,65 @@ async def create_new_arrival(
     
     # Save image if provided
     image_url = None
+    image_variants = None
+    image_placeholder = None
+    image_colors = None
     if image:
         try:
-            # This will return Cloudinary URL if Cloudinary is enabled, or local filename
-            image_result = save_image(image, settings.NEW_ARRIVALS_DIR)
-            if settings.USE_CLOUDINARY:
-                image_url = image_result  # Cloudinary URL
-            else:
-                image_url = get_image_url(image_result, "new_arrivals")  # Local URL
+            # Returns the stored image URL, or a staged URL when it is uploaded in the background
+            image_result, image_variants, image_placeholder, image_colors = await save_image_with_variants(image, settings.NEW_ARRIVALS_DIR, "new_arrivals")
+            image_url = get_image_url(image_result, "new_arrivals")
             log_info(f"Saved new arrival image: {image_url}")
+        except HTTPException:
+            raise
         except Exception as e:
             log_error(f"Failed to save new arrival image: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
     
     # Create new arrival in database
-    with DatabaseConnection() as cursor:
-        cursor.execute(
-            """
-            INSERT INTO new_arrivals 
-            (name, description, release_date, image_url)
-            VALUES (%s, %s, %s, %s)
-            RETURNING *
-            """,
-            (
-                name,
-                description,
-                release_date,
-                image_url
+    try:
+        with DatabaseConnection() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO new_arrivals 
+                (name, description, release_date, image_url, image_variants, image_placeholder, image_colors, image_state)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING *
+                """,
+                (
+                    name,
+                    description,
+                    release_date,
+                    image_url,
+                    json.dumps(image_variants) if image_variants else None,
+                    json.dumps(image_placeholder) if image_placeholder else None,
+                    image_colors,
+                    image_state_for(image_url)
+                )
             )
-        )
         
-        # Get the created arrival
-        arrival = cursor.fetchone()
+            # Get the created arrival
+            arrival = cursor.fetchone()
+        
+            # Queue the remote storage upload in the same transaction
+            enqueue_image_upload(cursor, "new_arrivals", arrival["id"], image_url)
+        
+            # Clear cache
+            from app.utils.cache import cache
+            cache.delete_prefix("home_new_arrivals")
+            event_broadcaster.notify_change("new_arrivals", "insert", arrival["id"])
         
-        log_info(f"Successfully created new arrival with ID: {arrival['id']}")
-        return dict(arrival)
+            log_info(f"Successfully created new arrival with ID: {arrival['id']}")
+            return dict(arrival)
+    except BaseException:
+        # The record wasn't written, so drop the image saved for it
+        await discard_saved_image(image_url)
+        raise
 
 @router.put("/{arrival_id}", response_model=NewArrival)
 async def update_new_arrival(
     arrival_id: int,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     release_date: Optional[date] = Form(None),
@@ -99,78 +122,99 @@ async def update_new_arrival(
 ):
     log_info(f"Admin {current_user.username} updating new arrival ID: {arrival_id}")
     
-    # Check if arrival exists
-    with DatabaseConnection() as cursor:
-        cursor.execute("SELECT * FROM new_arrivals WHERE id = %s", (arrival_id,))
-        existing_arrival = cursor.fetchone()
+    saved_image_url = None  # a new image saved for this update
+    try:
+        # Check if arrival exists
+        with DatabaseConnection() as cursor:
+            cursor.execute("SELECT * FROM new_arrivals WHERE id = %s", (arrival_id,))
+            existing_arrival = cursor.fetchone()
         
-        if not existing_arrival:
-            log_warning(f"New arrival not found for update: ID {arrival_id}")
-            raise HTTPException(status_code=404, detail="New arrival not found")
+            if not existing_arrival:
+                log_warning(f"New arrival not found for update: ID {arrival_id}")
+                raise HTTPException(status_code=404, detail="New arrival not found")
         
-        # Convert to dict for easier access
-        existing_arrival_dict = dict(existing_arrival)
+            # Convert to dict for easier access
+            existing_arrival_dict = dict(existing_arrival)
         
-        # Handle image update
-        image_url = existing_arrival_dict["image_url"]
-        if image:
-            # Delete old image if exists
-            if existing_arrival_dict["image_url"]:
-                delete_result = delete_image(existing_arrival_dict["image_url"], settings.NEW_ARRIVALS_DIR)
-                log_info(f"Old image deletion result: {delete_result}")
-            
-            # Save new image
-            try:
-                image_result = save_image(image, settings.NEW_ARRIVALS_DIR)
-                if settings.USE_CLOUDINARY:
-                    image_url = image_result  # Cloudinary URL
-                else:
-                    image_url = get_image_url(image_result, "new_arrivals")  # Local URL
-                log_info(f"Updated new arrival image: {image_url}")
-            except Exception as e:
-                log_error(f"Failed to save updated image: {e}")
-                raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+            # Handle image update
+            image_url = existing_arrival_dict["image_url"]
+            if image:
+                # Save new image
+                try:
+                    image_result, image_variants, image_placeholder, image_colors = await save_image_with_variants(image, settings.NEW_ARRIVALS_DIR, "new_arrivals")
+                    image_url = get_image_url(image_result, "new_arrivals")
+                    saved_image_url = image_url
+                    log_info(f"Updated new arrival image: {image_url}")
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    log_error(f"Failed to save updated image: {e}")
+                    raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
         
-        # Build update query dynamically based on provided fields
-        update_fields = []
-        params = []
+            # Build update query dynamically based on provided fields
+            update_fields = []
+            params = []
         
-        if name:
-            update_fields.append("name = %s")
-            params.append(name)
-        if description:
-            update_fields.append("description = %s")
-            params.append(description)
-        if release_date:
-            update_fields.append("release_date = %s")
-            params.append(release_date)
-        if image:
-            update_fields.append("image_url = %s")
-            params.append(image_url)
+            if name:
+                update_fields.append("name = %s")
+                params.append(name)
+            if description:
+                update_fields.append("description = %s")
+                params.append(description)
+            if release_date:
+                update_fields.append("release_date = %s")
+                params.append(release_date)
+            if image:
+                update_fields.append("image_url = %s")
+                params.append(image_url)
+                update_fields.append("image_variants = %s")
+                params.append(json.dumps(image_variants) if image_variants else None)
+                update_fields.append("image_placeholder = %s")
+                params.append(json.dumps(image_placeholder) if image_placeholder else None)
+                update_fields.append("image_colors = %s")
+                params.append(image_colors)
+                update_fields.append("image_state = %s")
+                params.append(image_state_for(image_url))
         
-        if not update_fields:
-            # No fields to update
-            return existing_arrival_dict
+            if not update_fields:
+                # No fields to update
+                return existing_arrival_dict
         
-        # Add arrival_id to params for WHERE clause
-        params.append(arrival_id)
+            # Add arrival_id to params for WHERE clause
+            params.append(arrival_id)
         
-        # Execute update query
-        cursor.execute(
-            f"""
-            UPDATE new_arrivals 
-            SET {', '.join(update_fields)}
-            WHERE id = %s
-            RETURNING *
-            """,
-            tuple(params)
-        )
+            # Execute update query
+            cursor.execute(
+                f"""
+                UPDATE new_arrivals 
+                SET {', '.join(update_fields)}
+                WHERE id = %s
+                RETURNING *
+                """,
+                tuple(params)
+            )
         
-        # Get updated arrival
-        updated_arrival = cursor.fetchone()
+            # Get updated arrival
+            updated_arrival = cursor.fetchone()
         
-        log_info(f"Successfully updated new arrival ID: {arrival_id}")
-        return dict(updated_arrival)
+            if image:
+                enqueue_image_upload(cursor, "new_arrivals", arrival_id, image_url)
+                # The replaced image is released only once the update has
+                # committed, so a failed write keeps the record's image intact
+                if existing_arrival_dict["image_url"]:
+                    background_tasks.add_task(delete_image, existing_arrival_dict["image_url"], settings.NEW_ARRIVALS_DIR)
+        
+            # Clear cache
+            from app.utils.cache import cache
+            cache.delete_prefix("home_new_arrivals")
+            event_broadcaster.notify_change("new_arrivals", "update", arrival_id)
+        
+            log_info(f"Successfully updated new arrival ID: {arrival_id}")
+            return dict(updated_arrival)
+    except BaseException:
+        # The record wasn't written, so drop the image saved for it
+        await discard_saved_image(saved_image_url)
+        raise
 
 @router.delete("/{arrival_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_new_arrival(
@@ -206,15 +250,10 @@ async def delete_new_arrival(
                 try:
                     log_info(f"Attempting to delete image: {image_url}")
                     
-                    # Check if using Cloudinary
-                    if settings.USE_CLOUDINARY:
-                        log_info("Using Cloudinary for image deletion")
-                    else:
-                        # Check directory permissions for local storage
-                        permissions = check_image_permissions(settings.NEW_ARRIVALS_DIR)
-                        log_info(f"Local storage permissions: {permissions}")
+                    permissions = check_image_permissions(settings.NEW_ARRIVALS_DIR)
+                    log_info(f"Image storage permissions: {permissions}")
                     
-                    image_deleted = delete_image(image_url, settings.NEW_ARRIVALS_DIR)
+                    image_deleted = await delete_image(image_url, settings.NEW_ARRIVALS_DIR)
                     log_info(f"Image deletion result: {image_deleted}")
                     
                 except Exception as img_error:
@@ -248,6 +287,9 @@ async def delete_new_arrival(
                 
                 # Commit the transaction
                 cursor.execute("COMMIT")
+                from app.utils.cache import cache
+                cache.delete_prefix("home_new_arrivals")
+                event_broadcaster.notify_change("new_arrivals", "delete", arrival_id)
                 log_info(f"Successfully deleted new arrival from database: ID {arrival_id}")
                 
                 # Log the final result
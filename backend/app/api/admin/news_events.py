@@ -1,12 +1,15 @@
 # app/api/admin/news_events.py
-from datetime import date
+from datetime import date, datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Form, HTTPException, Query, status
 from app.auth.dependencies import get_current_admin
 from app.auth.router import AdminUser
 from app.database import DatabaseConnection
 from app.models.schemas import NewsEvent, NewsEventCreate, NewsEventUpdate, NewsEventType
+from app.utils.events import event_broadcaster
 from app.utils.logging import log_info, log_error, log_warning
+from app.utils.news_cache import invalidate_news
+from app.utils.news_schedule import news_scheduler, schedule_time
 
 router = APIRouter()
 
@@ -55,28 +58,38 @@ async def create_news_event(
     date: date = Form(...),
     end_date: Optional[date] = Form(None),
     highlighted: bool = Form(False),
+    publish_at: Optional[datetime] = Form(None),
+    unpublish_at: Optional[datetime] = Form(None),
     current_user: AdminUser = Depends(get_current_admin)
 ):
     log_info(f"Admin {current_user.username} creating news event: {title}")
+    publish_at, unpublish_at = schedule_time(publish_at), schedule_time(unpublish_at)
     
     # Validate dates if end_date is provided
     if end_date and end_date < date:
         raise HTTPException(status_code=400, detail="End date cannot be before start date")
+    if publish_at and unpublish_at and unpublish_at <= publish_at:
+        raise HTTPException(status_code=400, detail="Unpublish time must be after publish time")
     
     with DatabaseConnection() as cursor:
         cursor.execute(
             """
             INSERT INTO news_events 
-            (title, type, content, date, end_date, highlighted)
-            VALUES (%s, %s, %s, %s, %s, %s)
+            (title, type, content, date, end_date, highlighted, publish_at, unpublish_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING *
             """,
-            (title, type, content, date, end_date, highlighted)
+            (title, type, content, date, end_date, highlighted, publish_at, unpublish_at)
         )
         
         # Get the created news/event
         news_event = cursor.fetchone()
         
+        # Clear cache and pick up its publication schedule
+        invalidate_news()
+        news_scheduler.reschedule()
+        event_broadcaster.notify_change("news_events", "insert", news_event["id"])
+        
         log_info(f"Successfully created news event with ID: {news_event['id']}")
         return dict(news_event)
 
@@ -89,9 +102,13 @@ async def update_news_event(
     date: Optional[date] = Form(None),
     end_date: Optional[date] = Form(None),
     highlighted: Optional[bool] = Form(None),
+    publish_at: Optional[datetime] = Form(None),
+    unpublish_at: Optional[datetime] = Form(None),
+    clear_schedule: bool = Form(False, description="Remove publish_at/unpublish_at before applying the values given"),
     current_user: AdminUser = Depends(get_current_admin)
 ):
     log_info(f"Admin {current_user.username} updating news event ID: {news_event_id}")
+    publish_at, unpublish_at = schedule_time(publish_at), schedule_time(unpublish_at)
     
     # Check if news/event exists
     with DatabaseConnection() as cursor:
@@ -112,6 +129,13 @@ async def update_news_event(
         if check_end_date and check_date and check_end_date < check_date:
             raise HTTPException(status_code=400, detail="End date cannot be before start date")
         
+        # Same for the publication schedule
+        check_publish_at = publish_at if publish_at is not None or clear_schedule else existing_dict["publish_at"]
+        check_unpublish_at = unpublish_at if unpublish_at is not None or clear_schedule else existing_dict["unpublish_at"]
+        
+        if check_publish_at and check_unpublish_at and check_unpublish_at <= check_publish_at:
+            raise HTTPException(status_code=400, detail="Unpublish time must be after publish time")
+        
         # Build update query dynamically based on provided fields
         update_fields = []
         params = []
@@ -138,6 +162,13 @@ async def update_news_event(
             update_fields.append("highlighted = %s")
             params.append(highlighted)
         
+        if publish_at is not None or clear_schedule:
+            update_fields.append("publish_at = %s")
+            params.append(publish_at)
+        if unpublish_at is not None or clear_schedule:
+            update_fields.append("unpublish_at = %s")
+            params.append(unpublish_at)
+        
         if not update_fields:
             # No fields to update
             return existing_dict
@@ -159,6 +190,11 @@ async def update_news_event(
         # Get updated news/event
         updated_news_event = cursor.fetchone()
         
+        # Clear cache and pick up any schedule change
+        invalidate_news()
+        news_scheduler.reschedule()
+        event_broadcaster.notify_change("news_events", "update", news_event_id)
+        
         log_info(f"Successfully updated news event ID: {news_event_id}")
         return dict(updated_news_event)
 
@@ -210,6 +246,9 @@ async def delete_news_event(
                 
                 # Commit the transaction
                 cursor.execute("COMMIT")
+                invalidate_news()
+                news_scheduler.reschedule()
+                event_broadcaster.notify_change("news_events", "delete", news_event_id)
                 log_info(f"Successfully deleted news event from database: ID {news_event_id}")
                 
                 # Log the final result
@@ -263,6 +302,9 @@ async def debug_news_event(
                     "date": str(news_event_dict.get("date")),
                     "end_date": str(news_event_dict.get("end_date")) if news_event_dict.get("end_date") else None,
                     "highlighted": news_event_dict.get("highlighted"),
+                    "published": news_event_dict.get("published"),
+                    "publish_at": str(news_event_dict.get("publish_at")) if news_event_dict.get("publish_at") else None,
+                    "unpublish_at": str(news_event_dict.get("unpublish_at")) if news_event_dict.get("unpublish_at") else None,
                     "created_at": str(news_event_dict.get("created_at"))
                 }
             else:
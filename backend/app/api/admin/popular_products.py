@@ -2,14 +2,18 @@
 import os
 import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile, File, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile, File, Query, status
 from app.auth.dependencies import get_current_admin
 from app.auth.router import AdminUser
 from app.config import settings
 from app.database import DatabaseConnection, get_connection
 from app.models.schemas import PopularProduct, PopularProductCreate, PopularProductUpdate
-from app.utils.image_handler import save_image, delete_image, get_image_url, check_image_permissions
+from app.utils.image_handler import save_image_with_variants, delete_image, discard_saved_image, get_image_url, check_image_permissions
+from app.utils.cache import cache
+from app.utils.events import event_broadcaster
+from app.utils.jobs import enqueue_image_upload, image_state_for
 from app.utils.logging import log_info, log_error, log_warning
+from app.utils.product_cache import invalidate_item
 
 router = APIRouter()
 
@@ -58,6 +62,7 @@ async def get_all_popular_products(
 
 @router.post("/", response_model=PopularProduct, status_code=status.HTTP_201_CREATED)
 async def create_popular_product(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     type: str = Form(...),
     description: str = Form(...),
@@ -78,66 +83,80 @@ async def create_popular_product(
     
     # Save image if provided
     image_url = None
+    image_variants = None
+    image_placeholder = None
+    image_colors = None
     if image:
         try:
-            # This will return Cloudinary URL if Cloudinary is enabled, or local filename
-            image_result = save_image(image, settings.POPULAR_PRODUCTS_DIR)
-            if settings.USE_CLOUDINARY:
-                image_url = image_result  # Cloudinary URL
-            else:
-                image_url = get_image_url(image_result, "popular_products")  # Local URL
+            # Returns the stored image URL, or a staged URL when it is uploaded in the background
+            image_result, image_variants, image_placeholder, image_colors = await save_image_with_variants(image, settings.POPULAR_PRODUCTS_DIR, "popular_products")
+            image_url = get_image_url(image_result, "popular_products")
             log_info(f"Saved popular product image: {image_url}")
+        except HTTPException:
+            raise
         except Exception as e:
             log_error(f"Failed to save popular product image: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
     
     # Create product in database
-    with DatabaseConnection() as cursor:
-        cursor.execute(
-            """
-            INSERT INTO popular_products 
-            (name, type, description, features, rating, image_url)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING *
-            """,
-            (
-                name,
-                type,
-                description,
-                json.dumps(features_list),
-                rating,
-                image_url
+    try:
+        with DatabaseConnection() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO popular_products 
+                (name, type, description, features, rating, image_url, image_variants, image_placeholder, image_colors, image_state)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING *
+                """,
+                (
+                    name,
+                    type,
+                    description,
+                    json.dumps(features_list),
+                    rating,
+                    image_url,
+                    json.dumps(image_variants) if image_variants else None,
+                    json.dumps(image_placeholder) if image_placeholder else None,
+                    image_colors,
+                    image_state_for(image_url)
+                )
             )
-        )
         
-        # Get the created product
-        product = cursor.fetchone()
+            # Get the created product
+            product = cursor.fetchone()
         
-        # Convert psycopg2.extras.RealDictRow to dictionary
-        product_dict = dict(product)
+            # Queue the remote storage upload in the same transaction
+            enqueue_image_upload(cursor, "popular_products", product["id"], image_url)
+        
+            # Convert psycopg2.extras.RealDictRow to dictionary
+            product_dict = dict(product)
         
-        # Convert features from JSON string to list
-        if product_dict["features"]:
-            if isinstance(product_dict["features"], str):
-                product_dict["features"] = json.loads(product_dict["features"])
-            elif not isinstance(product_dict["features"], list):
+            # Convert features from JSON string to list
+            if product_dict["features"]:
+                if isinstance(product_dict["features"], str):
+                    product_dict["features"] = json.loads(product_dict["features"])
+                elif not isinstance(product_dict["features"], list):
+                    product_dict["features"] = []
+            else:
                 product_dict["features"] = []
-        else:
-            product_dict["features"] = []
         
-        # Clear cache
-        from app.utils.cache import cache
-        cache_keys = list(cache.cache.keys())
-        for key in cache_keys:
-            if "popular" in key:
-                cache.delete(key)
+            # Clear cache once committed, so a concurrent read can't cache
+            # pre-commit data again
+            background_tasks.add_task(invalidate_item, "popular_product", product_dict["id"])
+            background_tasks.add_task(cache.delete_prefix, "home_popular_products")
+            background_tasks.add_task(event_broadcaster.notify_change, "popular_products", "insert", product_dict["id"])
         
-        log_info(f"Successfully created popular product with ID: {product_dict['id']}")
-        return product_dict
+            log_info(f"Successfully created popular product with ID: {product_dict['id']}")
+            return product_dict
+    except BaseException:
+        # The record wasn't written, so drop the image saved for it
+        await discard_saved_image(image_url)
+        raise
 
 @router.put("/{product_id}", response_model=PopularProduct)
 async def update_popular_product(
     product_id: int,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = Form(None),
     type: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
@@ -148,118 +167,129 @@ async def update_popular_product(
 ):
     log_info(f"Admin {current_user.username} updating popular product ID: {product_id}")
     
-    # Check if product exists
-    with DatabaseConnection() as cursor:
-        cursor.execute("SELECT * FROM popular_products WHERE id = %s", (product_id,))
-        existing_product = cursor.fetchone()
+    saved_image_url = None  # a new image saved for this update
+    try:
+        # Check if product exists
+        with DatabaseConnection() as cursor:
+            cursor.execute("SELECT * FROM popular_products WHERE id = %s", (product_id,))
+            existing_product = cursor.fetchone()
         
-        if not existing_product:
-            log_warning(f"Popular product not found for update: ID {product_id}")
-            raise HTTPException(status_code=404, detail="Popular product not found")
+            if not existing_product:
+                log_warning(f"Popular product not found for update: ID {product_id}")
+                raise HTTPException(status_code=404, detail="Popular product not found")
         
-        # Process features if provided
-        features_json = None
-        if features:
-            try:
-                features_list = json.loads(features)
-                if not isinstance(features_list, list):
-                    raise ValueError("Features must be a list")
-                features_json = json.dumps(features_list)
-            except Exception:
-                raise HTTPException(status_code=400, detail="Invalid features format")
+            # Process features if provided
+            features_json = None
+            if features:
+                try:
+                    features_list = json.loads(features)
+                    if not isinstance(features_list, list):
+                        raise ValueError("Features must be a list")
+                    features_json = json.dumps(features_list)
+                except Exception:
+                    raise HTTPException(status_code=400, detail="Invalid features format")
         
-        # Convert existing_product to dict for easier access
-        existing_product_dict = dict(existing_product)
+            # Convert existing_product to dict for easier access
+            existing_product_dict = dict(existing_product)
         
-        # Handle image update
-        image_url = existing_product_dict["image_url"]
-        if image:
-            # Delete old image if exists
-            if existing_product_dict["image_url"]:
-                if settings.USE_CLOUDINARY and "cloudinary" in existing_product_dict["image_url"]:
-                    from app.utils.cloudinary_handler import delete_from_cloudinary
-                    delete_result = delete_from_cloudinary(existing_product_dict["image_url"])
-                else:
-                    delete_result = delete_image(existing_product_dict["image_url"], settings.POPULAR_PRODUCTS_DIR)
-                log_info(f"Old image deletion result: {delete_result}")
-            
-            # Save new image
-            try:
-                image_result = save_image(image, settings.POPULAR_PRODUCTS_DIR)
-                if settings.USE_CLOUDINARY:
-                    image_url = image_result  # Cloudinary URL
-                else:
-                    image_url = get_image_url(image_result, "popular_products")  # Local URL
-                log_info(f"Updated popular product image: {image_url}")
-            except Exception as e:
-                log_error(f"Failed to save updated image: {e}")
-                raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+            # Handle image update
+            image_url = existing_product_dict["image_url"]
+            if image:
+                # Save new image
+                try:
+                    image_result, image_variants, image_placeholder, image_colors = await save_image_with_variants(image, settings.POPULAR_PRODUCTS_DIR, "popular_products")
+                    image_url = get_image_url(image_result, "popular_products")
+                    saved_image_url = image_url
+                    log_info(f"Updated popular product image: {image_url}")
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    log_error(f"Failed to save updated image: {e}")
+                    raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
         
-        # Build update query dynamically based on provided fields
-        update_fields = []
-        params = []
+            # Build update query dynamically based on provided fields
+            update_fields = []
+            params = []
         
-        if name:
-            update_fields.append("name = %s")
-            params.append(name)
-        if type:
-            update_fields.append("type = %s")
-            params.append(type)
-        if description is not None:  # Allow empty description
-            update_fields.append("description = %s")
-            params.append(description)
-        if features_json:
-            update_fields.append("features = %s")
-            params.append(features_json)
-        if rating is not None:
-            update_fields.append("rating = %s")
-            params.append(rating)
-        if image:
-            update_fields.append("image_url = %s")
-            params.append(image_url)
+            if name:
+                update_fields.append("name = %s")
+                params.append(name)
+            if type:
+                update_fields.append("type = %s")
+                params.append(type)
+            if description is not None:  # Allow empty description
+                update_fields.append("description = %s")
+                params.append(description)
+            if features_json:
+                update_fields.append("features = %s")
+                params.append(features_json)
+            if rating is not None:
+                update_fields.append("rating = %s")
+                params.append(rating)
+            if image:
+                update_fields.append("image_url = %s")
+                params.append(image_url)
+                update_fields.append("image_variants = %s")
+                params.append(json.dumps(image_variants) if image_variants else None)
+                update_fields.append("image_placeholder = %s")
+                params.append(json.dumps(image_placeholder) if image_placeholder else None)
+                update_fields.append("image_colors = %s")
+                params.append(image_colors)
+                update_fields.append("image_state = %s")
+                params.append(image_state_for(image_url))
         
-        if not update_fields:
-            # No fields to update
-            return existing_product_dict
+            if not update_fields:
+                # No fields to update
+                return existing_product_dict
         
-        # Add product_id to params for WHERE clause
-        params.append(product_id)
+            # Add product_id to params for WHERE clause
+            params.append(product_id)
         
-        # Execute update query
-        cursor.execute(
-            f"""
-            UPDATE popular_products 
-            SET {', '.join(update_fields)}
-            WHERE id = %s
-            RETURNING *
-            """,
-            tuple(params)
-        )
+            # Execute update query
+            cursor.execute(
+                f"""
+                UPDATE popular_products 
+                SET {', '.join(update_fields)}
+                WHERE id = %s
+                RETURNING *
+                """,
+                tuple(params)
+            )
+        
+            # Get updated product
+            updated_product = cursor.fetchone()
         
-        # Get updated product
-        updated_product = cursor.fetchone()
+            if image:
+                enqueue_image_upload(cursor, "popular_products", product_id, image_url)
+                # The replaced image is released only once the update has
+                # committed, so a failed write keeps the record's image intact
+                if existing_product_dict["image_url"]:
+                    background_tasks.add_task(delete_image, existing_product_dict["image_url"], settings.POPULAR_PRODUCTS_DIR)
         
-        # Convert psycopg2.extras.RealDictRow to dictionary
-        updated_product_dict = dict(updated_product)
+            # Convert psycopg2.extras.RealDictRow to dictionary
+            updated_product_dict = dict(updated_product)
         
-        # Convert features from JSON string to list
-        if updated_product_dict["features"]:
-            if isinstance(updated_product_dict["features"], str):
-                updated_product_dict["features"] = json.loads(updated_product_dict["features"])
-            elif not isinstance(updated_product_dict["features"], list):
+            # Convert features from JSON string to list
+            if updated_product_dict["features"]:
+                if isinstance(updated_product_dict["features"], str):
+                    updated_product_dict["features"] = json.loads(updated_product_dict["features"])
+                elif not isinstance(updated_product_dict["features"], list):
+                    updated_product_dict["features"] = []
+            else:
                 updated_product_dict["features"] = []
-        else:
-            updated_product_dict["features"] = []
         
-        # Clear cache
-        from app.utils.cache import cache
-        cache_keys = list(cache.cache.keys())
-        for key in cache_keys:
-            if "popular" in key:
-                cache.delete(key)
+            # Clear cache once committed, so a concurrent read can't cache
+            # pre-commit data again
+            background_tasks.add_task(invalidate_item, "popular_product", product_id)
+            background_tasks.add_task(cache.delete_prefix, "home_popular_products")
+            background_tasks.add_task(event_broadcaster.notify_change, "popular_products", "update", product_id)
         
-        log_info(f"Successfully updated popular product ID: {product_id}")
-        return updated_product_dict
+            log_info(f"Successfully updated popular product ID: {product_id}")
+            return updated_product_dict
+    except BaseException:
+        # The record wasn't written, so drop the image saved for it
+        await discard_saved_image(saved_image_url)
+        raise
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_popular_product(
@@ -285,13 +315,10 @@ async def delete_popular_product(
             try:
                 log_info(f"Deleting image for popular product ID {product_id}: {image_url}")
 
-                if settings.USE_CLOUDINARY:
-                    log_info("Cloudinary image deletion enabled")
-                else:
-                    permissions = check_image_permissions(settings.POPULAR_PRODUCTS_DIR)
-                    log_info(f"Local image storage permissions: {permissions}")
+                permissions = check_image_permissions(settings.POPULAR_PRODUCTS_DIR)
+                log_info(f"Image storage permissions: {permissions}")
 
-                deleted = delete_image(image_url, settings.POPULAR_PRODUCTS_DIR)
+                deleted = await delete_image(image_url, settings.POPULAR_PRODUCTS_DIR)
                 log_info(f"Image deletion success: {deleted}")
             except Exception as e:
                 log_error(f"Image deletion failed but continuing with DB deletion: {e}")
@@ -309,6 +336,9 @@ async def delete_popular_product(
                 raise HTTPException(status_code=500, detail="Failed to delete popular product")
 
             cursor.execute("COMMIT")
+            invalidate_item("popular_product", product_id)
+            cache.delete_prefix("home_popular_products")
+            event_broadcaster.notify_change("popular_products", "delete", product_id)
             log_info(f"Deleted popular product ID {product_id} successfully")
         except Exception as e:
             cursor.execute("ROLLBACK")
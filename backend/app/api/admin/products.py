@@ -2,13 +2,21 @@
 import os
 import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile, File, Query, status
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile, File, Query, status
 from app.auth.dependencies import get_current_admin
 from app.auth.router import AdminUser
 from app.config import settings
 from app.database import DatabaseConnection
 from app.models.schemas import Product, ProductCreate, ProductUpdate
-from app.utils.image_handler import save_image, delete_image, get_image_url, check_image_permissions
+from app.utils.image_handler import save_image_with_variants, delete_image, discard_saved_image, get_image_url, check_image_permissions
+from app.utils.jobs import enqueue_image_upload, image_state_for
+from app.utils.color_index import color_index
+from app.utils.events import event_broadcaster
+from app.utils.facet_index import facet_index
+from app.utils.price_index import price_index
+from app.utils.prices import sync_product_prices
+from app.utils.product_cache import invalidate_product, slugify
+from app.utils.related_products import refresh_related, refresh_related_after_delete
 from app.utils.logging import log_info, log_error, log_warning
 
 router = APIRouter()
@@ -84,6 +92,7 @@ async def get_all_products(
 
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
 async def create_product(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     category: str = Form(...),
     description: str = Form(...),
@@ -101,6 +110,7 @@ async def create_product(
     price100g: Optional[str] = Form(None),
     price50g: Optional[str] = Form(None),
     stock: str = Form("In Stock"),
+    coverage_rate: Optional[float] = Form(None),  # m² per litre (or kg) for one coat
     image: Optional[UploadFile] = File(None),
     current_user: AdminUser = Depends(get_current_admin)
 ):
@@ -115,94 +125,138 @@ async def create_product(
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid features format")
     
+    if coverage_rate is not None and coverage_rate <= 0:
+        raise HTTPException(status_code=400, detail="Coverage rate must be positive")
+    
     # Save image if provided
     image_filename = None
+    image_variants = None
+    image_placeholder = None
+    image_colors = None
     if image:
         try:
-            image_filename = save_image(image, settings.PRODUCTS_DIR)
+            image_filename, image_variants, image_placeholder, image_colors = await save_image_with_variants(image, settings.PRODUCTS_DIR, "products")
             log_info(f"Saved product image: {image_filename}")
+        except HTTPException:
+            raise
         except Exception as e:
             log_error(f"Failed to save product image: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
     
     # Create product in database
-    with DatabaseConnection() as cursor:
-        # Build field and value lists dynamically
-        fields = ["name", "category", "description", "features", "stock", "image_url"]
-        values = [
-            name, 
-            category, 
-            description, 
-            json.dumps(features_list), 
-            stock,
-            get_image_url(image_filename, "products") if image_filename else None
-        ]
-        
-        # Add price fields if provided
-        price_fields = {
-            "price1l": price1l,
-            "price4l": price4l,
-            "price5l": price5l,
-            "price10l": price10l,
-            "price20l": price20l,
-            "price500ml": price500ml,
-            "price200ml": price200ml,
-            "price1kg": price1kg, 
-            "price500g": price500g,
-            "price200g": price200g,
-            "price100g": price100g,
-            "price50g": price50g
-        }
-        
-        for field, value in price_fields.items():
-            if value:
-                fields.append(field)
-                values.append(value)
-        
-        # Construct SQL query
-        placeholders = ", ".join(["%s"] * len(values))
-        field_names = ", ".join(fields)
-        
-        query = f"""
-            INSERT INTO products 
-            ({field_names})
-            VALUES ({placeholders})
-            RETURNING *
-        """
-        
-        cursor.execute(query, tuple(values))
-        
-        # Get the created product
-        product = cursor.fetchone()
-        
-        # Convert psycopg2.extras.RealDictRow to dictionary
-        product_dict = dict(product)
-        
-        # Process product JSON fields
-        if product_dict["features"]:
-            if isinstance(product_dict["features"], str):
-                product_dict["features"] = json.loads(product_dict["features"])
-            elif not isinstance(product_dict["features"], list):
+    try:
+        with DatabaseConnection() as cursor:
+            # Build field and value lists dynamically
+            image_url = get_image_url(image_filename, "products") if image_filename else None
+            fields = ["name", "category", "description", "features", "stock", "image_url", "image_variants", "image_placeholder", "image_colors", "image_state"]
+            values = [
+                name, 
+                category, 
+                description, 
+                json.dumps(features_list), 
+                stock,
+                image_url,
+                json.dumps(image_variants) if image_variants else None,
+                json.dumps(image_placeholder) if image_placeholder else None,
+                image_colors,
+                image_state_for(image_url)
+            ]
+        
+            # Add price fields if provided
+            price_fields = {
+                "price1l": price1l,
+                "price4l": price4l,
+                "price5l": price5l,
+                "price10l": price10l,
+                "price20l": price20l,
+                "price500ml": price500ml,
+                "price200ml": price200ml,
+                "price1kg": price1kg, 
+                "price500g": price500g,
+                "price200g": price200g,
+                "price100g": price100g,
+                "price50g": price50g
+            }
+        
+            for field, value in price_fields.items():
+                if value:
+                    fields.append(field)
+                    values.append(value)
+        
+            if coverage_rate is not None:
+                fields.append("coverage_rate")
+                values.append(coverage_rate)
+        
+            # Construct SQL query
+            placeholders = ", ".join(["%s"] * len(values))
+            field_names = ", ".join(fields)
+        
+            query = f"""
+                INSERT INTO products 
+                ({field_names})
+                VALUES ({placeholders})
+                RETURNING *
+            """
+        
+            cursor.execute(query, tuple(values))
+        
+            # Get the created product
+            product = cursor.fetchone()
+        
+            # Slug from the name, with the ID appended if another product has it
+            slug = slugify(name)
+            cursor.execute("SELECT 1 FROM products WHERE slug = %s", (slug,))
+            if cursor.fetchone():
+                slug = f"{slug}-{product['id']}"
+            cursor.execute("UPDATE products SET slug = %s WHERE id = %s RETURNING *", (slug, product["id"]))
+            product = cursor.fetchone()
+            sync_product_prices(cursor, product)
+        
+            # Queue the remote storage upload in the same transaction
+            enqueue_image_upload(cursor, "products", product["id"], image_url)
+            # Once committed, so a concurrent rebuild can't snapshot pre-commit
+            # data; also drops a cached 404 for the new ID or slug
+            if image_colors:
+                background_tasks.add_task(color_index.invalidate)
+            background_tasks.add_task(price_index.invalidate)
+            background_tasks.add_task(facet_index.invalidate)
+            background_tasks.add_task(invalidate_product, product["id"], slug)
+            background_tasks.add_task(event_broadcaster.notify_change, "products", "insert", product["id"])
+            background_tasks.add_task(refresh_related, product["id"])
+        
+            # Convert psycopg2.extras.RealDictRow to dictionary
+            product_dict = dict(product)
+        
+            # Process product JSON fields
+            if product_dict["features"]:
+                if isinstance(product_dict["features"], str):
+                    product_dict["features"] = json.loads(product_dict["features"])
+                elif not isinstance(product_dict["features"], list):
+                    product_dict["features"] = []
+            else:
                 product_dict["features"] = []
-        else:
-            product_dict["features"] = []
         
-        # Convert price fields to dictionary structure
-        prices = {}
-        for field in price_fields.keys():
-            if product_dict.get(field):
-                # Strip "price" prefix and extract size
-                key = field.replace("price", "")
-                prices[key] = product_dict[field]
+            # Convert price fields to dictionary structure
+            prices = {}
+            for field in price_fields.keys():
+                if product_dict.get(field):
+                    # Strip "price" prefix and extract size
+                    key = field.replace("price", "")
+                    prices[key] = product_dict[field]
         
-        product_dict["prices"] = prices
+            product_dict["prices"] = prices
         
-        log_info(f"Successfully created product with ID: {product_dict['id']}")
-        return product_dict
+            log_info(f"Successfully created product with ID: {product_dict['id']}")
+            return product_dict
+    except BaseException:
+        # The record wasn't written, so drop the image saved for it
+        await discard_saved_image(image_filename)
+        raise
 
 @router.put("/{product_id}", response_model=Product)
 async def update_product(
     product_id: int,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = Form(None),
     category: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
@@ -220,148 +274,183 @@ async def update_product(
     price100g: Optional[str] = Form(None),
     price50g: Optional[str] = Form(None),
     stock: Optional[str] = Form(None),
+    coverage_rate: Optional[float] = Form(None),  # 0 clears it
     image: Optional[UploadFile] = File(None),
     current_user: AdminUser = Depends(get_current_admin)
 ):
     """Update an existing product"""
     log_info(f"Admin {current_user.username} updating product ID: {product_id}")
     
-    # Check if product exists
-    with DatabaseConnection() as cursor:
-        cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
-        existing_product = cursor.fetchone()
-        
-        if not existing_product:
-            log_warning(f"Product not found for update: ID {product_id}")
-            raise HTTPException(status_code=404, detail="Product not found")
-        
-        # Process features if provided
-        features_json = None
-        if features:
-            try:
-                features_list = json.loads(features)
-                if not isinstance(features_list, list):
-                    raise ValueError("Features must be a list")
-                features_json = json.dumps(features_list)
-            except Exception:
-                raise HTTPException(status_code=400, detail="Invalid features format")
-        
-        # Convert existing_product to dict for easier access
-        existing_product_dict = dict(existing_product)
-        
-        # Handle image update
-        image_url = existing_product_dict.get("image_url")
-        if image:
-            # Delete old image if exists
-            if existing_product_dict.get("image_url"):
-                old_filename = os.path.basename(existing_product_dict["image_url"])
-                delete_result = delete_image(old_filename, settings.PRODUCTS_DIR)
-                log_info(f"Old image deletion result: {delete_result}")
-            
-            # Save new image
-            try:
-                new_filename = save_image(image, settings.PRODUCTS_DIR)
-                image_url = get_image_url(new_filename, "products")
-                log_info(f"Updated product image: {new_filename}")
-            except Exception as e:
-                log_error(f"Failed to save updated image: {e}")
-                raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
-        
-        # Build update query dynamically based on provided fields
-        update_fields = []
-        params = []
-        
-        # Check and add fields
-        if name:
-            update_fields.append("name = %s")
-            params.append(name)
-        if category:
-            update_fields.append("category = %s")
-            params.append(category)
-        if description:
-            update_fields.append("description = %s")
-            params.append(description)
-        if features_json:
-            update_fields.append("features = %s")
-            params.append(features_json)
-        if stock:
-            update_fields.append("stock = %s")
-            params.append(stock)
-        
-        # Process price fields
-        price_fields = {
-            "price1l": price1l,
-            "price4l": price4l,
-            "price5l": price5l,
-            "price10l": price10l,
-            "price20l": price20l,
-            "price500ml": price500ml,
-            "price200ml": price200ml,
-            "price1kg": price1kg,
-            "price500g": price500g,
-            "price200g": price200g,
-            "price100g": price100g,
-            "price50g": price50g
-        }
-        
-        for field, value in price_fields.items():
-            if value is not None:  # Include empty strings to clear values
-                update_fields.append(f"{field} = %s")
-                params.append(value)
-        
-        # Add image URL if updated
-        if image:
-            update_fields.append("image_url = %s")
-            params.append(image_url)
-        
-        if not update_fields:
-            # No fields to update
-            raise HTTPException(status_code=400, detail="No fields to update")
-        
-        # Add product_id to params for WHERE clause
-        params.append(product_id)
-        
-        # Execute update query
-        query = f"""
-            UPDATE products 
-            SET {', '.join(update_fields)}
-            WHERE id = %s
-            RETURNING *
-        """
-        
-        cursor.execute(query, tuple(params))
+    saved_image_url = None  # a new image saved for this update
+    try:
+        # Check if product exists
+        with DatabaseConnection() as cursor:
+            cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
+            existing_product = cursor.fetchone()
         
-        # Get updated product
-        updated_product = cursor.fetchone()
+            if not existing_product:
+                log_warning(f"Product not found for update: ID {product_id}")
+                raise HTTPException(status_code=404, detail="Product not found")
         
-        # Convert psycopg2.extras.RealDictRow to dictionary
-        updated_product_dict = dict(updated_product)
+            if coverage_rate is not None and coverage_rate < 0:
+                raise HTTPException(status_code=400, detail="Coverage rate must be positive")
         
-        # Process product JSON fields
-        if updated_product_dict["features"]:
-            if isinstance(updated_product_dict["features"], str):
-                updated_product_dict["features"] = json.loads(updated_product_dict["features"])
-            elif not isinstance(updated_product_dict["features"], list):
+            # Process features if provided
+            features_json = None
+            if features:
+                try:
+                    features_list = json.loads(features)
+                    if not isinstance(features_list, list):
+                        raise ValueError("Features must be a list")
+                    features_json = json.dumps(features_list)
+                except Exception:
+                    raise HTTPException(status_code=400, detail="Invalid features format")
+        
+            # Convert existing_product to dict for easier access
+            existing_product_dict = dict(existing_product)
+        
+            # Handle image update
+            image_url = existing_product_dict.get("image_url")
+            if image:
+                # Save new image
+                try:
+                    new_filename, image_variants, image_placeholder, image_colors = await save_image_with_variants(image, settings.PRODUCTS_DIR, "products")
+                    image_url = get_image_url(new_filename, "products")
+                    saved_image_url = image_url
+                    log_info(f"Updated product image: {new_filename}")
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    log_error(f"Failed to save updated image: {e}")
+                    raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        
+            # Build update query dynamically based on provided fields
+            update_fields = []
+            params = []
+        
+            # Check and add fields
+            if name:
+                update_fields.append("name = %s")
+                params.append(name)
+            if category:
+                update_fields.append("category = %s")
+                params.append(category)
+            if description:
+                update_fields.append("description = %s")
+                params.append(description)
+            if features_json:
+                update_fields.append("features = %s")
+                params.append(features_json)
+            if stock:
+                update_fields.append("stock = %s")
+                params.append(stock)
+            if coverage_rate is not None:
+                update_fields.append("coverage_rate = %s")
+                params.append(coverage_rate or None)
+        
+            # Process price fields
+            price_fields = {
+                "price1l": price1l,
+                "price4l": price4l,
+                "price5l": price5l,
+                "price10l": price10l,
+                "price20l": price20l,
+                "price500ml": price500ml,
+                "price200ml": price200ml,
+                "price1kg": price1kg,
+                "price500g": price500g,
+                "price200g": price200g,
+                "price100g": price100g,
+                "price50g": price50g
+            }
+        
+            for field, value in price_fields.items():
+                if value is not None:  # Include empty strings to clear values
+                    update_fields.append(f"{field} = %s")
+                    params.append(value)
+        
+            # Add image URL if updated
+            if image:
+                update_fields.append("image_url = %s")
+                params.append(image_url)
+                update_fields.append("image_variants = %s")
+                params.append(json.dumps(image_variants) if image_variants else None)
+                update_fields.append("image_placeholder = %s")
+                params.append(json.dumps(image_placeholder) if image_placeholder else None)
+                update_fields.append("image_colors = %s")
+                params.append(image_colors)
+                update_fields.append("image_state = %s")
+                params.append(image_state_for(image_url))
+        
+            if not update_fields:
+                # No fields to update
+                raise HTTPException(status_code=400, detail="No fields to update")
+        
+            # Add product_id to params for WHERE clause
+            params.append(product_id)
+        
+            # Execute update query
+            query = f"""
+                UPDATE products 
+                SET {', '.join(update_fields)}
+                WHERE id = %s
+                RETURNING *
+            """
+        
+            cursor.execute(query, tuple(params))
+        
+            # Get updated product
+            updated_product = cursor.fetchone()
+            sync_product_prices(cursor, updated_product)
+        
+            # Index invalidation runs once committed (see create_product)
+            if image:
+                enqueue_image_upload(cursor, "products", product_id, image_url)
+                # The replaced image is released only once the update has
+                # committed, so a failed write keeps the record's image intact
+                if existing_product_dict.get("image_url"):
+                    background_tasks.add_task(delete_image, existing_product_dict["image_url"], settings.PRODUCTS_DIR)
+                background_tasks.add_task(color_index.invalidate)
+            background_tasks.add_task(price_index.invalidate)
+            background_tasks.add_task(facet_index.invalidate)
+            background_tasks.add_task(invalidate_product, product_id, existing_product_dict.get("slug"))
+            background_tasks.add_task(event_broadcaster.notify_change, "products", "update", product_id)
+            if name or category or description or features_json:
+                background_tasks.add_task(refresh_related, product_id)
+        
+            # Convert psycopg2.extras.RealDictRow to dictionary
+            updated_product_dict = dict(updated_product)
+        
+            # Process product JSON fields
+            if updated_product_dict["features"]:
+                if isinstance(updated_product_dict["features"], str):
+                    updated_product_dict["features"] = json.loads(updated_product_dict["features"])
+                elif not isinstance(updated_product_dict["features"], list):
+                    updated_product_dict["features"] = []
+            else:
                 updated_product_dict["features"] = []
-        else:
-            updated_product_dict["features"] = []
         
-        # Convert price fields to dictionary structure
-        prices = {}
-        for field in price_fields.keys():
-            if updated_product_dict.get(field):
-                # Strip "price" prefix and extract size
-                key = field.replace("price", "")
-                prices[key] = updated_product_dict[field]
+            # Convert price fields to dictionary structure
+            prices = {}
+            for field in price_fields.keys():
+                if updated_product_dict.get(field):
+                    # Strip "price" prefix and extract size
+                    key = field.replace("price", "")
+                    prices[key] = updated_product_dict[field]
         
-        updated_product_dict["prices"] = prices
+            updated_product_dict["prices"] = prices
         
-        log_info(f"Successfully updated product ID: {product_id}")
-        return updated_product_dict
+            log_info(f"Successfully updated product ID: {product_id}")
+            return updated_product_dict
+    except BaseException:
+        # The record wasn't written, so drop the image saved for it
+        await discard_saved_image(saved_image_url)
+        raise
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: int,
+    background_tasks: BackgroundTasks,
     current_user: AdminUser = Depends(get_current_admin)
 ):
     """Delete a product with enhanced error handling and logging"""
@@ -388,14 +477,14 @@ async def delete_product(
             
             if product_dict.get("image_url"):
                 try:
-                    filename = os.path.basename(product_dict["image_url"])
-                    log_info(f"Attempting to delete image file: {filename}")
+                    log_info(f"Attempting to delete image: {product_dict['image_url']}")
                     
                     # Check directory permissions first
                     permissions = check_image_permissions(settings.PRODUCTS_DIR)
                     log_info(f"Image directory permissions: {permissions}")
                     
-                    image_deleted = delete_image(filename, settings.PRODUCTS_DIR)
+                    # Remotely stored images are handed to the job queue
+                    image_deleted = await delete_image(product_dict["image_url"], settings.PRODUCTS_DIR)
                     log_info(f"Image deletion result: {image_deleted}")
                     
                 except Exception as img_error:
@@ -412,6 +501,10 @@ async def delete_product(
             cursor.execute("BEGIN")
             
             try:
+                # Related-product lists that will lose this product and need refilling
+                cursor.execute("SELECT product_id FROM product_related WHERE related_id = %s", (product_id,))
+                lists_containing_product = [row["product_id"] for row in cursor.fetchall()]
+                
                 # Execute the delete
                 cursor.execute("DELETE FROM products WHERE id = %s", (product_id,))
                 
@@ -430,6 +523,12 @@ async def delete_product(
                 # Commit the transaction
                 cursor.execute("COMMIT")
                 log_info(f"Successfully deleted product from database: ID {product_id}")
+                price_index.invalidate()
+                facet_index.invalidate()
+                color_index.invalidate()
+                invalidate_product(product_id, product_dict.get("slug"))
+                event_broadcaster.notify_change("products", "delete", product_id)
+                background_tasks.add_task(refresh_related_after_delete, lists_containing_product)
                 
                 # Log the final result
                 result_msg = f"Product '{product_name}' (ID: {product_id}) deleted successfully"
@@ -0,0 +1,246 @@
+# app/api/admin/shades.py
+import csv
+import io
+import math
+from typing import Dict, List, Optional, Tuple
+import psycopg2.errors
+import psycopg2.extras
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+from app.auth.dependencies import get_current_admin
+from app.auth.router import AdminUser
+from app.database import DatabaseConnection
+from app.models.schemas import Shade, ShadeImportResult, PaginatedResponse
+from app.utils.colors import parse_hex_color, to_hex
+from app.utils.shade_index import shade_index
+from app.utils.logging import log_info, log_warning
+
+router = APIRouter()
+
+# Rows per INSERT statement during bulk import
+IMPORT_PAGE_SIZE = 1000
+# Row errors reported back from an import (the rest are only counted)
+MAX_REPORTED_ERRORS = 50
+
+def normalize_hex(value: str) -> str:
+    color = parse_hex_color(value)
+    if color is None:
+        raise HTTPException(status_code=400, detail=f"Invalid hex colour: {value}")
+    return to_hex(color)
+
+@router.get("/", response_model=PaginatedResponse)
+async def get_all_shades(
+    current_user: AdminUser = Depends(get_current_admin),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    collection: Optional[str] = None,
+    search: Optional[str] = None
+):
+    with DatabaseConnection() as cursor:
+        filters = []
+        params = []
+        if collection:
+            filters.append("collection = %s")
+            params.append(collection)
+        if search:
+            filters.append("(code ILIKE %s OR name ILIKE %s)")
+            params.extend([f"%{search}%", f"%{search}%"])
+        where_clause = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+        cursor.execute(f"SELECT COUNT(*) AS count FROM shades {where_clause}", tuple(params))
+        total = cursor.fetchone()["count"]
+
+        cursor.execute(
+            f"SELECT * FROM shades {where_clause} ORDER BY collection, code LIMIT %s OFFSET %s",
+            tuple(params + [limit, skip])
+        )
+        items = [dict(item) for item in cursor.fetchall()]
+
+    return {
+        "items": items,
+        "total": total,
+        "page": skip // limit + 1 if total > 0 else 0,
+        "size": limit,
+        "pages": math.ceil(total / limit) if total > 0 else 0
+    }
+
+@router.post("/", response_model=Shade, status_code=status.HTTP_201_CREATED)
+async def create_shade(
+    code: str = Form(...),
+    name: str = Form(...),
+    hex: str = Form(...),
+    collection: Optional[str] = Form(None),
+    product_id: Optional[int] = Form(None),
+    current_user: AdminUser = Depends(get_current_admin)
+):
+    log_info(f"Admin {current_user.username} creating shade: {code}")
+    hex_value = normalize_hex(hex)
+
+    try:
+        with DatabaseConnection() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO shades (code, name, hex, collection, product_id)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING *
+                """,
+                (code.strip(), name.strip(), hex_value, collection, product_id)
+            )
+            shade = dict(cursor.fetchone())
+    except psycopg2.errors.UniqueViolation:
+        raise HTTPException(status_code=409, detail=f"Shade code already exists: {code}")
+    except psycopg2.errors.ForeignKeyViolation:
+        raise HTTPException(status_code=400, detail=f"Product not found: {product_id}")
+
+    shade_index.invalidate()
+    log_info(f"Successfully created shade with ID: {shade['id']}")
+    return shade
+
+@router.put("/{shade_id}", response_model=Shade)
+async def update_shade(
+    shade_id: int,
+    code: Optional[str] = Form(None),
+    name: Optional[str] = Form(None),
+    hex: Optional[str] = Form(None),
+    collection: Optional[str] = Form(None),
+    product_id: Optional[int] = Form(None),
+    current_user: AdminUser = Depends(get_current_admin)
+):
+    log_info(f"Admin {current_user.username} updating shade ID: {shade_id}")
+
+    update_fields = []
+    params = []
+    if code:
+        update_fields.append("code = %s")
+        params.append(code.strip())
+    if name:
+        update_fields.append("name = %s")
+        params.append(name.strip())
+    if hex:
+        update_fields.append("hex = %s")
+        params.append(normalize_hex(hex))
+    if collection is not None:
+        update_fields.append("collection = %s")
+        params.append(collection or None)
+    if product_id is not None:
+        update_fields.append("product_id = %s")
+        params.append(product_id or None)
+
+    try:
+        with DatabaseConnection() as cursor:
+            if update_fields:
+                cursor.execute(
+                    f"UPDATE shades SET {', '.join(update_fields)} WHERE id = %s RETURNING *",
+                    tuple(params + [shade_id])
+                )
+            else:
+                cursor.execute("SELECT * FROM shades WHERE id = %s", (shade_id,))
+            shade = cursor.fetchone()
+    except psycopg2.errors.UniqueViolation:
+        raise HTTPException(status_code=409, detail=f"Shade code already exists: {code}")
+    except psycopg2.errors.ForeignKeyViolation:
+        raise HTTPException(status_code=400, detail=f"Product not found: {product_id}")
+
+    if not shade:
+        log_warning(f"Shade not found for update: ID {shade_id}")
+        raise HTTPException(status_code=404, detail="Shade not found")
+
+    shade_index.invalidate()
+    log_info(f"Successfully updated shade ID: {shade_id}")
+    return dict(shade)
+
+@router.delete("/{shade_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_shade(
+    shade_id: int,
+    current_user: AdminUser = Depends(get_current_admin)
+):
+    log_info(f"Admin {current_user.username} deleting shade ID: {shade_id}")
+    with DatabaseConnection() as cursor:
+        cursor.execute("DELETE FROM shades WHERE id = %s RETURNING id", (shade_id,))
+        deleted = cursor.fetchone()
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Shade not found")
+    shade_index.invalidate()
+    return None
+
+@router.post("/import", response_model=ShadeImportResult)
+async def import_shades(
+    file: UploadFile = File(...),
+    collection: Optional[str] = Form(None),
+    current_user: AdminUser = Depends(get_current_admin)
+):
+    """
+    Bulk import a shade card as CSV with a header row:
+    code,name,hex[,collection][,product_id]
+
+    Existing codes are updated, new ones inserted. `collection` is used for
+    rows that don't name their own.
+    """
+    log_info(f"Admin {current_user.username} importing shades from {file.filename}")
+    content = await file.read()
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Shade file must be UTF-8 encoded CSV")
+
+    rows, skipped, errors = parse_shade_csv(text, collection)
+    if not rows and errors:
+        raise HTTPException(status_code=400, detail=errors[0])
+
+    try:
+        await run_in_threadpool(upsert_shades, rows)
+    except psycopg2.errors.ForeignKeyViolation as e:
+        raise HTTPException(status_code=400, detail=f"Unknown product_id in shade file: {e.diag.message_detail}")
+    shade_index.invalidate()
+    log_info(f"Imported {len(rows)} shades ({skipped} rows skipped)")
+    return {"imported": len(rows), "skipped": skipped, "errors": errors[:MAX_REPORTED_ERRORS]}
+
+def parse_shade_csv(text: str, default_collection: Optional[str]) -> Tuple[List[tuple], int, List[str]]:
+    """
+    Validate the CSV rows. Returns (rows to upsert, skipped count, error messages).
+    A code appearing more than once keeps its last row.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    headers = {h.strip().lower() for h in reader.fieldnames or []}
+    missing = {"code", "name", "hex"} - headers
+    if missing:
+        return [], 0, [f"Missing CSV columns: {', '.join(sorted(missing))}"]
+
+    by_code: Dict[str, tuple] = {}
+    skipped = 0
+    errors: List[str] = []
+    for line_number, raw in enumerate(reader, start=2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in raw.items()}
+        color = parse_hex_color(row.get("hex", ""))
+        product_id = row.get("product_id") or None
+        if not row.get("code") or not row.get("name") or color is None or (product_id and not product_id.isdigit()):
+            skipped += 1
+            errors.append(f"Line {line_number}: invalid row {row}")
+            continue
+        by_code[row["code"]] = (
+            row["code"],
+            row["name"],
+            to_hex(color),
+            row.get("collection") or default_collection,
+            int(product_id) if product_id else None,
+        )
+    return list(by_code.values()), skipped, errors
+
+def upsert_shades(rows: List[tuple]):
+    """Insert or update shades in multi-row statements, in one transaction"""
+    with DatabaseConnection() as cursor:
+        psycopg2.extras.execute_values(
+            cursor,
+            """
+            INSERT INTO shades (code, name, hex, collection, product_id)
+            VALUES %s
+            ON CONFLICT (code) DO UPDATE
+            SET name = EXCLUDED.name,
+                hex = EXCLUDED.hex,
+                collection = EXCLUDED.collection,
+                product_id = EXCLUDED.product_id
+            """,
+            rows,
+            page_size=IMPORT_PAGE_SIZE
+        )
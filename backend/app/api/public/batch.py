@@ -0,0 +1,64 @@
+# app/api/public/batch.py
+import asyncio
+import json
+from urllib.parse import unquote, urlsplit
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.models.schemas import BatchRequest
+from app.utils.subrequests import run_subrequest
+
+router = APIRouter()
+
+MAX_BATCH_REQUESTS = 20
+
+# Sub-requests may only target these route trees
+BATCH_PATH_PREFIXES = ("/api/", "/admin/")
+# ...but never the batch route itself or streaming routes, whose responses
+# don't end and would hold the batch open
+BATCH_EXCLUDED_PATHS = ("/api/batch", "/api/events")
+
+def validate_batch_path(path: str) -> str:
+    url = urlsplit(path)
+    # Check the decoded path, which is what the router matches on
+    decoded = unquote(url.path)
+    if url.scheme or url.netloc or not decoded.startswith(BATCH_PATH_PREFIXES):
+        raise HTTPException(status_code=400, detail=f"Unsupported path: {path}")
+    if ".." in decoded.split("/"):
+        raise HTTPException(status_code=400, detail=f"Unsupported path: {path}")
+    route = decoded.rstrip("/")
+    if any(route == excluded or route.startswith(excluded + "/") for excluded in BATCH_EXCLUDED_PATHS):
+        raise HTTPException(status_code=400, detail=f"Unsupported path: {path}")
+    return path
+
+@router.post("/")
+async def run_batch(batch: BatchRequest, request: Request):
+    """
+    Run several GET requests against the public and admin API in one call.
+    They run concurrently in-process, each with the caller's credentials
+    (admin routes still need a valid bearer token). Results stream back as
+    newline-delimited JSON in completion order:
+    {"index", "path", "status", "headers", "body"} per line.
+    """
+    if not batch.requests:
+        raise HTTPException(status_code=400, detail="No requests given")
+    if len(batch.requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_REQUESTS} requests per batch")
+    paths = [validate_batch_path(sub.path) for sub in batch.requests]
+
+    app, scope = request.app, request.scope
+
+    async def run(index: int, path: str):
+        result = await run_subrequest(app, scope, path)
+        return {"index": index, "path": path, **result}
+
+    async def results():
+        tasks = [asyncio.ensure_future(run(index, path)) for index, path in enumerate(paths)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield json.dumps(await task, default=str) + "\n"
+        finally:
+            # The client went away mid-stream
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -5,6 +5,15 @@ from app.models.schemas import ContactSubmissionCreate, ContactSubmission, Stati
 
 router = APIRouter()
 
+# Returned until an admin saves the contact details
+DEFAULT_CONTACT_INFO = {
+    "id": 1,
+    "email": "contact@paintwebsite.com",
+    "phone": "+1 (555) 123-4567",
+    "address": "123 Paint Street, Colorful City, CP 12345",
+    "updated_at": None
+}
+
 @router.post("/submit", response_model=ContactSubmission, status_code=status.HTTP_201_CREATED)
 async def submit_contact_form(submission: ContactSubmissionCreate):
     """Submit a contact form"""
@@ -32,13 +41,7 @@ async def get_contact_info():
         
         if not contact_info:
             # Return default contact info if none exists in database
-            return {
-                "id": 1,
-                "email": "contact@paintwebsite.com",
-                "phone": "+1 (555) 123-4567",
-                "address": "123 Paint Street, Colorful City, CP 12345",
-                "updated_at": None
-            }
+            return dict(DEFAULT_CONTACT_INFO)
         
         # Convert psycopg2.extras.RealDictRow to dict to ensure proper field mapping
         contact_dict = dict(contact_info)
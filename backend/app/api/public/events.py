@@ -0,0 +1,38 @@
+# app/api/public/events.py
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.utils.events import MAX_EVENT_CLIENTS, event_broadcaster
+
+router = APIRouter()
+
+# Browsers wait this long (ms) before reconnecting a dropped stream
+RECONNECT_MS = 5000
+
+@router.get("/")
+async def stream_catalog_events():
+    """
+    Server-Sent Events stream of catalogue changes. Each `change` event
+    carries {"table", "op", "id"} for a committed insert, update or delete
+    in products, popular_products, new_arrivals or news_events. A `reset`
+    event means changes may have been missed (slow client or reconnect) and
+    the client should refetch, e.g. through /api/sync.
+    """
+    if event_broadcaster.client_count >= MAX_EVENT_CLIENTS:
+        raise HTTPException(status_code=503, detail="Too many event stream clients", headers={"Retry-After": "30"})
+
+    queue = event_broadcaster.subscribe()
+
+    async def events():
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            while True:
+                yield await queue.get()
+        finally:
+            event_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Don't let proxies buffer or cache the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
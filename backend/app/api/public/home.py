@@ -0,0 +1,93 @@
+# app/api/public/home.py
+import asyncio
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Query
+from starlette.concurrency import run_in_threadpool
+from app.database import DatabaseConnection
+from app.utils.cache import cached
+from app.utils.delivery_urls import delivery_width, optimize_record_images
+from app.utils.logging import log_error
+from app.utils.news_cache import get_news
+from app.api.public.contact import DEFAULT_CONTACT_INFO
+from app.api.public.popular_products import parse_features
+
+router = APIRouter()
+
+# Everything the home page shows in one response. Each section is loaded in
+# the threadpool on its own connection, so they run concurrently, and is
+# cached under its own "home_<section>" prefix so admin edits only drop the
+# section they touch. News uses the date-boundary cache in news_cache.py.
+
+@cached(ttl=300)  # Cache for 5 minutes
+def home_popular_products(limit: int, img_width: Optional[int]):
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            "SELECT * FROM popular_products ORDER BY rating DESC, created_at DESC LIMIT %s",
+            (limit,)
+        )
+        items = [dict(item) for item in cursor.fetchall()]
+    for item in items:
+        item["features"] = parse_features(item.get("features"))
+    optimize_record_images(items, delivery_width("popular_products", img_width))
+    return items
+
+@cached(ttl=300)  # Cache for 5 minutes
+def home_new_arrivals(limit: int, img_width: Optional[int]):
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            "SELECT * FROM new_arrivals ORDER BY release_date DESC, created_at DESC LIMIT %s",
+            (limit,)
+        )
+        items = [dict(item) for item in cursor.fetchall()]
+    optimize_record_images(items, delivery_width("new_arrivals", img_width))
+    return items
+
+def home_news_events(limit: int):
+    """Current news and events, highlighted first"""
+    return get_news("home", {"limit": limit}, lambda today: load_home_news_events(today, limit))
+
+def load_home_news_events(today: date, limit: int):
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            SELECT * FROM news_events
+            WHERE published = TRUE AND (end_date IS NULL OR end_date >= %s)
+            ORDER BY highlighted DESC, date DESC, created_at DESC
+            LIMIT %s
+            """,
+            (today, limit)
+        )
+        return [dict(item) for item in cursor.fetchall()]
+
+@cached(ttl=3600)  # Cache for 1 hour
+def home_contact_info():
+    with DatabaseConnection() as cursor:
+        cursor.execute("SELECT * FROM static_contact_info WHERE id = 1")
+        contact_info = cursor.fetchone()
+    return dict(contact_info) if contact_info else dict(DEFAULT_CONTACT_INFO)
+
+@router.get("/")
+async def get_home(
+    limit: int = Query(6, ge=1, le=20, description="Items per list section"),
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of images in px")
+):
+    """
+    Popular products, new arrivals, current news and contact info for the
+    home page. A section that fails to load is returned as null.
+    """
+    sections = {
+        "popular_products": run_in_threadpool(home_popular_products, limit=limit, img_width=img_width),
+        "new_arrivals": run_in_threadpool(home_new_arrivals, limit=limit, img_width=img_width),
+        "news_events": run_in_threadpool(home_news_events, limit=limit),
+        "contact": run_in_threadpool(home_contact_info),
+    }
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+
+    home = {}
+    for name, result in zip(sections, results):
+        if isinstance(result, Exception):
+            log_error(f"Failed to load home section {name}: {result}")
+            result = None
+        home[name] = result
+    return home
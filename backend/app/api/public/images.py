@@ -0,0 +1,135 @@
+# app/api/public/images.py
+import asyncio
+import hashlib
+import os
+from typing import Dict
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from app.config import settings
+from app.utils.cache import record_cache_event
+from app.utils.image_variants import render_transform, avif_supported, TRANSFORM_MEDIA_TYPES
+from app.utils.logging import log_info, log_error
+from app.utils.static_files import IMMUTABLE_CACHE_CONTROL
+from app.utils.transform_cache import transform_cache
+from app.utils.workers import run_in_process
+
+router = APIRouter()
+
+# Transforms are rendered once into the on-disk transform cache and served
+# from there. uvicorn doesn't implement the ASGI path-send extension, so a
+# FileResponse streams the file through Python in chunks. For zero-copy
+# sendfile, run behind nginx with an internal location aliased to
+# TRANSFORM_CACHE_DIR and set TRANSFORM_ACCEL_REDIRECT_PREFIX to it; the
+# response then carries only headers and X-Accel-Redirect, and nginx sends
+# the file:
+#
+#     location /_img_cache/ { internal; alias /app/backend/cache/img/; }
+
+ALLOWED_SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+# Renders in progress, so concurrent first requests for the same transform share one job
+_inflight: Dict[str, asyncio.Future] = {}
+
+def resolve_source_path(path: str) -> str:
+    """Map the request path onto a file under static/uploads, rejecting anything outside it"""
+    if path.startswith("static/"):
+        path = path[len("static/"):]
+
+    uploads_root = os.path.realpath(settings.UPLOAD_DIR)
+    source_path = os.path.realpath(os.path.join(settings.STATIC_DIR, path))
+
+    if not source_path.startswith(uploads_root + os.sep):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not source_path.lower().endswith(ALLOWED_SOURCE_EXTENSIONS):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not os.path.isfile(source_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return source_path
+
+def negotiate_format(request: Request, source_path: str) -> str:
+    """Pick the best output format the client accepts"""
+    accept = request.headers.get("accept", "")
+    if settings.IMAGE_VARIANT_AVIF and "image/avif" in accept and avif_supported():
+        return "avif"
+    if "image/webp" in accept:
+        return "webp"
+    # Keep transparency for formats that may carry it
+    if source_path.lower().endswith((".png", ".gif", ".webp")):
+        return "png"
+    return "jpeg"
+
+def transform_key(source_path: str, width: int, height: int, fmt: str) -> str:
+    """
+    Cache file name for a transform. The source's mtime and size are part of
+    the key, so replacing an upload never serves a stale render.
+    """
+    stat = os.stat(source_path)
+    raw = f"{source_path}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}|{fmt}|{settings.IMAGE_VARIANT_QUALITY}"
+    return f"{hashlib.sha256(raw.encode()).hexdigest()}.{fmt}"
+
+async def render_once(name: str, source_path: str, width: int, height: int, fmt: str):
+    """Render a transform into the cache, coalescing concurrent requests"""
+    future = _inflight.get(name)
+    if future is not None:
+        await future
+        return
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _inflight[name] = future
+    try:
+        size = await run_in_process(
+            render_transform, source_path, transform_cache.path_for(name), width, height, fmt
+        )
+        transform_cache.put(name, size)
+        log_info(f"Rendered image transform {width}x{height} {fmt}: {size} bytes")
+        future.set_result(None)
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception retrieved if nobody else was waiting on it
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(name, None)
+
+@router.get("/{width:int}x{height:int}/{path:path}")
+async def get_transformed_image(width: int, height: int, path: str, request: Request):
+    """
+    Serve an uploaded image resized to fit within width x height (0 = auto).
+    Renders on first request; later requests are served straight from the
+    on-disk transform cache, read through Python by default or sent by the
+    proxy via X-Accel-Redirect when TRANSFORM_ACCEL_REDIRECT_PREFIX is set.
+    """
+    max_dimension = settings.IMAGE_TRANSFORM_MAX_DIMENSION
+    if (width == 0 and height == 0) or width > max_dimension or height > max_dimension:
+        raise HTTPException(status_code=400, detail=f"Size must be between 1 and {max_dimension} pixels")
+
+    source_path = resolve_source_path(path)
+    fmt = negotiate_format(request, source_path)
+    name = transform_key(source_path, width, height, fmt)
+    etag = f'"{name.split(".")[0][:32]}"'
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag, "Vary": "Accept"}
+
+    if request.headers.get("if-none-match") == etag:
+        record_cache_event(hit=True)
+        return Response(status_code=304, headers=headers)
+
+    cached_path = transform_cache.get(name)
+    if cached_path:
+        record_cache_event(hit=True)
+    else:
+        record_cache_event(hit=False)
+        try:
+            await render_once(name, source_path, width, height, fmt)
+        except Exception as e:
+            log_error(f"Image transform failed for {path}: {e}")
+            raise HTTPException(status_code=422, detail="Could not process image")
+        cached_path = transform_cache.path_for(name)
+
+    if settings.TRANSFORM_ACCEL_REDIRECT_PREFIX:
+        # The proxy sends the file with sendfile; we only supply the headers
+        headers["X-Accel-Redirect"] = settings.TRANSFORM_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + name
+        return Response(media_type=TRANSFORM_MEDIA_TYPES[fmt], headers=headers)
+
+    # Without a proxy this is a chunked read (uvicorn has no path-send support)
+    return FileResponse(cached_path, media_type=TRANSFORM_MEDIA_TYPES[fmt], headers=headers)
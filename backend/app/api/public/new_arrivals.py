@@ -4,6 +4,7 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query
 from app.database import DatabaseConnection
 from app.models.schemas import NewArrival, PaginatedResponse
+from app.utils.delivery_urls import delivery_width, optimize_record_images
 
 router = APIRouter()
 
@@ -11,7 +12,8 @@ router = APIRouter()
 async def get_new_arrivals(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of images in px")
 ):
     with DatabaseConnection() as cursor:
         # Prepare query components
@@ -47,6 +49,7 @@ async def get_new_arrivals(
         
         # Convert psycopg2.extras.RealDictRow objects to dictionaries
         items = [dict(item) for item in items]
+        optimize_record_images(items, delivery_width("new_arrivals", img_width))
         
         # Calculate pagination info
         total_pages = math.ceil(total / limit) if total > 0 else 0
@@ -61,7 +64,9 @@ async def get_new_arrivals(
         }
 
 @router.get("/featured", response_model=NewArrival)
-async def get_featured_new_arrival():
+async def get_featured_new_arrival(
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of the image in px")
+):
     """Get the most recent new arrival as the featured item"""
     with DatabaseConnection() as cursor:
         cursor.execute(
@@ -77,4 +82,6 @@ async def get_featured_new_arrival():
         if not arrival:
             raise HTTPException(status_code=404, detail="No featured new arrival found")
             
-        return dict(arrival)
\ No newline at end of file
+        arrival = dict(arrival)
+        optimize_record_images([arrival], delivery_width("new_arrivals_featured", img_width))
+        return arrival
\ No newline at end of file
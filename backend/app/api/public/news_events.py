@@ -5,6 +5,7 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query
 from app.database import DatabaseConnection
 from app.models.schemas import NewsEvent, NewsEventType, PaginatedResponse
+from app.utils.news_cache import get_news
 
 router = APIRouter()
 
@@ -16,12 +17,26 @@ async def get_news_events(
     highlighted: Optional[bool] = None,
     search: Optional[str] = None,
     current_only: bool = Query(True)
+):
+    params = {
+        "skip": skip, "limit": limit, "type": type.value if type else None,
+        "highlighted": highlighted, "search": search, "current_only": current_only
+    }
+    return get_news("list", params, lambda today: load_news_events(today, **params))
+
+def load_news_events(
+    today: date,
+    skip: int,
+    limit: int,
+    type: Optional[str],
+    highlighted: Optional[bool],
+    search: Optional[str],
+    current_only: bool
 ):
     with DatabaseConnection() as cursor:
-        today = date.today()
-        
         # Prepare query components
-        query_conditions = []
+        # Scheduled items stay hidden until the scheduler publishes them
+        query_conditions = ["published = TRUE"]
         query_params = []
         
         # Add filter for current events only (no end date or end date >= today)
@@ -46,9 +61,7 @@ async def get_news_events(
             query_params.extend([search_term, search_term])
         
         # Construct WHERE clause
-        where_clause = ""
-        if query_conditions:
-            where_clause = "WHERE " + " AND ".join(query_conditions)
+        where_clause = "WHERE " + " AND ".join(query_conditions)
         
         # Count total matching records
         count_query = f"SELECT COUNT(*) as count FROM news_events {where_clause}"
@@ -86,13 +99,14 @@ async def get_highlighted_news_events(
     limit: int = Query(3, ge=1, le=10)
 ):
     """Get highlighted news and events that are currently active"""
-    today = date.today()
-    
+    return get_news("highlighted", {"limit": limit}, lambda today: load_highlighted_news_events(today, limit))
+
+def load_highlighted_news_events(today: date, limit: int):
     with DatabaseConnection() as cursor:
         cursor.execute(
             """
             SELECT * FROM news_events 
-            WHERE highlighted = TRUE
+            WHERE highlighted = TRUE AND published = TRUE
             AND (end_date IS NULL OR end_date >= %s)
             ORDER BY date DESC
             LIMIT %s
@@ -100,4 +114,4 @@ async def get_highlighted_news_events(
             (today, limit)
         )
         items = cursor.fetchall()
-        return [dict(item) for item in items]
\ No newline at end of file
+        return [dict(item) for item in items]
@@ -1,20 +1,44 @@
 # app/api/public/popular_products.py
 import json
 import math
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException, Query
 from app.database import DatabaseConnection
 from app.models.schemas import PaginatedResponse
+from app.utils.delivery_urls import delivery_width, optimize_record_images
+from app.utils.product_cache import get_entries
+from app.utils.validation import parse_id_list
 
 router = APIRouter()
 
+def parse_features(features) -> list:
+    """JSONB features as a list (legacy rows may hold a JSON string)"""
+    if isinstance(features, str):
+        try:
+            features = json.loads(features)
+        except json.JSONDecodeError:
+            return []
+    return features if isinstance(features, list) else []
+
 @router.get("/", response_model=PaginatedResponse)
 async def get_popular_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     type: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of product images in px"),
+    ids: Optional[str] = Query(None, description="Comma-separated IDs, e.g. 1,5,9 - returned in this order, other filters ignored")
 ):
+    if ids:
+        try:
+            product_ids = parse_id_list(ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        entries = get_entries("popular_product", product_ids, load_popular_products)
+        items = [dict(entries[pid]["item"]) for pid in product_ids if entries.get(pid)]
+        optimize_record_images(items, delivery_width("popular_products", img_width))
+        return {"items": items, "total": len(items), "page": 1 if items else 0, "size": len(items), "pages": 1 if items else 0}
+    
     with DatabaseConnection() as cursor:
         # Prepare query components
         query_conditions = []
@@ -72,6 +96,8 @@ async def get_popular_products(
                 
             processed_items.append(item_dict)
         
+        optimize_record_images(processed_items, delivery_width("popular_products", img_width))
+        
         # Calculate pagination info
         total_pages = math.ceil(total / limit) if total > 0 else 0
         current_page = skip // limit + 1 if total > 0 else 0
@@ -82,4 +108,17 @@ async def get_popular_products(
             "page": current_page,
             "size": limit,
             "pages": total_pages
-        }
\ No newline at end of file
+        }
+
+def load_popular_products(product_ids: List[int]) -> Dict[int, dict]:
+    """Popular products by ID (missing IDs left out)"""
+    with DatabaseConnection() as cursor:
+        cursor.execute("SELECT * FROM popular_products WHERE id = ANY(%s)", (list(product_ids),))
+        items = cursor.fetchall()
+    
+    products = {}
+    for item in items:
+        item_dict = dict(item)
+        item_dict["features"] = parse_features(item_dict.get("features"))
+        products[item_dict["id"]] = item_dict
+    return products
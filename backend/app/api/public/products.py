@@ -2,25 +2,93 @@
 import json
 import math
 from typing import List, Optional, Dict
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from app.database import DatabaseConnection, execute_query
 from app.models.schemas import Product, PaginatedResponse
 from app.utils.cache import cached
+from app.utils.colors import parse_hex_color
+from app.utils.color_index import color_index
+from app.utils.facet_index import facet_index
+from app.utils.product_cache import get_entries, get_product_id_for_slug
+from app.utils.delivery_urls import delivery_width, optimize_image_url, optimize_record_images
+from app.utils.prices import PRICE_FIELDS, PRICES_LATERAL, price_filter, price_sort
+from app.utils.quotes import MAX_QUOTE_QUANTITY, build_quote
+from app.utils.related_products import RELATED_COUNT
+from app.utils.validation import parse_id_list
 
 router = APIRouter()
 
+# Default colour filter tolerance in delta E (about 2 is the smallest visible difference)
+DEFAULT_COLOR_TOLERANCE = 12.0
+
 @router.get("/", response_model=PaginatedResponse)
-@cached(ttl=300)  # Cache for 5 minutes
 def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     category: Optional[str] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of product images in px"),
+    color: Optional[str] = Query(None, description="Hex colour, e.g. #aabbcc - nearest matches first"),
+    tolerance: float = Query(DEFAULT_COLOR_TOLERANCE, ge=0, le=100, description="Maximum colour difference (delta E)"),
+    min_price_1l: Optional[float] = Query(None, ge=0, description="Minimum 1L price"),
+    max_price_1l: Optional[float] = Query(None, ge=0, description="Maximum 1L price"),
+    sort: Optional[str] = Query(None, pattern="^-?price_1l$", description="price_1l (cheapest first) or -price_1l"),
+    stock: Optional[str] = None,
+    size: Optional[str] = Query(None, description="Only products sold in this pack size, e.g. 1L or 500g"),
+    ids: Optional[str] = Query(None, description="Comma-separated product IDs, e.g. 1,5,9 - returned in this order, other filters ignored")
 ):
     """Get paginated list of products with optional filtering"""
+    if ids:
+        # Served from the per-product cache rather than cached as a whole page
+        try:
+            product_ids = parse_id_list(ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        entries = get_entries("product", product_ids, load_products)
+        items = [dict(entries[pid]["item"]) for pid in product_ids if entries.get(pid)]
+        optimize_record_images(items, delivery_width("products", img_width))
+        return {"items": items, "total": len(items), "page": 1 if items else 0, "size": len(items), "pages": 1 if items else 0}
+    
+    return get_products_page(
+        skip=skip, limit=limit, category=category, search=search, img_width=img_width,
+        color=color, tolerance=tolerance, min_price_1l=min_price_1l, max_price_1l=max_price_1l,
+        sort=sort, stock=stock, size=size
+    )
+
+@cached(ttl=300)  # Cache for 5 minutes
+def get_products_page(
+    skip: int,
+    limit: int,
+    category: Optional[str],
+    search: Optional[str],
+    img_width: Optional[int],
+    color: Optional[str],
+    tolerance: float,
+    min_price_1l: Optional[float],
+    max_price_1l: Optional[float],
+    sort: Optional[str],
+    stock: Optional[str],
+    size: Optional[str]
+):
+    """One page of the filtered product list"""
     # Prepare query components
     query_conditions = []
     query_params = []
+    order_by = "category, name"
+    order_params = []
+    
+    if color:
+        target = parse_hex_color(color)
+        if target is None:
+            raise HTTPException(status_code=400, detail="Invalid color, expected a hex value like #aabbcc")
+        matched_ids = [product_id for product_id, _ in color_index.search(target, tolerance)]
+        if not matched_ids:
+            return {"items": [], "total": 0, "page": 0, "size": limit, "pages": 0}
+        query_conditions.append("id = ANY(%s)")
+        query_params.append(matched_ids)
+        # Closest colour match first
+        order_by = "array_position(%s::int[], id), category, name"
+        order_params.append(matched_ids)
     
     # Add filter conditions
     if category:
@@ -32,6 +100,29 @@ def get_products(
         search_term = f"%{search}%"
         query_params.extend([search_term, search_term, search_term])
     
+    if stock:
+        query_conditions.append("stock = %s")
+        query_params.append(stock)
+    
+    if size:
+        query_conditions.append(
+            "EXISTS (SELECT 1 FROM product_prices pp WHERE pp.product_id = products.id AND pp.size || pp.unit = %s)"
+        )
+        query_params.append(size)
+    
+    if min_price_1l is not None:
+        query_conditions.append(price_filter(1, "L", ">="))
+        query_params.append(min_price_1l)
+    
+    if max_price_1l is not None:
+        query_conditions.append(price_filter(1, "L", "<="))
+        query_params.append(max_price_1l)
+    
+    if sort:
+        # Products without a 1L price go last either way
+        direction = "DESC" if sort.startswith("-") else "ASC"
+        order_by = f"{price_sort(1, 'L')} {direction} NULLS LAST, {order_by}"
+    
     # Construct WHERE clause if needed
     where_clause = ""
     if query_conditions:
@@ -46,20 +137,21 @@ def get_products(
     else:
         total = 0
     
-    # Optimize the main query by selecting only needed fields
+    # Optimize the main query by selecting only needed fields, prices aggregated per product
     data_query = f"""
         SELECT 
             id, name, category, description, features, stock, 
-            image_url, 
-            price1L, price4L, price10L, price20L, 
-            price500ml, price200ml, price1kg, 
-            price500g, price200g, price100g, price50g
+            image_url, image_variants, image_placeholder, image_colors,
+            {', '.join(PRICE_FIELDS)},
+            COALESCE(pr.prices, '{{}}'::json) AS prices
         FROM products 
+        LEFT JOIN LATERAL ({PRICES_LATERAL}) pr ON TRUE
         {where_clause}
-        ORDER BY category, name
+        ORDER BY {order_by}
         LIMIT %s OFFSET %s
     """
     params = list(query_params)
+    params.extend(order_params)
     params.extend([limit, skip])
     items = execute_query(data_query, tuple(params))
     
@@ -81,22 +173,10 @@ def get_products(
         else:
             item_dict["features"] = []
         
-        # Convert price fields to dictionary structure
-        prices = {}
-        price_fields = [
-            "price1L", "price4L", "price10L", "price20L", 
-            "price500ml", "price200ml", "price1kg", 
-            "price500g", "price200g", "price100g", "price50g"
-        ]
-        for field in price_fields:
-            if item_dict.get(field):
-                # Strip "price" prefix and extract size
-                key = field.replace("price", "")
-                prices[key] = item_dict[field]
-        
-        item_dict["prices"] = prices
         processed_items.append(item_dict)
     
+    optimize_record_images(processed_items, delivery_width("products", img_width))
+    
     # Calculate pagination info
     total_pages = math.ceil(total / limit) if total > 0 else 0
     current_page = skip // limit + 1 if total > 0 else 0
@@ -125,34 +205,32 @@ def get_product_categories():
 
 @router.get("/by-category")
 @cached(ttl=900)  # Cache for 15 minutes
-def get_products_by_category():
+def get_products_by_category(
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of product images in px")
+):
     """Get products grouped by category for catalog display"""
-    # First get all categories
-    categories = get_product_categories()
+    image_width = delivery_width("products_by_category", img_width)
     
-    result = []
+    # Every product with its prices in one query, grouped by category below
+    query = f"""
+        SELECT 
+            id, name, description, category, features, 
+            image_url, image_variants, image_placeholder, stock,
+            COALESCE(pr.prices, '{{}}'::json) AS prices
+        FROM products 
+        LEFT JOIN LATERAL ({PRICES_LATERAL}) pr ON TRUE
+        ORDER BY category, name
+    """
+    products_by_category: Dict[str, List[dict]] = {}
+    for product in execute_query(query):
+        products_by_category.setdefault(product["category"], []).append(dict(product))
     
-    # For each category, get the products with one optimized query
-    for idx, category in enumerate(categories):
-        query = """
-            SELECT 
-                id, name, description, category, features, 
-                image_url, stock,
-                price1L, price4L, price10L, price20L, 
-                price500ml, price200ml, price1kg, 
-                price500g, price200g, price100g, price50g
-            FROM products 
-            WHERE category = %s
-            ORDER BY name
-        """
-        products = execute_query(query, (category,))
-        
+    result = []
+    for idx, (category, products) in enumerate(products_by_category.items()):
         # Process each product
         processed_products = []
-        for product in products:
-            # Convert psycopg2.extras.RealDictRow to dictionary
-            product_dict = dict(product)
-            
+        available_columns = []
+        for product_dict in products:
             # Process features
             if product_dict["features"]:
                 # Handle JSONB features
@@ -166,18 +244,7 @@ def get_products_by_category():
             else:
                 product_dict["features"] = []
             
-            # Convert price fields to dictionary structure
-            prices = {}
-            price_fields = [
-                "price1L", "price4L", "price10L", "price20L", 
-                "price500ml", "price200ml", "price1kg", 
-                "price500g", "price200g", "price100g", "price50g"
-            ]
-            for field in price_fields:
-                if product_dict.get(field):
-                    # Strip "price" prefix and extract size
-                    key = field.replace("price", "")
-                    prices[key] = product_dict[field]
+            prices = product_dict["prices"]
             
             # Determine which columns to display based on category
             columns = []
@@ -198,7 +265,9 @@ def get_products_by_category():
                 "description": product_dict["description"],
                 "prices": prices,
                 "features": product_dict["features"],
-                "image": product_dict.get("image_url", ""),
+                "image": optimize_image_url(product_dict.get("image_url", ""), image_width),
+                "image_variants": product_dict.get("image_variants"),
+                "image_placeholder": product_dict.get("image_placeholder"),
                 "stock": product_dict.get("stock", "In Stock")
             }
             
@@ -212,4 +281,141 @@ def get_products_by_category():
             "columns": available_columns if available_columns else []
         })
     
-    return result
\ No newline at end of file
+    return result
+
+@router.get("/facets")
+def get_product_facets(
+    search: Optional[str] = None,
+    category: Optional[List[str]] = Query(None),
+    stock: Optional[List[str]] = Query(None),
+    size: Optional[List[str]] = Query(None, description="Pack size, e.g. 1L or 500g"),
+    min_price_1l: Optional[float] = Query(None, ge=0),
+    max_price_1l: Optional[float] = Query(None, ge=0)
+):
+    """
+    Product counts per category, stock state and pack size for the given
+    search and filters. Repeat a filter to select several values.
+    """
+    return facet_index.counts(
+        {"category": category, "stock": stock, "size": size},
+        search=search,
+        min_price_1l=min_price_1l,
+        max_price_1l=max_price_1l
+    )
+
+@router.get("/{product_id}/related")
+@cached(ttl=900)  # Cache for 15 minutes
+def get_related_products(
+    product_id: int,
+    limit: int = Query(RELATED_COUNT, ge=1, le=RELATED_COUNT),
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of product images in px")
+):
+    """Precomputed "customers also consider" products, most similar first"""
+    query = f"""
+        SELECT 
+            id, name, category, stock, image_url, image_variants, image_placeholder,
+            related.score,
+            COALESCE(pr.prices, '{{}}'::json) AS prices
+        FROM product_related related
+        JOIN products ON products.id = related.related_id
+        LEFT JOIN LATERAL ({PRICES_LATERAL}) pr ON TRUE
+        WHERE related.product_id = %s
+        ORDER BY related.rank
+        LIMIT %s
+    """
+    items = [dict(item) for item in execute_query(query, (product_id, limit))]
+    if not items and not execute_query("SELECT 1 FROM products WHERE id = %s", (product_id,), fetch_one=True):
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    optimize_record_images(items, delivery_width("related_products", img_width))
+    return items
+
+@router.get("/{product_id}/quote")
+def get_product_quote(
+    product_id: int,
+    liters: Optional[float] = Query(None, gt=0, le=MAX_QUOTE_QUANTITY, description="Volume needed in litres"),
+    kg: Optional[float] = Query(None, gt=0, le=MAX_QUOTE_QUANTITY, description="Weight needed in kg")
+):
+    """Cheapest combination of pack sizes covering the requested quantity"""
+    if (liters is None) == (kg is None):
+        raise HTTPException(status_code=400, detail="Specify exactly one of liters or kg")
+
+    query = f"SELECT id, {', '.join(PRICE_FIELDS)} FROM products WHERE id = %s"
+    product = execute_query(query, (product_id,), fetch_one=True)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    quote = build_quote(dict(product), liters if liters is not None else kg, "L" if liters is not None else "kg")
+    if quote is None:
+        raise HTTPException(status_code=400, detail=f"Product is not sold by {'volume' if liters is not None else 'weight'}")
+    return quote
+
+def load_products(product_ids: List[int]) -> Dict[int, dict]:
+    """Products as served by the detail and ?ids= routes, by ID (missing IDs left out)"""
+    query = f"""
+        SELECT 
+            id, slug, name, category, description, features, stock, coverage_rate,
+            image_url, image_variants, image_placeholder, image_colors,
+            {', '.join(PRICE_FIELDS)},
+            COALESCE(pr.prices, '{{}}'::json) AS prices,
+            created_at, updated_at
+        FROM products 
+        LEFT JOIN LATERAL ({PRICES_LATERAL}) pr ON TRUE
+        WHERE id = ANY(%s)
+    """
+    products = {}
+    for product in execute_query(query, (list(product_ids),)):
+        product_dict = dict(product)
+        if isinstance(product_dict["features"], str):
+            try:
+                product_dict["features"] = json.loads(product_dict["features"])
+            except json.JSONDecodeError:
+                product_dict["features"] = []
+        elif not isinstance(product_dict["features"], list):
+            product_dict["features"] = []
+        products[product_dict["id"]] = product_dict
+    return products
+
+def find_product_id(slug: str) -> Optional[int]:
+    row = execute_query("SELECT id FROM products WHERE slug = %s", (slug,), fetch_one=True)
+    return row["id"] if row else None
+
+def product_response(product_id: int, request: Request, response: Response, img_width: Optional[int]):
+    """Cached product with an ETag; 304 when the client's copy is current"""
+    entry = get_entries("product", [product_id], load_products).get(product_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    width = delivery_width("product_detail", img_width)
+    etag = f'"{entry["etag"]}-{width}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
+    product = dict(entry["item"])
+    optimize_record_images([product], width)
+    return product
+
+@router.get("/slug/{slug}")
+def get_product_by_slug(
+    slug: str,
+    request: Request,
+    response: Response,
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of product images in px")
+):
+    """Get a single product by its URL slug"""
+    product_id = get_product_id_for_slug(slug, find_product_id)
+    if product_id is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product_response(product_id, request, response, img_width)
+
+@router.get("/{product_id}")
+def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    img_width: Optional[int] = Query(None, ge=16, le=4000, description="Display width of product images in px")
+):
+    """Get a single product by ID"""
+    return product_response(product_id, request, response, img_width)
@@ -0,0 +1,28 @@
+# app/api/public/quotes.py
+from fastapi import APIRouter, HTTPException
+from app.models.schemas import QuoteRequest
+from app.utils.price_index import price_index
+from app.utils.quotes import build_project_quote
+
+router = APIRouter()
+
+# Surfaces accepted in one project quote
+MAX_QUOTE_SURFACES = 500
+
+@router.post("/")
+def create_project_quote(request: QuoteRequest):
+    """
+    Priced bill of materials for a project: each surface's area and coats
+    are converted to paint using the product's coverage rate, then the
+    cheapest cans are picked for each product's combined quantity
+    """
+    if not request.surfaces:
+        raise HTTPException(status_code=400, detail="At least one surface is required")
+    if len(request.surfaces) > MAX_QUOTE_SURFACES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QUOTE_SURFACES} surfaces per quote")
+
+    surfaces = [surface.model_dump() for surface in request.surfaces]
+    try:
+        return build_project_quote(surfaces, price_index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,19 @@
+# app/api/public/shades.py
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.utils.colors import parse_hex_color, to_hex
+from app.utils.shade_index import shade_index
+
+router = APIRouter()
+
+@router.get("/match")
+def match_shades(
+    hex: str = Query(..., description="Hex colour, e.g. #aabbcc"),
+    limit: int = Query(5, ge=1, le=50),
+    collection: Optional[str] = None
+):
+    """Closest catalogue shades to a colour by CIEDE2000, nearest first"""
+    color = parse_hex_color(hex)
+    if color is None:
+        raise HTTPException(status_code=400, detail="Invalid hex, expected a value like #aabbcc")
+    return {"hex": to_hex(color), "matches": shade_index.match(color, limit, collection)}
@@ -0,0 +1,22 @@
+# app/api/public/sync.py
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.utils.sync import get_changes, parse_sync_token
+
+router = APIRouter()
+
+@router.get("/")
+def sync_catalog(
+    since: Optional[str] = Query(None, description="The `next` token of the previous sync")
+):
+    """
+    Products, popular products, new arrivals and news changed since the
+    last sync: upserted rows and deleted IDs per table. Pass the returned
+    `next` token on the following call. `reset: true` means the response
+    holds every row and the local copy should be replaced.
+    """
+    try:
+        since_token = parse_sync_token(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return get_changes(since_token)
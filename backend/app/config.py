@@ -19,6 +19,9 @@ class Settings:
     
     # Database - PostgreSQL (Supabase)
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Session-mode or direct connection for the /api/events LISTEN; the transaction
+    # pooler (port 6543) can't deliver notifications. Empty = this process's writes only
+    EVENTS_DATABASE_URL: str = os.getenv("EVENTS_DATABASE_URL", "")
     
     # Individual database components (matching your working connection)
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "")
@@ -40,6 +43,20 @@ class Settings:
     CLOUDINARY_API_KEY: str = os.getenv("CLOUDINARY_API_KEY", "")  
     CLOUDINARY_API_SECRET: str = os.getenv("CLOUDINARY_API_SECRET", "")
     USE_CLOUDINARY: bool = os.getenv("USE_CLOUDINARY", "false").lower() == "true"
+    # Override the API host, e.g. to point at a local fake Cloudinary server in tests
+    CLOUDINARY_UPLOAD_PREFIX: str = os.getenv("CLOUDINARY_UPLOAD_PREFIX", "")
+    
+    # Image storage backend: local, cloudinary or s3 (defaults follow USE_CLOUDINARY)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "cloudinary" if USE_CLOUDINARY else "local").lower()
+    
+    # S3-compatible storage (AWS S3, MinIO, R2, ...)
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # Leave empty for AWS
+    S3_REGION: str = os.getenv("S3_REGION", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PUBLIC_URL: str = os.getenv("S3_PUBLIC_URL", "")  # Base URL objects are served from
+    S3_MAX_CONNECTIONS: int = int(os.getenv("S3_MAX_CONNECTIONS", "20"))
     
     # CORS - deployment-ready: env CORS_ORIGINS (comma-separated) is merged with defaults
     _DEFAULT_CORS_ORIGINS: list = [
@@ -81,7 +98,30 @@ Settings.UPLOAD_DIR = os.path.join(Settings.STATIC_DIR, "uploads")
 Settings.POPULAR_PRODUCTS_DIR = os.path.join(Settings.UPLOAD_DIR, "popular_products")
 Settings.NEW_ARRIVALS_DIR = os.path.join(Settings.UPLOAD_DIR, "new_arrivals")
 Settings.PRODUCTS_DIR = os.path.join(Settings.UPLOAD_DIR, "products")
+# Content-addressed image store: <hash[:2]>/<hash>.<ext>, shared by all sections
+Settings.CAS_DIR = os.path.join(Settings.UPLOAD_DIR, "cas")
+# Uploads waiting for the background job queue to push them to Cloudinary
+Settings.PENDING_UPLOADS_DIR = os.path.join(Settings.UPLOAD_DIR, "pending")
 Settings.MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+Settings.MAX_FORM_OVERHEAD = 256 * 1024  # Text fields sent alongside an image upload
+# Responsive variants generated at upload time (widths in px, largest last)
+Settings.IMAGE_VARIANT_WIDTHS = [320, 640, 1024, 1600]
+Settings.IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+Settings.IMAGE_VARIANT_AVIF = os.getenv("IMAGE_VARIANT_AVIF", "false").lower() == "true"
+# On-demand /img/{w}x{h}/... transforms
+Settings.IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+Settings.IMAGE_TRANSFORM_MAX_DIMENSION = 2000
+Settings.TRANSFORM_CACHE_DIR = os.getenv("TRANSFORM_CACHE_DIR", os.path.join("cache", "img"))
+Settings.TRANSFORM_CACHE_MAX_BYTES = int(os.getenv("TRANSFORM_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Internal proxy location mapped onto TRANSFORM_CACHE_DIR (e.g. "/_img_cache/"); when set,
+# cache hits are handed to the proxy with X-Accel-Redirect so it sends the file itself
+Settings.TRANSFORM_ACCEL_REDIRECT_PREFIX = os.getenv("TRANSFORM_ACCEL_REDIRECT_PREFIX", "")
+# Background image jobs (Cloudinary uploads/deletes)
+Settings.IMAGE_JOB_WORKERS = int(os.getenv("IMAGE_JOB_WORKERS", "2"))
+Settings.IMAGE_JOB_MAX_ATTEMPTS = int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", "5"))
+Settings.IMAGE_JOB_POLL_SECONDS = int(os.getenv("IMAGE_JOB_POLL_SECONDS", "10"))
+# Time zone of admin-entered times that carry no offset (news publish_at/unpublish_at)
+Settings.LOCAL_TIMEZONE = os.getenv("LOCAL_TIMEZONE", "Asia/Kolkata")
 Settings.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 settings = Settings()
\ No newline at end of file
@@ -22,24 +22,43 @@ from app.api.admin import news_events as admin_news_events
 from app.api.admin import contact as admin_contact
 from app.api.admin import password as admin_password
 from app.api.admin import products as admin_products
+from app.api.admin import shades as admin_shades
 
 from app.api.public import popular_products as public_popular_products
 from app.api.public import new_arrivals as public_new_arrivals
 from app.api.public import news_events as public_news_events
 from app.api.public import contact as public_contact
 from app.api.public import products as public_products
+from app.api.public import shades as public_shades
+from app.api.public import quotes as public_quotes
+from app.api.public import home as public_home
+from app.api.public import batch as public_batch
+from app.api.public import sync as public_sync
+from app.api.public import events as public_events
+from app.api.public import images as public_images
 
 from app.auth.router import router as auth_router
 from app.auth.dependencies import get_current_admin
 from app.models.schemas import AdminUser
 
 from app.utils.logging import log_error, log_info, log_exception, get_request_id
-from app.utils.rate_limit import rate_limit_auth, rate_limit_api
+from app.utils.rate_limit import get_rate_limit_policy, get_rate_limit_key, rate_limit_exceeded
+from app.utils.cache import track_cache_events, served_from_cache
+from app.utils.workers import shutdown_process_pool
+from app.utils.jobs import start_job_workers, stop_job_workers
+from app.utils.sync import purge_sync_deletions
+from app.utils.events import event_broadcaster
+from app.utils.news_schedule import news_scheduler
+from app.utils.upload_limits import UploadSizeLimitMiddleware
+from app.utils.static_files import ImmutableStaticFiles
+from app.storage.factory import get_storage
 
 # Create directories for uploads if they don't exist
 os.makedirs(settings.POPULAR_PRODUCTS_DIR, exist_ok=True)
 os.makedirs(settings.NEW_ARRIVALS_DIR, exist_ok=True)
 os.makedirs(settings.PRODUCTS_DIR, exist_ok=True)
+os.makedirs(settings.PENDING_UPLOADS_DIR, exist_ok=True)
+os.makedirs(settings.CAS_DIR, exist_ok=True)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -51,6 +70,13 @@ app = FastAPI(
 # -------------------------
 # Middleware (CORS early)
 # -------------------------
+# Reject oversized uploads while they stream in. Registered before CORS so the
+# 413 still carries CORS headers; the extra allowance covers the form fields.
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_size=settings.MAX_IMAGE_SIZE + settings.MAX_FORM_OVERHEAD,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -123,17 +149,29 @@ async def log_requests(request: Request, call_next):
 # Rate limiting middleware
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    path = request.url.path
-
-    # Rate limit auth endpoints
-    if path.startswith("/auth/") or path == "/auth/login":
-        await rate_limit_auth(request)
+    policy = get_rate_limit_policy(request)
+    if policy is None:
+        return await call_next(request)
+
+    key = get_rate_limit_key(request, policy)
+    limited, reset = policy.limiter.is_rate_limited(key, policy.cost)
+    if limited:
+        # Exception handlers don't run for errors raised in middleware, so respond directly
+        exc = rate_limit_exceeded(request, reset)
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.detail, "request_id": getattr(request.state, "request_id", None)},
+            headers=exc.headers,
+        )
+
+    cache_events = track_cache_events()
+    response = await call_next(request)
 
-    # Rate limit other API endpoints
-    if (path.startswith("/api/") or path.startswith("/admin/")) and not (path.startswith("/auth/") or path.startswith("/api/v1/auth/")):
-        await rate_limit_api(request)
+    # Reads answered from the in-memory cache don't count against the budget
+    if policy.exempt_cached and served_from_cache(cache_events):
+        policy.limiter.refund(key, policy.cost)
 
-    return await call_next(request)
+    return response
 
 # Compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
@@ -195,6 +233,9 @@ async def global_exception_handler(request: Request, exc: Exception):
 # -------------------------
 # Static + Routers
 # -------------------------
+# Content-addressed images never change, so they get far-future cache headers.
+# Must be mounted before /static, which would otherwise match first.
+app.mount("/static/uploads/cas", ImmutableStaticFiles(directory=settings.CAS_DIR), name="cas")
 app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
 
 # Auth router (ONLY ONCE)
@@ -206,6 +247,7 @@ app.include_router(admin_new_arrivals.router, prefix="/admin/new-arrivals", tags
 app.include_router(admin_news_events.router, prefix="/admin/news-events", tags=["Admin - News & Events"])
 app.include_router(admin_contact.router, prefix="/admin/contact", tags=["Admin - Contact"])
 app.include_router(admin_products.router, prefix="/admin/products", tags=["Admin - Products"])
+app.include_router(admin_shades.router, prefix="/admin/shades", tags=["Admin - Shades"])
 app.include_router(admin_password.router, prefix="/admin/password", tags=["Admin - Password Management"])
 
 # Public routers
@@ -214,6 +256,52 @@ app.include_router(public_new_arrivals.router, prefix="/api/new-arrivals", tags=
 app.include_router(public_news_events.router, prefix="/api/news-events", tags=["News & Events"])
 app.include_router(public_contact.router, prefix="/api/contact", tags=["Contact"])
 app.include_router(public_products.router, prefix="/api/products", tags=["Products"])
+app.include_router(public_shades.router, prefix="/api/shades", tags=["Shades"])
+app.include_router(public_quotes.router, prefix="/api/quotes", tags=["Quotes"])
+app.include_router(public_home.router, prefix="/api/home", tags=["Home"])
+app.include_router(public_batch.router, prefix="/api/batch", tags=["Batch"])
+app.include_router(public_sync.router, prefix="/api/sync", tags=["Sync"])
+app.include_router(public_events.router, prefix="/api/events", tags=["Events"])
+
+# On-demand image resizing
+app.include_router(public_images.router, prefix="/img", tags=["Images"])
+
+# -------------------------
+# Lifecycle
+# -------------------------
+@app.on_event("startup")
+async def start_background_jobs():
+    # Uploads/deletes for remote storage run from the image job queue
+    if get_storage().remote:
+        await start_job_workers()
+
+@app.on_event("startup")
+def purge_sync_tombstones():
+    try:
+        purge_sync_deletions()
+    except Exception as e:
+        log_error(f"Could not purge sync tombstones: {e}")
+
+@app.on_event("startup")
+async def start_news_scheduler():
+    # Loads the publish/unpublish timers; retries on its own if the database is down
+    await news_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await stop_job_workers()
+
+@app.on_event("shutdown")
+async def stop_event_broadcaster():
+    await event_broadcaster.stop()
+
+@app.on_event("shutdown")
+async def stop_news_scheduler():
+    await news_scheduler.stop()
+
+@app.on_event("shutdown")
+def stop_workers():
+    shutdown_process_pool()
 
 # -------------------------
 # Basic endpoints
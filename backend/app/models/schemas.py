@@ -43,6 +43,10 @@ class PopularProductUpdate(BaseModel):
 class PopularProductInDB(PopularProductBase):
     id: int
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Any]] = None  # srcset-ready responsive sizes
+    image_placeholder: Optional[Dict[str, Any]] = None  # {width, height, lqip} painted while the image loads
+    image_colors: Optional[List[int]] = None  # Dominant colour first, as 0xRRGGBB
+    image_state: Optional[str] = None  # pending/ready/failed while Cloudinary uploads run
     created_at: datetime
     updated_at: datetime
 
@@ -66,6 +70,10 @@ class NewArrivalUpdate(BaseModel):
 class NewArrivalInDB(NewArrivalBase):
     id: int
     image_url: Optional[str] = None
+    image_variants: Optional[Dict[str, Any]] = None  # srcset-ready responsive sizes
+    image_placeholder: Optional[Dict[str, Any]] = None  # {width, height, lqip} painted while the image loads
+    image_colors: Optional[List[int]] = None  # Dominant colour first, as 0xRRGGBB
+    image_state: Optional[str] = None  # pending/ready/failed while Cloudinary uploads run
     created_at: datetime
     updated_at: datetime
 
@@ -80,6 +88,8 @@ class NewsEventBase(BaseModel):
     date: date
     end_date: Optional[date] = None
     highlighted: bool = False
+    publish_at: Optional[datetime] = None  # hidden from the public API until then
+    unpublish_at: Optional[datetime] = None  # and from then on
 
 class NewsEventCreate(NewsEventBase):
     pass
@@ -91,9 +101,12 @@ class NewsEventUpdate(BaseModel):
     date: Optional[date] = None
     end_date: Optional[date] = None
     highlighted: Optional[bool] = None
+    publish_at: Optional[datetime] = None
+    unpublish_at: Optional[datetime] = None
 
 class NewsEventInDB(NewsEventBase):
     id: int
+    published: bool = True
     created_at: datetime
     updated_at: datetime
 
@@ -153,6 +166,7 @@ class ProductBase(BaseModel):
     description: Optional[str] = None
     features: List[str] = []
     stock: str = "In Stock"
+    coverage_rate: Optional[float] = None  # m² per litre (or kg) for one coat
 
 class ProductCreate(ProductBase):
     # Price fields are optional strings to support currency formatting
@@ -176,6 +190,7 @@ class ProductUpdate(BaseModel):
     description: Optional[str] = None
     features: Optional[List[str]] = None
     stock: Optional[str] = None
+    coverage_rate: Optional[float] = None
     price1l: Optional[str] = None
     price4l: Optional[str] = None
     price5l: Optional[str] = None
@@ -192,7 +207,12 @@ class ProductUpdate(BaseModel):
 
 class Product(ProductBase):
     id: int
+    slug: Optional[str] = None  # For /api/products/slug/{slug}
     image_url: str  # Required field
+    image_variants: Optional[Dict[str, Any]] = None  # srcset-ready responsive sizes
+    image_placeholder: Optional[Dict[str, Any]] = None  # {width, height, lqip} painted while the image loads
+    image_colors: Optional[List[int]] = None  # Dominant colour first, as 0xRRGGBB
+    image_state: Optional[str] = None  # pending/ready/failed while Cloudinary uploads run
     price1l: Optional[str] = None
     price4l: Optional[str] = None
     price5l: Optional[str] = None
@@ -212,6 +232,41 @@ class Product(ProductBase):
     class Config:
         orm_mode = True
         
+# Project quote models
+class QuoteSurface(BaseModel):
+    product_id: int
+    area: float = Field(..., gt=0, le=100000)  # m²
+    coats: int = Field(2, ge=1, le=10)
+    name: Optional[str] = None  # e.g. "Living room walls"
+
+class QuoteRequest(BaseModel):
+    surfaces: List[QuoteSurface]
+
+# Shade card models
+class ShadeBase(BaseModel):
+    code: str
+    name: str
+    hex: str  # "#rrggbb"
+    collection: Optional[str] = None
+    product_id: Optional[int] = None  # Base paint the shade is mixed from
+
+class ShadeCreate(ShadeBase):
+    pass
+
+class Shade(ShadeBase):
+    id: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ShadeMatch(ShadeBase):
+    id: int
+    delta_e: float  # CIEDE2000 difference from the requested colour
+
+class ShadeImportResult(BaseModel):
+    imported: int
+    skipped: int
+    errors: List[str] = []
+
 # Add these models to app/models/schemas.py - add at the end of your existing file
 
 # Authentication models
@@ -230,4 +285,11 @@ class AdminUser(BaseModel):
     email: str
 
 class AdminUserInDB(AdminUser):
-    password_hash: str
\ No newline at end of file
+    password_hash: str
+
+# Batch request models
+class BatchSubRequest(BaseModel):
+    path: str  # e.g. "/api/products/categories" or "/admin/products/5?img_width=320"
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
@@ -0,0 +1,109 @@
+# app/storage/base.py
+import asyncio
+import mimetypes
+import os
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+class StorageStat:
+    """Metadata for a stored object"""
+    def __init__(self, key: str, size: int, modified: float, content_type: Optional[str] = None):
+        self.key = key
+        self.size = size
+        self.modified = modified  # Unix timestamp
+        self.content_type = content_type
+
+    def __repr__(self):
+        return f"StorageStat(key={self.key!r}, size={self.size}, modified={self.modified})"
+
+class StorageDriver(ABC):
+    """
+    Interface for image storage backends.
+
+    Objects are addressed by keys relative to the storage root, e.g.
+    "cas/ab/ab12...png". Every driver maps keys to public URLs and back.
+
+    - `remote`: writes are slow network calls, so uploads and deletes go
+      through the background job queue instead of the request.
+    - `transforms`: the backend renders resized variants from URLs itself,
+      so they don't have to be generated and stored.
+    """
+    name = "base"
+    remote = False
+    transforms = False
+
+    # Batch operations run at most this many requests at once
+    batch_concurrency = 8
+
+    @abstractmethod
+    async def put(self, key: str, source_path: str, content_type: Optional[str] = None) -> str:
+        """Store the file at source_path under key. Returns its public URL."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete an object. Deleting a missing object succeeds."""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        return await self.stat(key) is not None
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StorageStat]:
+        """Return the object's metadata, or None if it doesn't exist"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list(self, prefix: str = "") -> AsyncIterator[StorageStat]:
+        """Yield every object whose key starts with prefix"""
+        raise NotImplementedError
+        yield  # pragma: no cover - makes this an async generator
+
+    async def batch_delete(self, keys: Iterable[str]) -> Dict[str, bool]:
+        """
+        Delete many objects concurrently. Returns {key: success}.
+        Drivers with a native bulk delete API override this.
+        """
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def delete_one(key: str):
+            async with semaphore:
+                try:
+                    return key, await self.delete(key)
+                except Exception:
+                    return key, False
+
+        results = await asyncio.gather(*(delete_one(key) for key in keys))
+        return dict(results)
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Key for a URL served by this storage, or None if it belongs elsewhere"""
+        raise NotImplementedError
+
+    async def delete_with_variants(self, key: str) -> bool:
+        """Delete an image and the `<stem>_<width>w.<fmt>` variants stored next to it"""
+        stem = os.path.splitext(key)[0]
+        stem_name = os.path.basename(stem)
+        keys: List[str] = [key]
+        async for entry in self.list(stem):
+            name = os.path.basename(entry.key)
+            if entry.key != key and name.startswith(f"{stem_name}_"):
+                keys.append(entry.key)
+        results = await self.batch_delete(keys)
+        return all(results.values())
+
+# Not known to every Python version's mimetypes table
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
@@ -0,0 +1,130 @@
+# app/storage/cloudinary.py
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+import cloudinary.utils
+import requests
+from starlette.concurrency import run_in_threadpool
+from app.storage.base import StorageDriver, StorageStat
+# Importing the handler applies the account configuration
+from app.utils.cloudinary_handler import extract_public_id_from_url, is_cloudinary_url
+from app.utils.logging import log_info
+
+# delete_resources accepts at most 100 public IDs per call
+DELETE_BATCH_LIMIT = 100
+
+class CloudinaryStorage(StorageDriver):
+    """
+    Images in Cloudinary under the `paintcompany/` folder.
+    Keys map to public IDs without the file extension, which Cloudinary
+    keeps separately as the format. Resized variants come from
+    transformation URLs, so only originals are stored.
+    """
+    name = "cloudinary"
+    remote = True
+    transforms = True
+
+    def __init__(self, root_folder: str = "paintcompany"):
+        self.root_folder = root_folder.strip("/")
+
+    def public_id_for(self, key: str) -> str:
+        return f"{self.root_folder}/{os.path.splitext(key)[0]}"
+
+    def key_for_public_id(self, public_id: str) -> Optional[str]:
+        prefix = f"{self.root_folder}/"
+        if not public_id.startswith(prefix):
+            return None
+        return public_id[len(prefix):]
+
+    async def put(self, key: str, source_path: str, content_type: Optional[str] = None) -> str:
+        # A fixed public_id without overwrite makes repeated uploads of the
+        # same key return the existing asset
+        result = await run_in_threadpool(
+            cloudinary.uploader.upload,
+            source_path,
+            public_id=self.public_id_for(key),
+            resource_type="image",
+            use_filename=False,
+            unique_filename=False,
+            overwrite=False
+        )
+        log_info(f"Uploaded to Cloudinary: {result['public_id']}")
+        return result["secure_url"]
+
+    async def get(self, key: str) -> bytes:
+        def download():
+            response = requests.get(self.url_for(key), timeout=30)
+            response.raise_for_status()
+            return response.content
+        return await run_in_threadpool(download)
+
+    async def delete(self, key: str) -> bool:
+        result = await run_in_threadpool(cloudinary.uploader.destroy, self.public_id_for(key))
+        return result.get("result") in ("ok", "not found")
+
+    async def stat(self, key: str) -> Optional[StorageStat]:
+        try:
+            resource = await run_in_threadpool(cloudinary.api.resource, self.public_id_for(key))
+        except cloudinary.exceptions.NotFound:
+            return None
+        return self._to_stat(resource)
+
+    async def list(self, prefix: str = "") -> AsyncIterator[StorageStat]:
+        next_cursor = None
+        while True:
+            options = {"type": "upload", "prefix": self.public_id_for(prefix) if prefix else f"{self.root_folder}/", "max_results": 500}
+            if next_cursor:
+                options["next_cursor"] = next_cursor
+            page = await run_in_threadpool(cloudinary.api.resources, **options)
+            for resource in page.get("resources", []):
+                stat = self._to_stat(resource)
+                if stat:
+                    yield stat
+            next_cursor = page.get("next_cursor")
+            if not next_cursor:
+                break
+
+    async def batch_delete(self, keys: Iterable[str]) -> Dict[str, bool]:
+        ids_to_keys = {self.public_id_for(key): key for key in keys}
+        public_ids = list(ids_to_keys)
+        chunks = [public_ids[i:i + DELETE_BATCH_LIMIT] for i in range(0, len(public_ids), DELETE_BATCH_LIMIT)]
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def delete_chunk(chunk: List[str]) -> Dict[str, str]:
+            async with semaphore:
+                result = await run_in_threadpool(cloudinary.api.delete_resources, chunk)
+                return result.get("deleted", {})
+
+        results: Dict[str, bool] = {}
+        for outcome in await asyncio.gather(*(delete_chunk(chunk) for chunk in chunks)):
+            for public_id, status in outcome.items():
+                if public_id in ids_to_keys:
+                    results[ids_to_keys[public_id]] = status in ("deleted", "not_found")
+        for key in ids_to_keys.values():
+            results.setdefault(key, False)
+        return results
+
+    async def delete_with_variants(self, key: str) -> bool:
+        # Variants are derived on the fly - there is nothing else to remove
+        return await self.delete(key)
+
+    def url_for(self, key: str) -> str:
+        return cloudinary.utils.cloudinary_url(self.public_id_for(key), secure=True)[0]
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if not is_cloudinary_url(url):
+            return None
+        public_id = extract_public_id_from_url(url)
+        return self.key_for_public_id(public_id) if public_id else None
+
+    def _to_stat(self, resource: dict) -> Optional[StorageStat]:
+        key = self.key_for_public_id(resource["public_id"])
+        if key is None:
+            return None
+        created = datetime.strptime(resource["created_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        return StorageStat(key, resource.get("bytes", 0), created.timestamp(), f"image/{resource.get('format', '')}")
@@ -0,0 +1,50 @@
+# app/storage/factory.py
+from typing import Optional
+from app.config import settings
+from app.storage.base import StorageDriver
+from app.storage.local import LocalStorage
+
+_storage: Optional[StorageDriver] = None
+_local_storage: Optional[LocalStorage] = None
+
+def get_local_storage() -> LocalStorage:
+    """The local uploads directory (also used for staging and legacy files)"""
+    global _local_storage
+    if _local_storage is None:
+        _local_storage = LocalStorage(settings.UPLOAD_DIR, "/static/uploads/")
+    return _local_storage
+
+def get_storage() -> StorageDriver:
+    """The configured image storage backend (STORAGE_BACKEND), created once per process"""
+    global _storage
+    if _storage is not None:
+        return _storage
+
+    backend = settings.STORAGE_BACKEND
+    if backend == "local":
+        _storage = get_local_storage()
+    elif backend == "cloudinary":
+        from app.storage.cloudinary import CloudinaryStorage
+        _storage = CloudinaryStorage()
+    elif backend == "s3":
+        from app.storage.s3 import S3Storage
+        _storage = S3Storage(
+            bucket=settings.S3_BUCKET,
+            public_url=settings.S3_PUBLIC_URL or default_s3_public_url(),
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            max_connections=settings.S3_MAX_CONNECTIONS
+        )
+    else:
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    return _storage
+
+def default_s3_public_url() -> str:
+    """Public bucket URL when S3_PUBLIC_URL isn't set"""
+    if settings.S3_ENDPOINT_URL:
+        return f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{settings.S3_BUCKET}"
+    if settings.S3_REGION:
+        return f"https://{settings.S3_BUCKET}.s3.{settings.S3_REGION}.amazonaws.com"
+    return f"https://{settings.S3_BUCKET}.s3.amazonaws.com"
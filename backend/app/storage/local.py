@@ -0,0 +1,94 @@
+# app/storage/local.py
+import os
+import shutil
+import uuid
+from typing import AsyncIterator, Optional
+from starlette.concurrency import run_in_threadpool
+from app.storage.base import StorageDriver, StorageStat
+
+class LocalStorage(StorageDriver):
+    """
+    Files under a local directory served by the app's /static mount.
+    Blocking file I/O runs on worker threads so the event loop never waits on disk.
+    """
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/") + "/"
+
+    def path_for(self, key: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"Key escapes the storage root: {key}")
+        return path
+
+    async def put(self, key: str, source_path: str, content_type: Optional[str] = None) -> str:
+        await run_in_threadpool(self._copy, source_path, self.path_for(key))
+        return self.url_for(key)
+
+    @staticmethod
+    def _copy(source_path: str, dest_path: str):
+        # Copy to a temp name first so readers never see a partial file
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def get(self, key: str) -> bytes:
+        def read():
+            with open(self.path_for(key), "rb") as f:
+                return f.read()
+        return await run_in_threadpool(read)
+
+    async def delete(self, key: str) -> bool:
+        def remove():
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+            return True
+        return await run_in_threadpool(remove)
+
+    async def stat(self, key: str) -> Optional[StorageStat]:
+        def read_stat():
+            try:
+                stat = os.stat(self.path_for(key))
+            except FileNotFoundError:
+                return None
+            return StorageStat(key, stat.st_size, stat.st_mtime)
+        return await run_in_threadpool(read_stat)
+
+    async def list(self, prefix: str = "") -> AsyncIterator[StorageStat]:
+        # Only walk the directory the prefix points into
+        start = os.path.join(self.root, os.path.dirname(prefix))
+        walker = os.walk(start)
+        while True:
+            step = await run_in_threadpool(next, walker, None)
+            if step is None:
+                break
+            directory, _, files = step
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield StorageStat(key, stat.st_size, stat.st_mtime)
+
+    def url_for(self, key: str) -> str:
+        return f"{self.base_url}{key}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if url and url.startswith(self.base_url):
+            return url[len(self.base_url):]
+        return None
@@ -0,0 +1,132 @@
+# app/storage/s3.py
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.storage.base import StorageDriver, StorageStat, guess_content_type
+from app.utils.logging import log_info
+
+# delete_objects accepts at most 1000 keys per call
+DELETE_BATCH_LIMIT = 1000
+
+# Content-addressed keys never change content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class S3Storage(StorageDriver):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, R2, ...).
+
+    One boto3 client is shared for the process, so HTTP connections are
+    pooled and reused. Large files are sent as parallel multipart uploads,
+    and batch deletes use the bulk delete_objects API.
+    """
+    name = "s3"
+    remote = True
+
+    def __init__(
+        self,
+        bucket: str,
+        public_url: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        max_connections: int = 20,
+        multipart_threshold: int = 8 * 1024 * 1024
+    ):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/") + "/"
+        config = Config(
+            max_pool_connections=max_connections,
+            retries={"max_attempts": 3, "mode": "standard"},
+            # Path-style addressing works with local stand-ins like MinIO
+            s3={"addressing_style": "path"} if endpoint_url else None
+        )
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            config=config
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold,
+            max_concurrency=4
+        )
+
+    async def put(self, key: str, source_path: str, content_type: Optional[str] = None) -> str:
+        extra_args = {"ContentType": content_type or guess_content_type(key)}
+        if key.startswith("cas/"):
+            extra_args["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+        # upload_file switches to multipart above the threshold
+        await run_in_threadpool(
+            self.client.upload_file, source_path, self.bucket, key,
+            ExtraArgs=extra_args, Config=self.transfer_config
+        )
+        log_info(f"Uploaded to S3: {self.bucket}/{key}")
+        return self.url_for(key)
+
+    async def get(self, key: str) -> bytes:
+        def download():
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return await run_in_threadpool(download)
+
+    async def delete(self, key: str) -> bool:
+        await run_in_threadpool(self.client.delete_object, Bucket=self.bucket, Key=key)
+        return True
+
+    async def stat(self, key: str) -> Optional[StorageStat]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await run_in_threadpool(self.client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StorageStat(key, head["ContentLength"], head["LastModified"].timestamp(), head.get("ContentType"))
+
+    async def list(self, prefix: str = "") -> AsyncIterator[StorageStat]:
+        options = {"Bucket": self.bucket, "Prefix": prefix, "MaxKeys": 1000}
+        while True:
+            page = await run_in_threadpool(self.client.list_objects_v2, **options)
+            for item in page.get("Contents", []):
+                yield StorageStat(item["Key"], item["Size"], item["LastModified"].timestamp())
+            if not page.get("IsTruncated"):
+                break
+            options["ContinuationToken"] = page["NextContinuationToken"]
+
+    async def batch_delete(self, keys: Iterable[str]) -> Dict[str, bool]:
+        keys = list(keys)
+        chunks = [keys[i:i + DELETE_BATCH_LIMIT] for i in range(0, len(keys), DELETE_BATCH_LIMIT)]
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def delete_chunk(chunk: List[str]) -> List[str]:
+            async with semaphore:
+                result = await run_in_threadpool(
+                    self.client.delete_objects,
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True}
+                )
+                return [error["Key"] for error in result.get("Errors", [])]
+
+        failed = set()
+        for errors in await asyncio.gather(*(delete_chunk(chunk) for chunk in chunks)):
+            failed.update(errors)
+        return {key: key not in failed for key in keys}
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}{key}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if url and url.startswith(self.public_url):
+            return url[len(self.public_url):]
+        return None
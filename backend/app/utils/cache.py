@@ -3,6 +3,7 @@ import time
 import functools
 import hashlib
 import inspect
+from contextvars import ContextVar
 from typing import Dict, Any, Callable, Optional
 from app.config import settings
 
@@ -48,6 +49,14 @@ class Cache:
         if key in self.cache:
             del self.cache[key]
     
+    def delete_prefix(self, prefix: str):
+        """
+        Remove all keys starting with prefix
+        """
+        for key in list(self.cache.keys()):
+            if key.startswith(prefix):
+                self.delete(key)
+    
     def clear(self):
         """
         Clear the entire cache
@@ -75,6 +84,30 @@ def cache_cleanup_task():
 
 threading.Thread(target=cache_cleanup_task, daemon=True).start()
 
+# Per-request record of cache hits/misses, used e.g. by rate limiting to
+# exempt responses that never reached the database
+_cache_events: ContextVar[Optional[Dict[str, int]]] = ContextVar("cache_events", default=None)
+
+def track_cache_events() -> Dict[str, int]:
+    """
+    Start recording cache hits and misses for the current request.
+    The returned dict is shared with the request's context and filled in
+    as cached functions run.
+    """
+    events = {"hits": 0, "misses": 0}
+    _cache_events.set(events)
+    return events
+
+def record_cache_event(hit: bool):
+    """Record a cache hit or miss for the current request, if tracked"""
+    events = _cache_events.get()
+    if events is not None:
+        events["hits" if hit else "misses"] += 1
+
+def served_from_cache(events: Optional[Dict[str, int]]) -> bool:
+    """True when the request was answered only from cached values"""
+    return bool(events) and events["hits"] > 0 and events["misses"] == 0
+
 def cached(ttl: Optional[int] = None):
     """
     Decorator for caching function results (works with both sync and async functions)
@@ -96,14 +129,17 @@ def cached(ttl: Optional[int] = None):
                     if isinstance(v, (str, int, float, bool, type(None))):
                         key_parts.append(f"{k}={v}")
             
-            cache_key = hashlib.md5(":".join(key_parts).encode()).hexdigest()
+            # Keep the function name readable so clear_cache can match on it
+            cache_key = f"{func.__name__}:{hashlib.md5(':'.join(key_parts).encode()).hexdigest()}"
             
             # Check cache
             cached_result = cache.get(cache_key)
             if cached_result is not None:
+                record_cache_event(hit=True)
                 return cached_result
             
             # Execute function and cache result
+            record_cache_event(hit=False)
             result = func(*args, **kwargs)
             cache.set(cache_key, result, ttl)
             
@@ -112,10 +148,7 @@ def cached(ttl: Optional[int] = None):
         # Add cache clear method
         def clear_cache():
             # Clear all cache entries for this function
-            prefix = func.__name__
-            for key in list(cache.cache.keys()):
-                if key.startswith(prefix):
-                    cache.delete(key)
+            cache.delete_prefix(f"{func.__name__}:")
         
         # Use setattr to avoid type checker issues
         setattr(wrapper, 'clear_cache', clear_cache)
@@ -1,10 +1,9 @@
 # app/utils/cloudinary_handler.py
 import cloudinary
-import cloudinary.uploader
 from app.config import settings
-from app.utils.logging import log_info, log_error, log_warning
+from app.utils.logging import log_info, log_error
 import re
-from typing import Tuple, Optional
+from typing import Optional
 
 # Configure Cloudinary
 cloudinary.config(
@@ -12,60 +11,8 @@ cloudinary.config(
     api_key=settings.CLOUDINARY_API_KEY,
     api_secret=settings.CLOUDINARY_API_SECRET
 )
-
-def upload_to_cloudinary(file, folder_name: str) -> Tuple[str, str]:
-    """
-    Upload file to Cloudinary
-    Returns: (secure_url, public_id)
-    """
-    try:
-        # Reset file pointer to beginning
-        file.file.seek(0)
-        
-        result = cloudinary.uploader.upload(
-            file.file,
-            folder=f"paintcompany/{folder_name}",
-            resource_type="auto",
-            use_filename=True,
-            unique_filename=True,
-            overwrite=False
-        )
-        
-        log_info(f"Successfully uploaded to Cloudinary: {result['public_id']}")
-        return result['secure_url'], result['public_id']
-        
-    except Exception as e:
-        log_error(f"Failed to upload to Cloudinary: {e}")
-        raise Exception(f"Cloudinary upload failed: {str(e)}")
-
-def delete_from_cloudinary(image_url: str) -> bool:
-    """Delete image from Cloudinary using URL"""
-    if not image_url:
-        log_info("No image URL provided for deletion")
-        return True  # Consider it successful if no URL
-    
-    if "cloudinary.com" not in image_url:
-        log_warning(f"Not a Cloudinary URL, skipping: {image_url}")
-        return True  # Not a Cloudinary image, consider it successful
-    
-    try:
-        # Extract public_id from Cloudinary URL
-        public_id = extract_public_id_from_url(image_url)
-        
-        if public_id:
-            log_info(f"Attempting to delete Cloudinary image with public_id: {public_id}")
-            result = cloudinary.uploader.destroy(public_id)
-            
-            success = result.get('result') in ['ok', 'not found']
-            log_info(f"Cloudinary deletion result: {result} - Success: {success}")
-            return success
-        else:
-            log_error(f"Could not extract public_id from URL: {image_url}")
-            return False
-            
-    except Exception as e:
-        log_error(f"Failed to delete from Cloudinary: {e}")
-        return False
+if settings.CLOUDINARY_UPLOAD_PREFIX:
+    cloudinary.config(upload_prefix=settings.CLOUDINARY_UPLOAD_PREFIX)
 
 def extract_public_id_from_url(url: str) -> Optional[str]:
     """Extract public_id from Cloudinary URL"""
@@ -97,17 +44,6 @@ def extract_public_id_from_url(url: str) -> Optional[str]:
         log_error(f"Error extracting public_id: {e}")
         return None
 
-def get_folder_name_from_directory(directory: str) -> str:
-    """Convert directory path to Cloudinary folder name"""
-    if "popular_products" in directory:
-        return "popular_products"
-    elif "new_arrivals" in directory:
-        return "new_arrivals"
-    elif "products" in directory:
-        return "products"
-    else:
-        return "general"
-
 def is_cloudinary_url(url: str) -> bool:
     """Check if URL is a Cloudinary URL"""
     if not url:
@@ -0,0 +1,73 @@
+# app/utils/color_index.py
+import threading
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+from app.database import DatabaseConnection
+from app.utils.colors import color_to_lab, rgb_to_lab, unpack_rgb
+from app.utils.logging import log_info
+
+class ColorIndex:
+    """
+    In-memory nearest-colour index over every product's image colours.
+
+    All colours live in one (N, 3) Lab matrix with a parallel array of product
+    IDs, so a search is a single vectorized distance computation. The index
+    is rebuilt from the database after `ttl` seconds or once invalidated.
+    """
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._lab = np.empty((0, 3), dtype=np.float32)
+        self._product_ids = np.empty(0, dtype=np.int64)
+        self._built_at: Optional[float] = None
+
+    def invalidate(self):
+        """Rebuild on the next search (called when product images change)"""
+        with self._lock:
+            self._built_at = None
+
+    def search(self, color: int, tolerance: float) -> List[Tuple[int, float]]:
+        """
+        Products with an image colour within `tolerance` (delta E, CIE76) of
+        `color`, nearest first: [(product_id, distance), ...]
+        """
+        lab, product_ids = self._snapshot()
+        if not len(product_ids):
+            return []
+
+        distances = np.linalg.norm(lab - np.asarray(color_to_lab(color), dtype=np.float32), axis=1)
+        matches = np.flatnonzero(distances <= tolerance)
+        if not len(matches):
+            return []
+
+        # Sort by distance, then keep each product's first (closest) colour
+        matches = matches[np.argsort(distances[matches], kind="stable")]
+        _, first = np.unique(product_ids[matches], return_index=True)
+        best = matches[np.sort(first)]
+        return [(int(product_ids[i]), float(distances[i])) for i in best]
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if self._built_at is None or time.time() - self._built_at > self.ttl:
+                self._lab, self._product_ids = self._load()
+                self._built_at = time.time()
+            return self._lab, self._product_ids
+
+    @staticmethod
+    def _load() -> Tuple[np.ndarray, np.ndarray]:
+        with DatabaseConnection() as cursor:
+            cursor.execute(
+                "SELECT id, image_colors FROM products WHERE cardinality(image_colors) > 0"
+            )
+            rows = cursor.fetchall()
+
+        counts = [len(row["image_colors"]) for row in rows]
+        product_ids = np.repeat(np.array([row["id"] for row in rows], dtype=np.int64), counts)
+        packed = np.fromiter((c for row in rows for c in row["image_colors"]), dtype=np.int64, count=sum(counts))
+        lab = rgb_to_lab(unpack_rgb(packed)).astype(np.float32)
+        log_info(f"Built product colour index: {len(rows)} products, {len(packed)} colours")
+        return lab, product_ids
+
+# Create index instance
+color_index = ColorIndex()
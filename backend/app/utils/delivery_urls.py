@@ -0,0 +1,67 @@
+# app/utils/delivery_urls.py
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+from app.config import settings
+
+# Cloudinary stores and returns the original upload; delivery URLs can ask
+# its CDN for a resized, re-encoded copy instead. f_auto picks WebP/AVIF per
+# browser, q_auto picks the quality, c_limit never upscales.
+#
+# Public endpoints rewrite image URLs on the way out. Other URLs (local
+# storage, S3, staged uploads) pass through unchanged.
+
+# Default display width per endpoint when the client doesn't send img_width
+DELIVERY_WIDTHS = {
+    "products": 640,
+    "products_by_category": 320,
+    "popular_products": 640,
+    "new_arrivals": 1024,
+    "new_arrivals_featured": 1600,
+    "related_products": 320,
+    "product_detail": 1024,
+}
+
+CLOUDINARY_UPLOAD_MARKER = "/image/upload/"
+
+# A path segment that is already a transformation, e.g. "c_limit,w_320,f_webp"
+TRANSFORMATION_SEGMENT = re.compile(r"^[a-z]{1,3}_[^/,]+(?:,[a-z]{1,3}_[^/,]+)*$")
+
+def delivery_width(endpoint: str, requested: Optional[int] = None) -> int:
+    """
+    Width to deliver: the client's img_width rounded up to the next variant
+    width, so only a few distinct URLs (and CDN derivatives) exist per image.
+    """
+    widths = settings.IMAGE_VARIANT_WIDTHS
+    if not requested:
+        return DELIVERY_WIDTHS.get(endpoint, widths[-1])
+    for width in widths:
+        if width >= requested:
+            return width
+    return widths[-1]
+
+def optimize_image_url(url: Optional[str], width: int) -> Optional[str]:
+    """Cloudinary delivery URL with f_auto,q_auto and a width limit; other URLs unchanged"""
+    if not url or CLOUDINARY_UPLOAD_MARKER not in url or "cloudinary.com" not in url:
+        return url
+    head, asset = url.split(CLOUDINARY_UPLOAD_MARKER, 1)
+    return f"{head}{CLOUDINARY_UPLOAD_MARKER}{_transformed_asset_path(asset, width)}"
+
+@lru_cache(maxsize=4096)
+def _transformed_asset_path(asset: str, width: int) -> str:
+    """
+    Memoized per (asset path, width). The asset path is "v<version>/<public_id>.<ext>",
+    so a re-upload (new version) gets a new entry instead of a stale one.
+    """
+    first_segment = asset.split("/", 1)[0]
+    if TRANSFORMATION_SEGMENT.match(first_segment):
+        return asset  # Already transformed (e.g. a variant URL)
+    return f"f_auto,q_auto,c_limit,w_{width}/{asset}"
+
+def optimize_record_images(records: Iterable[Dict[str, Any]], width: int, fields: Iterable[str] = ("image_url",)) -> None:
+    """Rewrite image URL fields of response records in place"""
+    fields = tuple(fields)
+    for record in records:
+        for field in fields:
+            if record.get(field):
+                record[field] = optimize_image_url(record[field], width)
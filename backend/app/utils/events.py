@@ -0,0 +1,203 @@
+# app/utils/events.py
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+import psycopg2
+import psycopg2.extensions
+from app.config import settings
+from app.utils.logging import log_info, log_warning
+
+# Live catalogue change notifications for Server-Sent Events clients.
+#
+# Triggers on the catalogue tables pg_notify() a small JSON payload on
+# CHANGES_CHANNEL when a write commits, whichever process made it. With
+# EVENTS_DATABASE_URL set, each worker keeps one LISTEN connection on it and
+# fans notifications out to its connected clients. LISTEN needs a session:
+# the Supabase transaction pooler accepts it but never delivers anything,
+# which a probe notification detects at connect time.
+#
+# Without a working listener the admin write paths publish their own changes
+# through notify_change(), which covers writes made by this process (the app
+# runs as a single process). While a listener is up, notify_change() does
+# nothing, so changes aren't sent twice.
+#
+# A client is just a small bounded queue of pre-encoded messages; one timer
+# per worker queues the heartbeats, so idle connections cost no per-client
+# tasks or timers.
+
+CHANGES_CHANNEL = "catalog_changes"
+
+# Messages buffered per client before it counts as too slow to keep up
+CLIENT_QUEUE_SIZE = 64
+HEARTBEAT_SECONDS = 15
+RECONNECT_MAX_SECONDS = 60
+MAX_EVENT_CLIENTS = 5000
+
+# Sent by the listener to itself; if it doesn't come back, LISTEN doesn't work on this connection
+PROBE_PAYLOAD = '{"probe":true}'
+PROBE_SECONDS = 5
+
+HEARTBEAT = ": heartbeat\n\n"
+# Sent instead of the backlog to a client that fell behind, and to everyone
+# after the listener reconnects: notifications may have been missed, so
+# clients should refetch (or call /api/sync)
+RESET = "event: reset\ndata: {}\n\n"
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return "\n".join(lines) + "\n\n"
+
+class ListenUnavailable(Exception):
+    """The listen connection accepts LISTEN but doesn't deliver notifications"""
+
+class EventBroadcaster:
+    """
+    Fans change notifications out to subscribed clients. The listener starts
+    with the first subscriber and reconnects with backoff if the database
+    connection drops; without one, only heartbeats are timed here.
+    """
+    def __init__(self, queue_size: int = CLIENT_QUEUE_SIZE, heartbeat: float = HEARTBEAT_SECONDS, listen_dsn: str = ""):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.listen_dsn = listen_dsn
+        self._clients: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listening = False
+        self._last_id = 0
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._clients.add(queue)
+        self._loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._clients.discard(queue)
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        self._last_id += 1
+        self._send(format_event(event, data, self._last_id))
+
+    def notify_change(self, table: str, op: str, record_id: int):
+        """
+        Publish a write made by this process, unless the listener will
+        deliver it. Safe from any thread. Delivery is deferred to the event
+        loop, so an async route may call this inside its DatabaseConnection
+        block: clients hear about it once the block has committed.
+        """
+        if self._listening or self._loop is None or not self._clients:
+            return
+        self._loop.call_soon_threadsafe(self.publish, "change", {"table": table, "op": op, "id": record_id})
+
+    def _send(self, message: str):
+        for queue in self._clients:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Backpressure: drop the backlog of a client that isn't reading
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESET)
+
+    def _send_heartbeat(self):
+        for queue in self._clients:
+            if queue.empty():
+                queue.put_nowait(HEARTBEAT)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        delay = 1
+        while self._clients:
+            if not self.listen_dsn:
+                # Changes arrive through notify_change(); just keep connections alive
+                await asyncio.sleep(self.heartbeat)
+                self._send_heartbeat()
+                continue
+            try:
+                await self._listen()
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except ListenUnavailable as e:
+                log_warning(f"{e}; publishing this process's changes only")
+                self.listen_dsn = ""
+            except Exception as e:
+                log_warning(f"Change listener lost its connection: {e}; retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+                self._send(RESET)
+
+    async def _listen(self):
+        """LISTEN until the connection fails or the last client leaves"""
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(None, psycopg2.connect, self.listen_dsn)
+        lost = loop.create_future()
+        probed = loop.create_future()
+
+        def drain():
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                if notify.payload == PROBE_PAYLOAD:
+                    if not probed.done():
+                        probed.set_result(None)
+                    continue
+                try:
+                    self.publish("change", json.loads(notify.payload))
+                except ValueError:
+                    log_warning(f"Ignoring malformed change notification: {notify.payload}")
+
+        def on_readable():
+            try:
+                conn.poll()
+            except psycopg2.Error as e:
+                if not lost.done():
+                    lost.set_exception(e)
+                return
+            drain()
+
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            conn.cursor().execute(f"LISTEN {CHANGES_CHANNEL}")
+            loop.add_reader(conn.fileno(), on_readable)
+            conn.cursor().execute("SELECT pg_notify(%s, %s)", (CHANGES_CHANNEL, PROBE_PAYLOAD))
+            drain()
+            try:
+                await asyncio.wait_for(asyncio.shield(probed), PROBE_SECONDS)
+            except asyncio.TimeoutError:
+                raise ListenUnavailable("LISTEN connection delivers no notifications (transaction pooler?)")
+            self._listening = True
+            log_info(f"Listening for catalogue changes ({self.client_count} clients)")
+            while self._clients:
+                try:
+                    await asyncio.wait_for(asyncio.shield(lost), self.heartbeat)
+                except asyncio.TimeoutError:
+                    if conn.closed:
+                        raise psycopg2.InterfaceError("connection closed")
+                    self._send_heartbeat()
+        finally:
+            self._listening = False
+            if not lost.done():
+                lost.cancel()
+            if not probed.done():
+                probed.cancel()
+            try:
+                loop.remove_reader(conn.fileno())
+            except (ValueError, psycopg2.Error):
+                pass
+            conn.close()
+
+# Create broadcaster instance (one per worker process)
+event_broadcaster = EventBroadcaster(listen_dsn=settings.EVENTS_DATABASE_URL)
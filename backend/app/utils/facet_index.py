@@ -0,0 +1,144 @@
+# app/utils/facet_index.py
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.database import DatabaseConnection
+from app.utils.logging import log_info
+
+FACETS = ("category", "stock", "size")
+
+# Sizes in ml/g, so facet values list smallest pack first
+_UNIT_SCALE = {"ml": 1, "L": 1000, "g": 1, "kg": 1000}
+
+class FacetIndex:
+    """
+    In-memory bitmap index for product facet counts.
+
+    Every facet value (category, stock state, pack size) has a boolean
+    bitmap over the catalogue. Filters are ANDed bitmaps and a facet's
+    counts are one AND plus popcount over its (values, products) bitmap
+    matrix, so a facet response needs no GROUP BY queries. Rebuilt after
+    `ttl` seconds or once invalidated.
+    """
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot_data: Optional[Dict[str, Any]] = None
+        self._built_at: Optional[float] = None
+
+    def invalidate(self):
+        """Rebuild on the next query (called when products change)"""
+        with self._lock:
+            self._built_at = None
+
+    def counts(
+        self,
+        selected: Dict[str, Sequence[str]],
+        search: Optional[str] = None,
+        min_price_1l: Optional[float] = None,
+        max_price_1l: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Facet counts for the products matching the filters. Values within a
+        facet are ORed and facets ANDed; each facet is counted without its
+        own selection, so the other values still show what picking them adds.
+        """
+        data = self._snapshot()
+        base = np.ones(data["size"], dtype=bool)
+        if search:
+            term = search.lower()
+            base &= np.fromiter((term in text for text in data["texts"]), dtype=bool, count=data["size"])
+        if min_price_1l is not None:
+            base &= data["price_1l"] >= min_price_1l
+        if max_price_1l is not None:
+            base &= data["price_1l"] <= max_price_1l
+
+        # Bitmap of the products matching each facet's own selection
+        facet_masks = {}
+        for facet in FACETS:
+            values = [v for v in selected.get(facet) or [] if v]
+            if values:
+                positions = [data["positions"][facet][v] for v in values if v in data["positions"][facet]]
+                facet_masks[facet] = data["bitmaps"][facet][positions].any(axis=0)
+
+        facets = {}
+        for facet in FACETS:
+            mask = base.copy()
+            for other, other_mask in facet_masks.items():
+                if other != facet:
+                    mask &= other_mask
+            counts = np.count_nonzero(data["bitmaps"][facet] & mask, axis=1)
+            facets[facet] = [
+                {"value": value, "count": int(count)}
+                for value, count in zip(data["values"][facet], counts)
+            ]
+
+        matching = base
+        for other_mask in facet_masks.values():
+            matching = matching & other_mask
+        return {"total": int(matching.sum()), "facets": facets}
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._built_at is None or time.time() - self._built_at > self.ttl:
+                self._snapshot_data = self._load()
+                self._built_at = time.time()
+            return self._snapshot_data
+
+    @staticmethod
+    def _load() -> Dict[str, Any]:
+        with DatabaseConnection() as cursor:
+            cursor.execute(
+                """
+                SELECT p.id, p.name, p.description, p.category, p.stock,
+                       COALESCE(array_agg(pp.size || pp.unit) FILTER (WHERE pp.product_id IS NOT NULL), '{}') AS sizes,
+                       MAX(pp.amount) FILTER (WHERE pp.size = 1 AND pp.unit = 'L') AS price_1l
+                FROM products p
+                LEFT JOIN product_prices pp ON pp.product_id = p.id
+                GROUP BY p.id
+                ORDER BY p.id
+                """
+            )
+            rows = cursor.fetchall()
+
+        product_values = {
+            "category": [[row["category"]] for row in rows],
+            "stock": [[row["stock"]] if row["stock"] else [] for row in rows],
+            "size": [list(row["sizes"]) for row in rows],
+        }
+        values: Dict[str, List[str]] = {}
+        positions: Dict[str, Dict[str, int]] = {}
+        bitmaps: Dict[str, np.ndarray] = {}
+        for facet, per_product in product_values.items():
+            distinct = {value for product in per_product for value in product}
+            values[facet] = sorted(distinct, key=_size_key) if facet == "size" else sorted(distinct)
+            positions[facet] = {value: i for i, value in enumerate(values[facet])}
+            bitmap = np.zeros((len(values[facet]), len(rows)), dtype=bool)
+            for product, product_facet_values in enumerate(per_product):
+                for value in product_facet_values:
+                    bitmap[positions[facet][value], product] = True
+            bitmaps[facet] = bitmap
+
+        texts = [
+            " ".join(filter(None, (row["name"], row["description"], row["category"]))).lower()
+            for row in rows
+        ]
+        price_1l = np.array(
+            [float(row["price_1l"]) if row["price_1l"] is not None else np.nan for row in rows],
+            dtype=np.float64
+        )
+        log_info(f"Built facet index: {len(rows)} products")
+        return {
+            "size": len(rows), "values": values, "positions": positions, "bitmaps": bitmaps,
+            "texts": texts, "price_1l": price_1l
+        }
+
+def _size_key(label: str) -> Tuple[int, int]:
+    """'500ml' -> (0, 500), '1kg' -> (1, 1000): volumes before weights, smallest first"""
+    number = "".join(c for c in label if c.isdigit())
+    unit = label[len(number):]
+    return (1 if unit in ("g", "kg") else 0, int(number or 0) * _UNIT_SCALE.get(unit, 1))
+
+# Create index instance
+facet_index = FacetIndex()
@@ -1,120 +1,203 @@
 # app/utils/image_handler.py
 import os
 import uuid
-import shutil
-from fastapi import HTTPException, UploadFile
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 from app.utils.logging import log_info, log_warning, log_error
+from app.storage.factory import get_storage, get_local_storage
+from app.utils.image_variants import analyze_upload
+from app.utils.image_store import acquire_blob, release_blob, store_blob
+from app.utils.workers import run_in_process
+from app.utils.jobs import PENDING_URL_PREFIX, is_pending_upload, enqueue_image_delete
 
-# Import Cloudinary functions
-if settings.USE_CLOUDINARY:
-    from app.utils.cloudinary_handler import (
-        upload_to_cloudinary, 
-        delete_from_cloudinary, 
-        get_folder_name_from_directory,
-        is_cloudinary_url
+# Uploads are copied in chunks of this size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def detect_image_type(header: bytes) -> Optional[str]:
+    """
+    Identify an image from its magic bytes.
+    Returns the file extension to store it under, or None if it isn't a supported image.
+    The client's content_type and filename are never trusted.
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return ".gif"
+    if len(header) >= 12 and header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+def file_too_large() -> HTTPException:
+    limit_mb = settings.MAX_IMAGE_SIZE // (1024 * 1024)
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size is {limit_mb}MB."
     )
 
-def validate_image(file: UploadFile) -> bool:
-    """Validate if uploaded file is an image"""
-    allowed_types = ["image/jpeg", "image/jpg", "image/png", "image/webp", "image/gif"]
-    
-    if file.content_type not in allowed_types:
-        return False
-    
-    return True
+async def validate_image(file: UploadFile) -> str:
+    """Validate the uploaded file's size and type. Returns the detected extension."""
+    # The multipart parser records the size while receiving, so no seeking is needed
+    if file.size is not None and file.size > settings.MAX_IMAGE_SIZE:
+        raise file_too_large()
+
+    await file.seek(0)
+    header = await file.read(16)
+    await file.seek(0)
 
-def save_image(file: UploadFile, directory: str) -> str:
-    """Save image - either to Cloudinary or local storage"""
-    if not validate_image(file):
+    extension = detect_image_type(header)
+    if not extension:
         raise HTTPException(status_code=400, detail="Invalid image format. Only JPEG, PNG, WebP, and GIF are allowed.")
-    
-    # Check file size
-    file.file.seek(0, 2)  # Move to end of file
-    file_size = file.file.tell()  # Get file size
-    file.file.seek(0)  # Reset file position
-    
-    if file_size > settings.MAX_IMAGE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large. Maximum size is 5MB.")
-    
-    if settings.USE_CLOUDINARY:
-        try:
-            # Upload to Cloudinary
-            folder_name = get_folder_name_from_directory(directory)
-            log_info(f"Uploading to Cloudinary folder: {folder_name}")
-            
-            secure_url, public_id = upload_to_cloudinary(file, folder_name)
-            log_info(f"Successfully uploaded to Cloudinary: {secure_url}")
-            return secure_url  # Return the Cloudinary URL
-            
-        except Exception as e:
-            log_error(f"Cloudinary upload failed: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
-    else:
-        # Fallback to local storage
-        return save_local_image(file, directory)
+    return extension
+
+async def save_image_with_variants(file: UploadFile, directory: str, directory_type: str) -> Tuple[str, Optional[dict], dict, List[int]]:
+    """
+    Save image into the content-addressed store and build its responsive variants.
+    Returns (image URL, variants payload or None, placeholder, colors).
 
-def save_local_image(file: UploadFile, directory: str) -> str:
-    """Save image to local storage"""
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    Content already in the store only gains a reference - nothing is written
+    or uploaded again. For remote storage new content is staged locally and
+    the staged URL must be passed to enqueue_image_upload once the record is
+    saved. Variant generation never fails the upload - the original is still usable.
+    """
+    extension = await validate_image(file)
+    staged_name = await save_local_image(file, settings.PENDING_UPLOADS_DIR, extension)
+    staged_path = os.path.join(settings.PENDING_UPLOADS_DIR, staged_name)
+
+    try:
+        # One decode gives the hash, the blurred placeholder and the colours
+        digest, placeholder, colors = await run_in_process(analyze_upload, staged_path)
+    except Exception as e:
+        delete_local_image(staged_name, settings.PENDING_UPLOADS_DIR)
+        log_warning(f"Could not decode uploaded image: {e}")
+        raise HTTPException(status_code=400, detail="Invalid image file.")
+
+    existing = await run_in_threadpool(acquire_blob, digest)
+    if existing:
+        delete_local_image(staged_name, settings.PENDING_UPLOADS_DIR)
+        return existing["url"], existing["variants"], placeholder, colors
+
+    storage = get_storage()
+    if storage.remote:
+        # Let the job queue upload it - the admin doesn't wait on the network.
+        # Variants are built once it is uploaded.
+        return get_image_url(staged_name, "pending"), None, placeholder, colors
+
+    try:
+        blob = await store_blob(storage, staged_path, digest, extension)
+    finally:
+        delete_local_image(staged_name, settings.PENDING_UPLOADS_DIR)
+    return blob["url"], blob["variants"], placeholder, colors
+
+async def save_local_image(file: UploadFile, directory: str, extension: str) -> str:
+    """
+    Save image to local storage.
+    Copies the upload in chunks with the file I/O on a worker thread, and gives
+    up with a 413 as soon as MAX_IMAGE_SIZE is exceeded.
+    """
+    unique_filename = f"{uuid.uuid4()}{extension}"
     file_path = os.path.join(directory, unique_filename)
     
     # Create directory if it doesn't exist
     os.makedirs(directory, exist_ok=True)
     
+    buffer = None
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        log_info(f"Successfully saved local image: {unique_filename}")
+        buffer = await run_in_threadpool(open, file_path, "wb")
+        written = 0
+        await file.seek(0)
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            written += len(chunk)
+            if written > settings.MAX_IMAGE_SIZE:
+                raise file_too_large()
+            await run_in_threadpool(buffer.write, chunk)
+        await run_in_threadpool(buffer.close)
+        buffer = None
+        log_info(f"Successfully saved local image: {unique_filename} ({written} bytes)")
         return unique_filename
     except Exception as e:
+        if buffer is not None:
+            buffer.close()
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        if isinstance(e, HTTPException):
+            raise
         log_error(f"Could not save local image {unique_filename}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Could not save image: {str(e)}")
 
-def delete_image(filename_or_url: str, directory: str = None) -> bool:
-    """Delete image - handles both Cloudinary URLs and local files"""
+async def delete_image(filename_or_url: str, directory: str = None) -> bool:
+    """
+    Delete image - accepts a storage URL, a /static URL or a bare filename in `directory`.
+    Shared blobs are only removed with their last reference.
+    """
     if not filename_or_url:
         log_info("No filename or URL provided for image deletion")
         return True  # Consider it successful if no image to delete
     
-    # Check if it's a Cloudinary URL
-    if is_cloudinary_url(filename_or_url):
-        log_info(f"Attempting to delete Cloudinary image: {filename_or_url}")
-        if settings.USE_CLOUDINARY:
-            return delete_from_cloudinary(filename_or_url)
-        else:
-            log_warning("Cloudinary URL provided but Cloudinary is disabled")
-            return True  # Don't fail the operation
-    else:
-        # Handle local file deletion
-        return delete_local_image(filename_or_url, directory)
+    # Staged upload that hasn't been uploaded yet; its upload job sees
+    # the record changed and skips it
+    if is_pending_upload(filename_or_url):
+        return delete_local_image(os.path.basename(filename_or_url), settings.PENDING_UPLOADS_DIR)
+
+    remaining = await run_in_threadpool(release_blob, filename_or_url)
+    if remaining:
+        log_info(f"Image still referenced {remaining} times, keeping it: {filename_or_url}")
+        return True
+
+    storage = get_storage()
+    if storage.remote and storage.key_for_url(filename_or_url) is not None:
+        # Deleting is a slow network call - hand it to the job queue
+        log_info(f"Queueing {storage.name} image deletion: {filename_or_url}")
+        await run_in_threadpool(enqueue_image_delete, filename_or_url)
+        return True
+
+    local = get_local_storage()
+    key = local.key_for_url(filename_or_url)
+    if key is None and directory and "://" not in filename_or_url:
+        key = os.path.relpath(os.path.join(directory, filename_or_url), settings.UPLOAD_DIR).replace(os.sep, "/")
+    if key is None:
+        log_warning(f"Image is not in the configured {storage.name} storage, leaving it: {filename_or_url}")
+        return True  # Don't fail the operation
+
+    try:
+        deleted = await local.delete_with_variants(key)
+        log_info(f"Deleted local image {key}: {deleted}")
+        return deleted
+    except Exception as e:
+        log_error(f"Failed to delete local image {key}: {e}")
+        return False
+
+async def discard_saved_image(image_url: Optional[str]):
+    """
+    Undo save_image_with_variants when the record it was saved for isn't
+    written: the blob reference it took is released (and the file removed
+    with the last one), or the staged upload is deleted
+    """
+    if not image_url:
+        return
+    try:
+        await delete_image(image_url)
+    except Exception as e:
+        log_error(f"Failed to discard unused image {image_url}: {e}")
 
 def delete_local_image(filename: str, directory: str) -> bool:
-    """Delete local image file"""
+    """Delete a single local file, e.g. a staged upload"""
     if not filename or not directory:
         log_warning("Missing filename or directory for local image deletion")
         return True  # Don't fail the operation
         
     file_path = os.path.join(directory, filename)
-    log_info(f"Attempting to delete local image: {file_path}")
-    
-    if not os.path.exists(file_path):
-        log_warning(f"Local image file not found: {file_path}")
-        return True  # File doesn't exist, consider it successful
-    
-    if not os.access(directory, os.W_OK):
-        log_error(f"Directory not writable: {directory}")
-        return False
-    
-    if not os.access(file_path, os.W_OK):
-        log_error(f"File not writable: {file_path}")
-        return False
-    
     try:
         os.remove(file_path)
-        log_info(f"Successfully deleted local image: {file_path}")
         return True
+    except FileNotFoundError:
+        return True  # File doesn't exist, consider it successful
     except Exception as e:
         log_error(f"Failed to delete local image {file_path}: {e}")
         return False
@@ -124,8 +207,8 @@ def get_image_url(filename_or_url: str, directory_type: str) -> str:
     if not filename_or_url:
         return None
     
-    # If it's already a full URL (Cloudinary), return as-is
-    if filename_or_url.startswith(("http://", "https://")):
+    # If it's already a URL (Cloudinary or a staged upload), return as-is
+    if filename_or_url.startswith(("http://", "https://", "/")):
         return filename_or_url
     
     # Otherwise, treat as local file and generate local URL
@@ -135,6 +218,8 @@ def get_image_url(filename_or_url: str, directory_type: str) -> str:
         return f"/static/uploads/new_arrivals/{filename_or_url}"
     elif directory_type == "products":
         return f"/static/uploads/products/{filename_or_url}"
+    elif directory_type == "pending":
+        return f"{PENDING_URL_PREFIX}{filename_or_url}"
     else:
         return None
 
@@ -150,11 +235,11 @@ def check_image_permissions(directory: str) -> dict:
             "writable": os.access(directory, os.W_OK),
             "executable": os.access(directory, os.X_OK),
             "path": directory,
-            "cloudinary_enabled": settings.USE_CLOUDINARY
+            "storage_backend": settings.STORAGE_BACKEND
         }
     except Exception as e:
         return {
             "error": str(e),
             "path": directory,
-            "cloudinary_enabled": settings.USE_CLOUDINARY
+            "storage_backend": settings.STORAGE_BACKEND
         }
\ No newline at end of file
@@ -0,0 +1,147 @@
+# app/utils/image_store.py
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import DatabaseConnection
+from app.storage.base import StorageDriver
+from app.utils.image_variants import (
+    generate_local_variants,
+    build_variants_payload,
+    build_cloudinary_variants,
+    get_image_dimensions
+)
+from app.utils.logging import log_info, log_error
+from app.utils.workers import run_in_process
+
+# Content-addressed image blobs. Every distinct image (by content_hash) is
+# stored once; image_blobs.ref_count tracks how many records point at it.
+# Blob URLs never change content, so they can be cached forever.
+
+def blob_key(digest: str, extension: str) -> str:
+    """Storage key of a blob, fanned out by the first two hex digits"""
+    return f"cas/{digest[:2]}/{digest}{extension}"
+
+def acquire_blob(digest: str) -> Optional[Dict[str, Any]]:
+    """
+    Add a reference to an existing blob.
+    Returns {"url", "variants"} or None if this content hasn't been stored yet.
+    """
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            UPDATE image_blobs
+            SET ref_count = ref_count + 1, updated_at = NOW()
+            WHERE hash = %s
+            RETURNING url, variants
+            """,
+            (digest,)
+        )
+        row = cursor.fetchone()
+    if not row:
+        return None
+    log_info(f"Reusing stored image {digest[:12]} ({row['url']})")
+    return {"url": row["url"], "variants": decode_variants(row["variants"])}
+
+def register_blob(digest: str, url: str, variants: Optional[dict], byte_size: int) -> Dict[str, Any]:
+    """
+    Record a newly stored blob with one reference. If another upload of the
+    same content registered first, that blob gets the reference instead and
+    is returned - the caller should then discard its own copy if the URL differs.
+    """
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO image_blobs (hash, url, variants, byte_size, ref_count)
+            VALUES (%s, %s, %s, %s, 1)
+            ON CONFLICT (hash) DO UPDATE
+            SET ref_count = image_blobs.ref_count + 1, updated_at = NOW()
+            RETURNING url, variants
+            """,
+            (digest, url, json.dumps(variants) if variants else None, byte_size)
+        )
+        row = cursor.fetchone()
+    return {"url": row["url"], "variants": decode_variants(row["variants"])}
+
+def release_blob(url: str) -> Optional[int]:
+    """
+    Drop one reference to the blob stored at `url`.
+    Returns the remaining reference count (the row is removed at zero), or
+    None if the URL isn't a content-addressed blob.
+    """
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            UPDATE image_blobs
+            SET ref_count = GREATEST(ref_count - 1, 0), updated_at = NOW()
+            WHERE url = %s
+            RETURNING hash, ref_count
+            """,
+            (url,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if row["ref_count"] == 0:
+            cursor.execute("DELETE FROM image_blobs WHERE hash = %s AND ref_count = 0", (row["hash"],))
+    log_info(f"Released stored image {row['hash'][:12]}: {row['ref_count']} references left")
+    return row["ref_count"]
+
+def decode_variants(value) -> Optional[dict]:
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+async def store_blob(storage: StorageDriver, staged_path: str, digest: str, extension: str) -> Dict[str, Any]:
+    """
+    Put a staged upload and its variants into storage and register the blob.
+    Returns {"url", "variants"} of the registered blob.
+    """
+    key = blob_key(digest, extension)
+    byte_size = os.path.getsize(staged_path)
+    url = await storage.put(key, staged_path)
+    variants = await build_blob_variants(storage, staged_path, url, digest)
+
+    blob = await run_in_threadpool(register_blob, digest, url, variants, byte_size)
+    if storage.key_for_url(blob["url"]) != key:
+        # The same content was stored first under another extension; use that
+        # copy. The variants have the same names, so only the original goes.
+        await storage.delete(key)
+    return blob
+
+async def build_blob_variants(storage: StorageDriver, staged_path: str, url: str, digest: str) -> Optional[dict]:
+    """
+    Responsive variants for a new blob: transformation URLs when the storage
+    renders them itself, otherwise resized files stored next to the blob.
+    Never fails - the original is still usable without variants.
+    """
+    try:
+        if storage.transforms:
+            width, height = await run_in_threadpool(get_image_dimensions, staged_path)
+            return build_cloudinary_variants(url, width, height)
+
+        workdir = tempfile.mkdtemp(dir=settings.PENDING_UPLOADS_DIR)
+        try:
+            # Decoding and encoding is CPU bound - run it in the worker pool
+            result = await run_in_process(generate_local_variants, staged_path, workdir, digest)
+            entries: List[Tuple[str, int, str]] = [
+                (fmt, width, name) for fmt, files in result["files"].items() for width, name in files
+            ]
+            urls = await asyncio.gather(*(
+                storage.put(f"cas/{digest[:2]}/{name}", os.path.join(workdir, name)) for _, _, name in entries
+            ))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        urls_by_format: Dict[str, List[Tuple[int, str]]] = {}
+        for (fmt, width, _), variant_url in zip(entries, urls):
+            urls_by_format.setdefault(fmt, []).append((width, variant_url))
+        log_info(f"Stored {len(entries)} variants for {digest[:12]}")
+        return build_variants_payload(result["width"], result["height"], urls_by_format)
+    except Exception as e:
+        log_error(f"Failed to generate image variants for {digest[:12]}: {e}")
+        return None
@@ -0,0 +1,308 @@
+# app/utils/image_variants.py
+import base64
+import hashlib
+import io
+import os
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image, ImageOps, features
+from app.config import settings
+
+# Output formats in order of preference for <picture> sources
+VARIANT_FORMATS = {
+    "avif": {"mime": "image/avif", "pil_format": "AVIF"},
+    "webp": {"mime": "image/webp", "pil_format": "WEBP"},
+}
+
+# Placeholder previews: longest side in px and WebP quality (~200-400 bytes)
+PLACEHOLDER_SIZE = 20
+PLACEHOLDER_QUALITY = 50
+
+# Colour extraction: images are sampled down to this size, then quantized
+COLOR_SAMPLE_SIZE = 64
+PALETTE_SIZE = 5
+PALETTE_MIN_SHARE = 0.03  # Ignore colours covering less of the image (edge blends)
+
+def avif_supported() -> bool:
+    """Check if the installed Pillow can encode AVIF"""
+    try:
+        return bool(features.check("avif"))
+    except Exception:
+        return False
+
+def get_variant_formats() -> List[str]:
+    """Formats to generate, best compression first"""
+    formats = []
+    if settings.IMAGE_VARIANT_AVIF and avif_supported():
+        formats.append("avif")
+    formats.append("webp")
+    return formats
+
+def get_variant_widths(original_width: int) -> List[int]:
+    """
+    Widths to generate for an image: every configured width smaller than the
+    original, plus the original width itself if it is below the largest one.
+    Images are never upscaled.
+    """
+    widths = [w for w in settings.IMAGE_VARIANT_WIDTHS if w < original_width]
+    largest = settings.IMAGE_VARIANT_WIDTHS[-1]
+    widths.append(min(original_width, largest))
+    return sorted(set(widths))
+
+def variant_filename(stem: str, width: int, fmt: str) -> str:
+    return f"{stem}_{width}w.{fmt}"
+
+def normalize_image(img: Image.Image) -> Image.Image:
+    """
+    Apply the EXIF orientation and convert to a mode the web encoders accept.
+    The ICC profile is kept so paint colours render accurately.
+    """
+    icc_profile = img.info.get("icc_profile")
+    img = ImageOps.exif_transpose(img)
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    # Drop EXIF/XMP (camera details, GPS) - only the colour profile survives
+    img.info = {"icc_profile": icc_profile} if icc_profile else {}
+    return img
+
+def content_hash(source_path: str) -> str:
+    """
+    SHA-256 of the image content after normalization (EXIF rotation applied,
+    metadata other than the colour profile dropped), so re-encodes and
+    re-uploads of the same shot hash the same. Animated images are hashed
+    as raw bytes.
+    """
+    return analyze_upload(source_path)[0]
+
+def analyze_upload(source_path: str) -> Tuple[str, Dict[str, Any], List[int]]:
+    """
+    Decode an upload once and return (content_hash, placeholder, colors).
+    Runs in a worker process.
+    """
+    with Image.open(source_path) as original:
+        animated = getattr(original, "n_frames", 1) > 1
+        img = normalize_image(original)
+
+    digest = hashlib.sha256()
+    if animated:
+        with open(source_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    else:
+        digest.update(f"{img.mode}:{img.width}x{img.height}:".encode())
+        digest.update(img.info.get("icc_profile") or b"")
+        digest.update(img.tobytes())
+    return digest.hexdigest(), build_placeholder(img), extract_colors(img)
+
+def analyze_image(source_path: str) -> Tuple[Dict[str, Any], List[int]]:
+    """(placeholder, colors) for an image file (used by the backfill). Runs in a worker process."""
+    with Image.open(source_path) as original:
+        img = normalize_image(original)
+    return build_placeholder(img), extract_colors(img)
+
+def build_placeholder(img: Image.Image) -> Dict[str, Any]:
+    """
+    A tiny blurred preview for the UI to paint while the real image loads:
+    {"width": 1600, "height": 1200, "lqip": "data:image/webp;base64,..."}.
+    The dimensions let the page reserve the right box, avoiding layout shift.
+    """
+    preview = img.copy()
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.Resampling.BILINEAR)
+    buffer = io.BytesIO()
+    preview.save(buffer, format="WEBP", quality=PLACEHOLDER_QUALITY, method=6)
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return {"width": img.width, "height": img.height, "lqip": f"data:image/webp;base64,{encoded}"}
+
+def extract_colors(img: Image.Image) -> List[int]:
+    """
+    Dominant colour first, then the rest of the palette, as 0xRRGGBB ints.
+
+    The image is quantized to a few colours. A colour covering most of the
+    border is taken to be the photo's backdrop and left out, unless it is
+    the only colour - otherwise every product shot on white would be "white".
+    """
+    sample = img.copy()
+    sample.thumbnail((COLOR_SAMPLE_SIZE, COLOR_SAMPLE_SIZE), Image.Resampling.BILINEAR)
+    if sample.mode == "RGBA":
+        # Transparent areas count as white backdrop
+        backdrop = Image.new("RGBA", sample.size, (255, 255, 255, 255))
+        backdrop.alpha_composite(sample)
+        sample = backdrop
+    quantized = sample.convert("RGB").quantize(colors=PALETTE_SIZE + 1, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()
+
+    width, height = quantized.size
+    pixels = quantized.load()
+    border = [pixels[x, y] for x in range(width) for y in (0, height - 1)]
+    border += [pixels[x, y] for y in range(1, height - 1) for x in (0, width - 1)]
+    backdrop_index, backdrop_count = Counter(border).most_common(1)[0]
+
+    counts = sorted(quantized.getcolors(), reverse=True)
+    if backdrop_count > len(border) / 2 and len(counts) > 1:
+        counts = [(count, index) for count, index in counts if index != backdrop_index]
+    minimum = width * height * PALETTE_MIN_SHARE
+    by_count = [index for i, (count, index) in enumerate(counts) if i == 0 or count >= minimum]
+
+    colors = []
+    for index in by_count[:PALETTE_SIZE]:
+        r, g, b = palette[index * 3:index * 3 + 3]
+        colors.append((r << 16) | (g << 8) | b)
+    return colors
+
+def get_image_dimensions(source) -> Tuple[int, int]:
+    """Read width/height (after EXIF rotation) without decoding the pixels"""
+    with Image.open(source) as img:
+        width, height = img.size
+        orientation = img.getexif().get(0x0112, 1)
+    # Orientations 5-8 swap the axes
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+    return width, height
+
+def generate_local_variants(source_path: str, directory: str, stem: str) -> Dict[str, Any]:
+    """
+    Resize an uploaded image to the configured widths and encode each size as
+    WebP (and AVIF when enabled). Files are written next to the original as
+    `<stem>_<width>w.<format>`.
+
+    Returns the image dimensions and the generated files per format:
+    {"width": 1600, "height": 1200, "files": {"webp": [(320, "x_320w.webp"), ...]}}
+    """
+    with Image.open(source_path) as original:
+        if getattr(original, "n_frames", 1) > 1:
+            # Animated images are served as uploaded
+            width, height = original.size
+            return {"width": width, "height": height, "files": {}}
+        img = normalize_image(original)
+
+    width, height = img.size
+    files: Dict[str, List[Tuple[int, str]]] = {}
+
+    for target_width in get_variant_widths(width):
+        if target_width == width:
+            resized = img
+        else:
+            target_height = max(1, round(height * target_width / width))
+            resized = img.resize((target_width, target_height), Image.LANCZOS)
+
+        for fmt in get_variant_formats():
+            filename = variant_filename(stem, target_width, fmt)
+            resized.save(
+                os.path.join(directory, filename),
+                VARIANT_FORMATS[fmt]["pil_format"],
+                quality=settings.IMAGE_VARIANT_QUALITY,
+                icc_profile=img.info.get("icc_profile"),
+                exif=b"",
+                xmp=b"",
+            )
+            files.setdefault(fmt, []).append((target_width, filename))
+
+    return {"width": width, "height": height, "files": files}
+
+def build_srcset(entries: List[Tuple[int, str]]) -> str:
+    """Build a srcset attribute value from (width, url) pairs"""
+    return ", ".join(f"{url} {width}w" for width, url in entries)
+
+def build_variants_payload(width: int, height: int, urls_by_format: Dict[str, List[Tuple[int, str]]]) -> Dict[str, Any]:
+    """
+    Shape variant URLs into the structure returned by the API:
+
+    {
+        "width": 1600, "height": 1200,
+        "src": "<largest webp url>",
+        "sources": [{"type": "image/avif", "srcset": "... 320w, ... 640w"},
+                    {"type": "image/webp", "srcset": "..."}]
+    }
+
+    `sources` maps directly onto <picture><source type srcset>, `src` is the
+    fallback for the <img> element.
+    """
+    sources = []
+    for fmt in VARIANT_FORMATS:
+        entries = urls_by_format.get(fmt)
+        if entries:
+            sources.append({"type": VARIANT_FORMATS[fmt]["mime"], "srcset": build_srcset(entries)})
+
+    webp_entries = urls_by_format.get("webp") or []
+    return {
+        "width": width,
+        "height": height,
+        "src": webp_entries[-1][1] if webp_entries else None,
+        "sources": sources,
+    }
+
+def cloudinary_variant_url(secure_url: str, width: int, fmt: str) -> Optional[str]:
+    """Insert a resize/format transformation into a Cloudinary delivery URL"""
+    marker = "/upload/"
+    if marker not in secure_url:
+        return None
+    head, tail = secure_url.split(marker, 1)
+    return f"{head}{marker}c_limit,w_{width},f_{fmt},q_auto/{tail}"
+
+def build_cloudinary_variants(secure_url: str, width: int, height: int) -> Optional[Dict[str, Any]]:
+    """
+    Cloudinary renders variants on demand from transformation URLs, so only
+    the URLs are built here - nothing extra is uploaded. Delivery through a
+    transformation also drops the original's metadata.
+    """
+    urls_by_format: Dict[str, List[Tuple[int, str]]] = {}
+    for fmt in get_variant_formats():
+        entries = []
+        for target_width in get_variant_widths(width):
+            url = cloudinary_variant_url(secure_url, target_width, fmt)
+            if url is None:
+                return None
+            entries.append((target_width, url))
+        urls_by_format[fmt] = entries
+    return build_variants_payload(width, height, urls_by_format)
+
+# MIME types for on-demand transform output formats
+TRANSFORM_MEDIA_TYPES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+}
+
+def render_transform(source_path: str, dest_path: str, width: int, height: int, fmt: str) -> int:
+    """
+    Resize an image to fit within width x height (0 = unconstrained) and encode
+    it as `fmt`. Never upscales. Runs in a worker process, so the result is
+    written to a temp file and atomically moved into place.
+
+    Returns the size of the written file in bytes.
+    """
+    bound_width = width or settings.IMAGE_TRANSFORM_MAX_DIMENSION
+    bound_height = height or settings.IMAGE_TRANSFORM_MAX_DIMENSION
+
+    with Image.open(source_path) as original:
+        # Let the JPEG decoder downscale while decoding; the bound is squared
+        # because EXIF rotation may swap the axes afterwards
+        longest = max(bound_width, bound_height)
+        original.draft("RGB", (longest, longest))
+        img = normalize_image(original)
+
+    img.thumbnail((bound_width, bound_height), Image.LANCZOS)
+
+    if fmt == "jpeg" and img.mode == "RGBA":
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        background.info = img.info
+        img = background
+
+    save_options = {"icc_profile": img.info.get("icc_profile")}
+    if fmt in ("webp", "avif", "jpeg"):
+        save_options["quality"] = settings.IMAGE_VARIANT_QUALITY
+    if fmt == "jpeg":
+        save_options["optimize"] = True
+        save_options["progressive"] = True
+
+    tmp_path = f"{dest_path}.{os.getpid()}.tmp"
+    try:
+        img.save(tmp_path, fmt.upper(), **save_options)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return os.path.getsize(dest_path)
@@ -0,0 +1,333 @@
+# app/utils/jobs.py
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import DatabaseConnection
+from app.utils.events import event_broadcaster
+from app.utils.logging import log_info, log_warning, log_error
+
+# Durable queue for slow image work (uploads to and deletes from remote storage).
+#
+# Jobs are rows in the image_jobs table, so they survive restarts. Workers
+# claim one job at a time with FOR UPDATE SKIP LOCKED, so several app
+# processes can share the queue. A claimed job holds a lease; if the process
+# dies mid-job the lease runs out and another worker picks it up again.
+
+PENDING_URL_PREFIX = "/static/uploads/pending/"
+
+# Tables whose image_url/image_state an upload job may update
+IMAGE_TABLES = ("popular_products", "new_arrivals", "products")
+
+JOB_LEASE_SECONDS = 300
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 3600
+FINISHED_JOB_RETENTION_DAYS = 7
+
+_wake_event: Optional[asyncio.Event] = None
+_worker_tasks: List[asyncio.Task] = []
+
+def is_pending_upload(image_url: Optional[str]) -> bool:
+    """True for images staged locally and still waiting to be uploaded"""
+    return bool(image_url) and image_url.startswith(PENDING_URL_PREFIX)
+
+def image_state_for(image_url: Optional[str]) -> str:
+    """Initial image_state for a record saved with this image URL"""
+    return "pending" if is_pending_upload(image_url) else "ready"
+
+def staged_path_for(image_url: str) -> str:
+    return os.path.join(settings.PENDING_UPLOADS_DIR, os.path.basename(image_url))
+
+def enqueue_job(cursor, kind: str, payload: Dict[str, Any]) -> int:
+    """
+    Add a job using the caller's cursor, so it commits (or rolls back)
+    together with the change that needs it. Returns the job ID.
+    """
+    cursor.execute(
+        "INSERT INTO image_jobs (kind, payload) VALUES (%s, %s) RETURNING id",
+        (kind, json.dumps(payload))
+    )
+    job_id = cursor.fetchone()["id"]
+    log_info(f"Queued {kind} job {job_id}: {payload}")
+    schedule_wakeup()
+    return job_id
+
+def enqueue_image_upload(cursor, table: str, record_id: int, image_url: Optional[str]) -> Optional[int]:
+    """Queue the upload of a staged image to remote storage. No-op for other URLs."""
+    if not is_pending_upload(image_url):
+        return None
+    if table not in IMAGE_TABLES:
+        raise ValueError(f"Unknown image table: {table}")
+    return enqueue_job(cursor, "upload", {"table": table, "record_id": record_id, "image_url": image_url})
+
+def enqueue_image_delete(image_url: str) -> int:
+    """Queue deletion of a remotely stored image in its own transaction"""
+    with DatabaseConnection() as cursor:
+        return enqueue_job(cursor, "delete", {"image_url": image_url})
+
+def schedule_wakeup():
+    """
+    Wake the workers shortly after a job is queued. The delay gives the
+    request's transaction time to commit; the poll interval covers the rest.
+    """
+    if _wake_event is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.call_later(0.5, _wake_event.set)
+
+# -------------------------
+# Job handlers
+# -------------------------
+async def run_upload_job(payload: Dict[str, Any]):
+    """Upload a staged image and point the record at the stored copy"""
+    from app.storage.factory import get_storage
+    from app.utils.image_variants import content_hash
+    from app.utils.image_store import acquire_blob, store_blob, release_blob
+    from app.utils.workers import run_in_process
+
+    table = payload["table"]
+    if table not in IMAGE_TABLES:
+        raise ValueError(f"Unknown image table: {table}")
+    record_id = payload["record_id"]
+    staged_url = payload["image_url"]
+    staged_path = staged_path_for(staged_url)
+
+    if not await run_in_threadpool(still_uses_image, table, record_id, staged_url):
+        log_info(f"Skipping upload for {table} {record_id}: image was replaced or removed")
+        remove_staged_file(staged_path)
+        return
+
+    if not os.path.isfile(staged_path):
+        raise FileNotFoundError(f"Staged image missing: {staged_path}")
+
+    # The same content may have been uploaded since this one was staged
+    digest = await run_in_process(content_hash, staged_path)
+    blob = await run_in_threadpool(acquire_blob, digest)
+    if not blob:
+        extension = os.path.splitext(staged_path)[1].lower()
+        blob = await store_blob(get_storage(), staged_path, digest, extension)
+
+    updated = await run_in_threadpool(point_record_at_blob, table, record_id, staged_url, blob)
+    if updated:
+        log_info(f"Uploaded image for {table} {record_id}: {blob['url']}")
+        invalidate_cached_listings(table, record_id)
+        event_broadcaster.notify_change(table, "update", record_id)
+    elif await run_in_threadpool(release_blob, blob["url"]) == 0:
+        # Replaced or deleted while uploading - nothing else uses the new copy
+        await run_in_threadpool(enqueue_image_delete, blob["url"])
+    remove_staged_file(staged_path)
+
+async def run_delete_job(payload: Dict[str, Any]):
+    from app.storage.factory import get_storage
+
+    storage = get_storage()
+    key = storage.key_for_url(payload["image_url"])
+    if key is None:
+        log_warning(f"Not deleting {payload['image_url']}: not in the {storage.name} storage")
+        return
+    if not await storage.delete_with_variants(key):
+        raise RuntimeError(f"{storage.name} storage refused to delete {payload['image_url']}")
+
+def point_record_at_blob(table: str, record_id: int, staged_url: str, blob: Dict[str, Any]) -> bool:
+    """Swap the staged URL for the stored one, if the record still points at this upload"""
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET image_url = %s, image_variants = %s, image_state = 'ready'
+            WHERE id = %s AND image_url = %s
+            RETURNING id
+            """,
+            (blob["url"], json.dumps(blob["variants"]) if blob["variants"] else None, record_id, staged_url)
+        )
+        return cursor.fetchone() is not None
+
+def fail_upload_job(payload: Dict[str, Any]):
+    """Give up on an upload: the staged copy keeps being served locally"""
+    table = payload.get("table")
+    if table not in IMAGE_TABLES:
+        return
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET image_state = 'failed' WHERE id = %s AND image_url = %s",
+            (payload["record_id"], payload["image_url"])
+        )
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {
+    "upload": run_upload_job,
+    "delete": run_delete_job,
+}
+
+# Called once a job has used up all its attempts
+JOB_FAILURE_HANDLERS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "upload": fail_upload_job,
+}
+
+def still_uses_image(table: str, record_id: int, image_url: str) -> bool:
+    with DatabaseConnection() as cursor:
+        cursor.execute(f"SELECT 1 FROM {table} WHERE id = %s AND image_url = %s", (record_id, image_url))
+        return cursor.fetchone() is not None
+
+def remove_staged_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        log_warning(f"Failed to remove staged image {path}: {e}")
+
+def invalidate_cached_listings(table: str, record_id: int):
+    """Drop cached public listings and the cached record that embed this record's image URLs"""
+    from app.utils.cache import cache
+    from app.utils.product_cache import invalidate_item
+    if table == "products":
+        cache.delete_prefix("get_products")
+        invalidate_item("product", record_id)
+    elif table == "popular_products":
+        invalidate_item("popular_product", record_id)
+    # Home page sections are cached as "home_<table>"
+    cache.delete_prefix(f"home_{table}")
+
+# -------------------------
+# Queue operations
+# -------------------------
+def claim_next_job() -> Optional[Dict[str, Any]]:
+    """Claim the next due job, or a running job whose lease has expired"""
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            UPDATE image_jobs
+            SET status = 'running',
+                attempts = attempts + 1,
+                locked_until = NOW() + make_interval(secs => %s),
+                updated_at = NOW()
+            WHERE id = (
+                SELECT id FROM image_jobs
+                WHERE (status = 'pending' AND run_after <= NOW())
+                   OR (status = 'running' AND locked_until < NOW())
+                ORDER BY run_after, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING *
+            """,
+            (JOB_LEASE_SECONDS,)
+        )
+        job = cursor.fetchone()
+    return dict(job) if job else None
+
+def retry_delay(attempts: int) -> int:
+    """Exponential backoff: 10s, 20s, 40s, ... capped at an hour"""
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+
+async def run_job(job: Dict[str, Any]):
+    """Run a claimed job and record the outcome"""
+    payload = job["payload"]
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+
+    try:
+        handler = JOB_HANDLERS[job["kind"]]
+        await handler(payload)
+    except Exception as e:
+        if job["attempts"] >= settings.IMAGE_JOB_MAX_ATTEMPTS:
+            log_error(f"Image job {job['id']} ({job['kind']}) failed permanently: {e}")
+            await run_in_threadpool(mark_job_failed, job["id"], str(e))
+            on_failure = JOB_FAILURE_HANDLERS.get(job["kind"])
+            if on_failure:
+                try:
+                    await run_in_threadpool(on_failure, payload)
+                except Exception as failure_error:
+                    log_error(f"Failure handler for job {job['id']} raised: {failure_error}")
+        else:
+            delay = retry_delay(job["attempts"])
+            log_warning(f"Image job {job['id']} ({job['kind']}) failed, retrying in {delay}s: {e}")
+            await run_in_threadpool(mark_job_for_retry, job["id"], str(e), delay)
+        return
+
+    await run_in_threadpool(mark_job_done, job["id"])
+    log_info(f"Image job {job['id']} ({job['kind']}) completed")
+
+def mark_job_done(job_id: int):
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            "UPDATE image_jobs SET status = 'done', last_error = NULL, locked_until = NULL, updated_at = NOW() WHERE id = %s",
+            (job_id,)
+        )
+
+def mark_job_failed(job_id: int, error: str):
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            "UPDATE image_jobs SET status = 'failed', last_error = %s, locked_until = NULL, updated_at = NOW() WHERE id = %s",
+            (error, job_id)
+        )
+
+def mark_job_for_retry(job_id: int, error: str, delay: int):
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            UPDATE image_jobs
+            SET status = 'pending', last_error = %s, locked_until = NULL,
+                run_after = NOW() + make_interval(secs => %s), updated_at = NOW()
+            WHERE id = %s
+            """,
+            (error, delay, job_id)
+        )
+
+def purge_finished_jobs():
+    """Remove completed jobs past the retention period (failed ones are kept)"""
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            "DELETE FROM image_jobs WHERE status = 'done' AND updated_at < NOW() - make_interval(days => %s)",
+            (FINISHED_JOB_RETENTION_DAYS,)
+        )
+        if cursor.rowcount:
+            log_info(f"Purged {cursor.rowcount} finished image jobs")
+
+# -------------------------
+# Worker lifecycle
+# -------------------------
+async def job_worker(worker_id: int):
+    """Claim and run jobs until cancelled; sleep until woken or the poll interval passes"""
+    while True:
+        try:
+            job = await run_in_threadpool(claim_next_job)
+            if job:
+                await run_job(job)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_error(f"Image job worker {worker_id} error: {e}")
+
+        _wake_event.clear()
+        try:
+            await asyncio.wait_for(_wake_event.wait(), timeout=settings.IMAGE_JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+async def start_job_workers():
+    """Start the background workers (called on application startup)"""
+    global _wake_event
+    if _worker_tasks:
+        return
+    _wake_event = asyncio.Event()
+    try:
+        await run_in_threadpool(purge_finished_jobs)
+    except Exception as e:
+        log_warning(f"Could not purge finished image jobs: {e}")
+    for worker_id in range(settings.IMAGE_JOB_WORKERS):
+        _worker_tasks.append(asyncio.create_task(job_worker(worker_id)))
+    log_info(f"Started {settings.IMAGE_JOB_WORKERS} image job workers")
+
+async def stop_job_workers():
+    """Cancel the workers; claimed jobs are picked up again once their lease expires"""
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
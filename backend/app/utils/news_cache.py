@@ -0,0 +1,65 @@
+# app/utils/news_cache.py
+import json
+from datetime import date, datetime, time as dt_time
+from typing import Any, Callable, Dict, Optional
+from app.database import DatabaseConnection
+from app.utils.cache import cache, record_cache_event
+
+# Cache for the public news and events queries. "Current" lists are filtered
+# on today's date, but their result only changes when an event's end_date
+# passes or its date arrives, or when an admin edits news. Entries expire at
+# local midnight of the next such boundary, so an expired event is never
+# served, and admin writes drop them all. MAX_NEWS_TTL bounds how long other
+# worker processes (when running several) may serve an edited item.
+
+NEWS_CACHE_PREFIX = "news_events:"
+MAX_NEWS_TTL = 6 * 3600
+
+_BOUNDARY_KEY = f"{NEWS_CACHE_PREFIX}boundary"
+
+def next_news_boundary(today: date) -> Optional[date]:
+    """First day after `today` on which an event expires or starts, None if there is none"""
+    entry = cache.get(_BOUNDARY_KEY)
+    if entry is not None and entry["today"] == today:
+        return entry["boundary"]
+
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            """
+            SELECT MIN(boundary) AS boundary FROM (
+                SELECT end_date + 1 AS boundary FROM news_events WHERE end_date >= %s
+                UNION ALL
+                SELECT date AS boundary FROM news_events WHERE date > %s
+            ) boundaries
+            """,
+            (today, today)
+        )
+        boundary = cursor.fetchone()["boundary"]
+    cache.set(_BOUNDARY_KEY, {"today": today, "boundary": boundary}, news_ttl(boundary))
+    return boundary
+
+def news_ttl(boundary: Optional[date]) -> float:
+    """Seconds until local midnight starting `boundary`, capped at MAX_NEWS_TTL"""
+    if boundary is None:
+        return MAX_NEWS_TTL
+    remaining = (datetime.combine(boundary, dt_time.min) - datetime.now()).total_seconds()
+    return max(0.0, min(float(MAX_NEWS_TTL), remaining))
+
+def get_news(name: str, params: Dict[str, Any], load: Callable[[date], Any]) -> Any:
+    """Cached result of `load(today)` for this query, valid until the next news boundary"""
+    key = f"{NEWS_CACHE_PREFIX}{name}:{json.dumps(params, sort_keys=True, default=str)}"
+    value = cache.get(key)
+    if value is not None:
+        record_cache_event(hit=True)
+        return value
+
+    record_cache_event(hit=False)
+    today = date.today()
+    boundary = next_news_boundary(today)
+    value = load(today)
+    cache.set(key, value, news_ttl(boundary))
+    return value
+
+def invalidate_news():
+    """Drop every cached news query (called on admin writes)"""
+    cache.delete_prefix(NEWS_CACHE_PREFIX)
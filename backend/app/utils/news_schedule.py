@@ -0,0 +1,132 @@
+# app/utils/news_schedule.py
+import asyncio
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import DatabaseConnection
+from app.utils.events import event_broadcaster
+from app.utils.logging import log_error, log_info
+from app.utils.news_cache import invalidate_news
+
+# Scheduled publishing for news and events. news_events.published is the
+# stored visibility that public queries filter on; a trigger sets it from
+# publish_at/unpublish_at on every write, and the scheduler below flips it
+# when one of those moments arrives.
+#
+# The moments are TIMESTAMPTZ. Admin input without an offset is taken as
+# LOCAL_TIMEZONE time (see schedule_time).
+#
+# Each process keeps one timer heap of upcoming publish/unpublish moments,
+# loaded at startup and again after admin edits or a timer firing. Each load
+# also reads the database clock, and the heap is timed against it, so the
+# app's clock doesn't need to agree; a timer that fires early just finds
+# nothing due and is re-armed for the remainder.
+
+# Whether a row should be visible now (matches the set_news_published trigger)
+PUBLISHED_SQL = (
+    "(publish_at IS NULL OR publish_at <= now()) "
+    "AND (unpublish_at IS NULL OR unpublish_at > now())"
+)
+
+RETRY_SECONDS = 30
+
+def schedule_time(value: Optional[datetime]) -> Optional[datetime]:
+    """An admin-entered moment as an aware datetime; naive values are LOCAL_TIMEZONE time"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=ZoneInfo(settings.LOCAL_TIMEZONE))
+
+def apply_publication_schedule() -> Tuple[List[int], List[Tuple[datetime, int]], timedelta]:
+    """
+    Flip `published` on rows whose moment has passed and return (flipped
+    IDs, [(moment, news ID), ...] for upcoming moments, database clock
+    minus app clock)
+    """
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE news_events SET published = {PUBLISHED_SQL}
+            WHERE published IS DISTINCT FROM ({PUBLISHED_SQL})
+            RETURNING id
+            """
+        )
+        flipped = [row["id"] for row in cursor.fetchall()]
+        cursor.execute("SELECT clock_timestamp() AS now")
+        clock_offset = cursor.fetchone()["now"] - datetime.now(timezone.utc)
+        cursor.execute(
+            """
+            SELECT id, publish_at AS moment FROM news_events WHERE publish_at > now()
+            UNION ALL
+            SELECT id, unpublish_at AS moment FROM news_events WHERE unpublish_at > now()
+            """
+        )
+        upcoming = [(row["moment"], row["id"]) for row in cursor.fetchall()]
+    return flipped, upcoming, clock_offset
+
+class PublicationScheduler:
+    """
+    A single in-process timer over the upcoming publish/unpublish moments.
+    No queries run between moments; each firing runs one UPDATE and reloads
+    the heap.
+    """
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def reschedule(self):
+        """
+        Reload the timers after a news write. Call from the admin route
+        before its transaction commits: the timer task can only run once
+        the route hands control back to the event loop, after the commit.
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        fired = False
+        while True:
+            self._wake.clear()
+            try:
+                flipped, upcoming, clock_offset = await run_in_threadpool(apply_publication_schedule)
+                self._heap = upcoming
+                heapq.heapify(self._heap)
+                # With several workers another one may have flipped the rows
+                # first, so a timer that fired always drops this worker's cache
+                if flipped or fired:
+                    invalidate_news()
+                if flipped:
+                    log_info(f"Publication schedule flipped news {flipped}")
+                    for news_id in flipped:
+                        event_broadcaster.notify_change("news_events", "update", news_id)
+                delay = None
+                if self._heap:
+                    db_now = datetime.now(timezone.utc) + clock_offset
+                    delay = max(0.0, (self._heap[0][0] - db_now).total_seconds())
+            except Exception as e:
+                log_error(f"Could not apply the news publication schedule: {e}")
+                delay = RETRY_SECONDS
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+                fired = False
+            except asyncio.TimeoutError:
+                fired = True
+
+# Create scheduler instance (one per worker process)
+news_scheduler = PublicationScheduler()
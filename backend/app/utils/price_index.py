@@ -0,0 +1,75 @@
+# app/utils/price_index.py
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.database import DatabaseConnection
+from app.utils.prices import PRICE_FIELDS, parse_price
+from app.utils.logging import log_info
+
+class PriceIndex:
+    """
+    In-memory numeric price table for every product.
+
+    Prices are parsed once into an (N, len(PRICE_FIELDS)) matrix of paise
+    (NaN where a size isn't sold) with coverage rates alongside, so a quote
+    over many products is a few array lookups instead of a query per line.
+    The table is rebuilt after `ttl` seconds or once invalidated.
+    """
+    def __init__(self, ttl: int = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._positions: Dict[int, int] = {}
+        self._names: List[str] = []
+        self._prices = np.empty((0, len(PRICE_FIELDS)), dtype=np.float64)
+        self._coverage = np.empty(0, dtype=np.float64)
+        self._built_at: Optional[float] = None
+
+    def invalidate(self):
+        """Rebuild on the next lookup (called when products change)"""
+        with self._lock:
+            self._built_at = None
+
+    def lookup(self, product_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Optional[str]]]:
+        """
+        (found mask, coverage rates, price rows, names) for `product_ids`, in
+        order. Unknown products get NaN coverage and prices and a None name.
+        """
+        positions_by_id, names, prices, coverage = self._snapshot()
+        positions = np.array([positions_by_id.get(int(pid), -1) for pid in product_ids], dtype=np.int64)
+        found = positions >= 0
+
+        # Row N of the padded arrays is all-NaN for unknown products
+        padded_prices = np.vstack([prices, np.full((1, prices.shape[1]), np.nan)])
+        padded_coverage = np.append(coverage, np.nan)
+        rows = np.where(found, positions, len(names))
+        return found, padded_coverage[rows], padded_prices[rows], [names[p] if p >= 0 else None for p in positions]
+
+    def _snapshot(self):
+        with self._lock:
+            if self._built_at is None or time.time() - self._built_at > self.ttl:
+                self._positions, self._names, self._prices, self._coverage = self._load()
+                self._built_at = time.time()
+            return self._positions, self._names, self._prices, self._coverage
+
+    @staticmethod
+    def _load():
+        with DatabaseConnection() as cursor:
+            cursor.execute(f"SELECT id, name, coverage_rate, {', '.join(PRICE_FIELDS)} FROM products ORDER BY id")
+            rows = cursor.fetchall()
+
+        positions = {row["id"]: i for i, row in enumerate(rows)}
+        names = [row["name"] for row in rows]
+        prices = np.array(
+            [[parse_price(row[field]) or np.nan for field in PRICE_FIELDS] for row in rows],
+            dtype=np.float64
+        ).reshape(len(rows), len(PRICE_FIELDS))
+        coverage = np.array(
+            [float(row["coverage_rate"]) if row["coverage_rate"] else np.nan for row in rows],
+            dtype=np.float64
+        )
+        log_info(f"Built price index: {len(rows)} products")
+        return positions, names, prices, coverage
+
+# Create index instance
+price_index = PriceIndex()
@@ -0,0 +1,76 @@
+# app/utils/prices.py
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Legacy VARCHAR price column -> (size, unit) row in product_prices. The
+# columns stay as the admin-entered display text; product_prices holds every
+# entered label, plus its amount as a number for sorting and filtering (NULL
+# for labels without one, e.g. "On request").
+PRICE_COLUMNS: Dict[str, Tuple[int, str]] = {
+    "price200ml": (200, "ml"),
+    "price500ml": (500, "ml"),
+    "price1l": (1, "L"),
+    "price4l": (4, "L"),
+    "price5l": (5, "L"),
+    "price10l": (10, "L"),
+    "price20l": (20, "L"),
+    "price50g": (50, "g"),
+    "price100g": (100, "g"),
+    "price200g": (200, "g"),
+    "price500g": (500, "g"),
+    "price1kg": (1, "kg"),
+}
+PRICE_FIELDS = tuple(PRICE_COLUMNS)
+
+# The prices dict of a product ({"1L": "Rs. 500", ...}, smallest pack first),
+# aggregated from product_prices. Use as "LEFT JOIN LATERAL (...) pr ON TRUE".
+PRICES_LATERAL = """
+    SELECT json_object_agg(
+        pp.size || pp.unit, pp.label
+        ORDER BY CASE WHEN pp.unit IN ('L', 'kg') THEN pp.size * 1000 ELSE pp.size END
+    ) AS prices
+    FROM product_prices pp
+    WHERE pp.product_id = products.id
+"""
+
+_PRICE_NUMBER = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+def parse_price(value: Optional[str]) -> Optional[int]:
+    """'Rs. 8,500' -> 850000 (paise), None if there's no number in it"""
+    match = _PRICE_NUMBER.search(value) if value else None
+    if not match:
+        return None
+    amount = round(float(match.group(0).replace(",", "")) * 100)
+    return amount if amount > 0 else None
+
+def price_filter(size: int, unit: str, operator: str) -> str:
+    """SQL condition on one pack size's price, for products aliased as `products`"""
+    return f"""EXISTS (
+        SELECT 1 FROM product_prices pp
+        WHERE pp.product_id = products.id AND pp.size = {size} AND pp.unit = '{unit}'
+          AND pp.amount IS NOT NULL AND pp.amount {operator} %s
+    )"""
+
+def price_sort(size: int, unit: str) -> str:
+    """SQL ORDER BY expression for one pack size's price (NULL when it has no numeric price)"""
+    return (
+        f"(SELECT pp.amount FROM product_prices pp WHERE pp.product_id = products.id "
+        f"AND pp.size = {size} AND pp.unit = '{unit}' AND pp.amount IS NOT NULL)"
+    )
+
+def sync_product_prices(cursor, product: Dict[str, Any]):
+    """Rewrite a product's product_prices rows from its price columns"""
+    rows: List[tuple] = []
+    for field, (size, unit) in PRICE_COLUMNS.items():
+        label = (product.get(field) or "").strip()
+        if not label:
+            continue
+        amount = parse_price(label)
+        rows.append((product["id"], size, unit, amount / 100 if amount is not None else None, label))
+
+    cursor.execute("DELETE FROM product_prices WHERE product_id = %s", (product["id"],))
+    if rows:
+        cursor.executemany(
+            "INSERT INTO product_prices (product_id, size, unit, amount, label) VALUES (%s, %s, %s, %s, %s)",
+            rows
+        )
@@ -0,0 +1,87 @@
+# app/utils/product_cache.py
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+from app.utils.cache import cache, record_cache_event
+
+# Single items are cached per record ("product:<id>", "popular_product:<id>")
+# as {"item": ..., "etag": ...}, with a slug -> id entry for products, and
+# dropped by the admin routes when that record changes. Unknown IDs and
+# slugs are cached too, briefly, so repeated 404s (crawlers, stale links)
+# don't reach the database.
+
+ITEM_TTL = 600
+MISSING_TTL = 60
+
+_MISSING = {"missing": True}
+
+def slugify(name: str) -> str:
+    """'Metal & Wood Primer' -> 'metal-wood-primer' (matches the migration backfill)"""
+    return re.sub(r"[^a-zA-Z0-9]+", "-", name).strip("-").lower() or "product"
+
+def item_key(kind: str, item_id: int) -> str:
+    return f"{kind}:{item_id}"
+
+def slug_key(slug: str) -> str:
+    return f"product_slug:{slug}"
+
+def get_entries(
+    kind: str,
+    ids: List[int],
+    load_many: Callable[[List[int]], Dict[int, Dict[str, Any]]]
+) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Cached {"item": ..., "etag": ...} per ID (None for unknown IDs). Cache
+    hits are resolved one by one; all misses are loaded with a single
+    `load_many(missing_ids)` call returning {id: item}.
+    """
+    entries: Dict[int, Optional[Dict[str, Any]]] = {}
+    missing: List[int] = []
+    for item_id in ids:
+        entry = cache.get(item_key(kind, item_id))
+        if entry is None:
+            missing.append(item_id)
+        else:
+            entries[item_id] = None if entry is _MISSING else entry
+    if entries:
+        record_cache_event(hit=True)
+    if not missing:
+        return entries
+
+    record_cache_event(hit=False)
+    loaded = load_many(missing)
+    for item_id in missing:
+        item = loaded.get(item_id)
+        if item is None:
+            cache.set(item_key(kind, item_id), _MISSING, MISSING_TTL)
+            entries[item_id] = None
+            continue
+        body = json.dumps(item, sort_keys=True, default=str).encode()
+        entry = {"item": item, "etag": hashlib.md5(body).hexdigest()[:16]}
+        cache.set(item_key(kind, item_id), entry, ITEM_TTL)
+        entries[item_id] = entry
+    return entries
+
+def get_product_id_for_slug(slug: str, lookup: Callable[[str], Optional[int]]) -> Optional[int]:
+    """Product ID for a slug, cached (including unknown slugs)"""
+    product_id = cache.get(slug_key(slug))
+    if product_id is not None:
+        record_cache_event(hit=True)
+        return None if product_id is _MISSING else product_id
+
+    record_cache_event(hit=False)
+    product_id = lookup(slug)
+    cache.set(slug_key(slug), _MISSING if product_id is None else product_id,
+              MISSING_TTL if product_id is None else ITEM_TTL)
+    return product_id
+
+def invalidate_item(kind: str, item_id: int):
+    cache.delete(item_key(kind, item_id))
+
+def invalidate_product(product_id: int, *slugs: Optional[str]):
+    """Drop a product's cached entries, including cached 404s for its ID and slugs"""
+    invalidate_item("product", product_id)
+    for slug in slugs:
+        if slug:
+            cache.delete(slug_key(slug))
@@ -0,0 +1,175 @@
+# app/utils/quotes.py
+import math
+from functools import lru_cache, reduce
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.utils.prices import PRICE_FIELDS, parse_price
+
+# Pack sizes per price column, in ml (volume) or g (weight)
+VOLUME_PACKS = {
+    "price200ml": 200,
+    "price500ml": 500,
+    "price1l": 1000,
+    "price4l": 4000,
+    "price5l": 5000,
+    "price10l": 10000,
+    "price20l": 20000,
+}
+WEIGHT_PACKS = {
+    "price50g": 50,
+    "price100g": 100,
+    "price200g": 200,
+    "price500g": 500,
+    "price1kg": 1000,
+}
+
+# Largest quantity quoted, in litres or kg
+MAX_QUOTE_QUANTITY = 1000
+
+def product_packs(product: Dict[str, Any], packs: Dict[str, int]) -> Tuple[Tuple[int, int], ...]:
+    """((size, price in paise), ...) for the pack sizes the product has a price for"""
+    priced = []
+    for field, size in packs.items():
+        price = parse_price(product.get(field))
+        if price is not None:
+            priced.append((size, price))
+    return tuple(sorted(priced))
+
+def pack_label(size: int, unit: str) -> str:
+    small, large = ("ml", "L") if unit == "L" else ("g", "kg")
+    return f"{size // 1000}{large}" if size >= 1000 and size % 1000 == 0 else f"{size}{small}"
+
+@lru_cache(maxsize=4096)
+def cheapest_combination(packs: Tuple[Tuple[int, int], ...], quantity: int) -> Tuple[int, Tuple[int, ...]]:
+    """
+    Cheapest set of packs holding at least `quantity` (ml or g).
+
+    Unbounded knapsack over quantity in steps of the packs' common divisor:
+    best[v] is the cheapest way to cover v, ties going to fewer cans. Returns
+    (total price, count per pack). `packs` is the parsed price list, so a
+    price change gives a new cache key and stale quotes are never served.
+
+    Some optimal solution uses fewer than `best_units` of the other packs
+    (any that many contain a subset worth a whole number of best-value
+    packs), so for large orders the bulk is filled with best-value packs
+    up front and the DP only runs over the remainder.
+    """
+    sizes = [size for size, _ in packs]
+    step = reduce(math.gcd, sizes)
+    target = math.ceil(quantity / step)
+    units = [size // step for size in sizes]
+
+    best_value = min(range(len(packs)), key=lambda i: packs[i][1] / units[i])
+    best_units = units[best_value]
+    prefilled = max(0, (target - best_units * max(units)) // best_units)
+    target -= prefilled * best_units
+
+    # (price, cans, pack index used last) per covered quantity
+    best: List[Tuple[float, int, int]] = [(0, 0, -1)] + [(math.inf, 0, -1)] * target
+    for v in range(1, target + 1):
+        choice = best[v]
+        for i, (unit, (_, price)) in enumerate(zip(units, packs)):
+            previous = best[max(0, v - unit)]
+            candidate = (previous[0] + price, previous[1] + 1, i)
+            if candidate[:2] < choice[:2]:
+                choice = candidate
+        best[v] = choice
+
+    counts = [0] * len(packs)
+    v = target
+    while v > 0:
+        i = best[v][2]
+        counts[i] += 1
+        v = max(0, v - units[i])
+    counts[best_value] += prefilled
+    return int(best[target][0]) + prefilled * packs[best_value][1], tuple(counts)
+
+def quote_packs(product_id: int, packs: Tuple[Tuple[int, int], ...], quantity: float, unit: str) -> Dict[str, Any]:
+    """Priced pack list covering `quantity` litres or kg from `packs`"""
+    total, counts = cheapest_combination(packs, math.ceil(quantity * 1000 - 1e-9))
+    # Largest cans first
+    items = [
+        {
+            "size": pack_label(size, unit),
+            "quantity": count,
+            "unit_price": price / 100,
+            "subtotal": price * count / 100,
+        }
+        for (size, price), count in reversed(list(zip(packs, counts))) if count
+    ]
+    covered = sum(size * count for (size, _), count in zip(packs, counts)) / 1000
+    return {
+        "product_id": product_id,
+        "unit": unit,
+        "requested": quantity,
+        "covered": covered,
+        "total": total / 100,
+        "items": items,
+    }
+
+def build_quote(product: Dict[str, Any], quantity: float, unit: str) -> Optional[Dict[str, Any]]:
+    """
+    Quote for `quantity` litres (unit "L") or kilograms (unit "kg") of a
+    product, None if the product isn't sold by that unit
+    """
+    packs = product_packs(product, VOLUME_PACKS if unit == "L" else WEIGHT_PACKS)
+    if not packs:
+        return None
+    return quote_packs(product["id"], packs, quantity, unit)
+
+def row_packs(prices: np.ndarray) -> Tuple[str, Tuple[Tuple[int, int], ...]]:
+    """
+    (unit, packs) from one price index row (paise per PRICE_FIELDS column,
+    NaN if not sold). Products sold by volume are quoted in litres.
+    """
+    for unit, packs in (("L", VOLUME_PACKS), ("kg", WEIGHT_PACKS)):
+        priced = tuple(sorted(
+            (size, int(prices[PRICE_FIELDS.index(field)]))
+            for field, size in packs.items()
+            if not np.isnan(prices[PRICE_FIELDS.index(field)])
+        ))
+        if priced:
+            return unit, priced
+    return "L", ()
+
+def build_project_quote(surfaces: List[Dict[str, Any]], index) -> Dict[str, Any]:
+    """
+    Bill of materials for painting `surfaces` ({product_id, area, coats,
+    name}). Quantities are computed for all surfaces at once from the
+    `index` (a PriceIndex), summed per product and bought as one order per
+    product - which is never dearer than buying room by room.
+    Raises ValueError for products that can't be quoted.
+    """
+    product_ids = np.array([s["product_id"] for s in surfaces], dtype=np.int64)
+    unique_ids, line_of = np.unique(product_ids, return_inverse=True)
+    found, coverage, prices, names = index.lookup(unique_ids.tolist())
+
+    missing = unique_ids[~found].tolist()
+    if missing:
+        raise ValueError(f"Products not found: {', '.join(map(str, missing))}")
+    no_coverage = unique_ids[np.isnan(coverage)].tolist()
+    if no_coverage:
+        raise ValueError(f"No coverage rate set for products: {', '.join(map(str, no_coverage))}")
+
+    areas = np.array([s["area"] for s in surfaces], dtype=np.float64)
+    coats = np.array([s["coats"] for s in surfaces], dtype=np.float64)
+    needed = areas * coats / coverage[line_of]
+    needed_per_product = np.bincount(line_of, weights=needed, minlength=len(unique_ids))
+
+    lines = []
+    for i, product_id in enumerate(unique_ids.tolist()):
+        unit, packs = row_packs(prices[i])
+        if not packs:
+            raise ValueError(f"No prices set for product: {product_id}")
+        line = quote_packs(product_id, packs, round(float(needed_per_product[i]), 3), unit)
+        line["name"] = names[i]
+        lines.append(line)
+
+    return {
+        "surfaces": [
+            {**surface, "quantity": round(float(quantity), 3)}
+            for surface, quantity in zip(surfaces, needed)
+        ],
+        "lines": lines,
+        "total": round(sum(line["total"] for line in lines), 2),
+    }
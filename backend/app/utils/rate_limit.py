@@ -1,7 +1,8 @@
 # app/utils/rate_limit.py
 import time
 from fastapi import Request, HTTPException, status
-from typing import Dict, List, Tuple, Optional
+from jose import JWTError, jwt
+from typing import Dict, List, Tuple, Optional, Iterable
 from app.config import settings
 from app.utils.logging import log_warning
 
@@ -10,47 +11,61 @@ class RateLimiter:
     def __init__(self, max_requests: int, window_seconds: int = 60):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, List[float]] = {}
-    
-    def is_rate_limited(self, key: str) -> Tuple[bool, Optional[int]]:
+        # Each entry is (timestamp, cost) so expensive requests use more of the budget
+        self.requests: Dict[str, List[Tuple[float, int]]] = {}
+
+    def is_rate_limited(self, key: str, cost: int = 1) -> Tuple[bool, Optional[int]]:
         """
-        Check if a key is rate limited.
+        Check if a key is rate limited and charge `cost` units if it isn't.
         Returns (is_limited, reset_time_seconds)
         """
         now = time.time()
-        
+
         # Initialize if key doesn't exist
         if key not in self.requests:
             self.requests[key] = []
-        
+
         # Remove timestamps outside the window
-        self.requests[key] = [t for t in self.requests[key] if now - t < self.window_seconds]
-        
+        self.requests[key] = [(t, c) for t, c in self.requests[key] if now - t < self.window_seconds]
+
         # Check if rate limited
-        if len(self.requests[key]) >= self.max_requests:
+        used = sum(c for _, c in self.requests[key])
+        if used + cost > self.max_requests:
             # Calculate reset time
-            oldest = min(self.requests[key])
-            reset_seconds = int(self.window_seconds - (now - oldest))
+            oldest = min(t for t, _ in self.requests[key]) if self.requests[key] else now
+            reset_seconds = max(1, int(self.window_seconds - (now - oldest)))
             return True, reset_seconds
-        
+
         # Add current request
-        self.requests[key].append(now)
+        self.requests[key].append((now, cost))
         return False, None
-    
+
+    def refund(self, key: str, cost: int = 1):
+        """Give back the most recent charge of `cost` units for a key"""
+        entries = self.requests.get(key)
+        if not entries:
+            return
+        for i in range(len(entries) - 1, -1, -1):
+            if entries[i][1] == cost:
+                del entries[i]
+                return
+
     def cleanup(self):
         """Remove expired entries to prevent memory leaks"""
         now = time.time()
         for key in list(self.requests.keys()):
             # Remove timestamps outside the window
-            self.requests[key] = [t for t in self.requests[key] if now - t < self.window_seconds]
-            
+            self.requests[key] = [(t, c) for t, c in self.requests[key] if now - t < self.window_seconds]
+
             # Remove empty keys
             if not self.requests[key]:
                 del self.requests[key]
 
 # Create limiter instances
 auth_limiter = RateLimiter(5, 60)  # 5 requests per minute for auth endpoints
-api_limiter = RateLimiter(60, 60)  # 60 requests per minute for general API endpoints
+api_limiter = RateLimiter(60, 60)  # 60 units per minute for public API endpoints
+admin_limiter = RateLimiter(120, 60)  # 120 units per minute for admin endpoints
+image_limiter = RateLimiter(120, 60)  # 120 image renders per minute
 
 # Cleanup old entries every hour
 import threading
@@ -59,39 +74,112 @@ def cleanup_task():
         time.sleep(3600)  # 1 hour
         auth_limiter.cleanup()
         api_limiter.cleanup()
+        admin_limiter.cleanup()
+        image_limiter.cleanup()
 
 threading.Thread(target=cleanup_task, daemon=True).start()
 
-async def rate_limit_auth(request: Request):
-    """Middleware for rate limiting auth endpoints"""
-    key = f"{request.client.host}_auth"  # Use IP as key for auth endpoints
-    limited, reset = auth_limiter.is_rate_limited(key)
-    
-    if limited:
-        log_warning(f"Rate limit exceeded for auth endpoint: {request.url.path}", 
-                   extra={"client_ip": request.client.host}, request=request)
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Try again in {reset} seconds.",
-            headers={"Retry-After": str(reset)}
-        )
-
-async def rate_limit_api(request: Request):
-    """Middleware for rate limiting general API endpoints"""
-    # For authenticated requests, use user ID as key if available
-    if hasattr(request.state, "user") and request.state.user:
-        key = f"user_{request.state.user.id}"
-    else:
-        # Fall back to IP address
-        key = f"{request.client.host}_api"
-    
-    limited, reset = api_limiter.is_rate_limited(key)
-    
-    if limited:
-        log_warning(f"Rate limit exceeded for API endpoint: {request.url.path}", 
-                   extra={"client_ip": request.client.host}, request=request)
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. Try again in {reset} seconds.",
-            headers={"Retry-After": str(reset)}
-        )
\ No newline at end of file
+class RateLimitPolicy:
+    """
+    Declarative rate limit rule for a group of routes.
+
+    A request matches when its method is in `methods`, its path starts with one
+    of `prefixes` and (if set) it carries the `query_param`. Matching requests
+    are charged `cost` units against `limiter`. With `exempt_cached` the charge
+    is refunded when the response was served entirely from the in-memory cache.
+    """
+    def __init__(
+        self,
+        name: str,
+        limiter: RateLimiter,
+        prefixes: Iterable[str],
+        methods: Optional[Iterable[str]] = None,
+        cost: int = 1,
+        query_param: Optional[str] = None,
+        exempt_cached: bool = False,
+        per_principal: bool = True
+    ):
+        self.name = name
+        self.limiter = limiter
+        self.prefixes = tuple(prefixes)
+        self.methods = frozenset(m.upper() for m in methods) if methods else None
+        self.cost = cost
+        self.query_param = query_param
+        self.exempt_cached = exempt_cached
+        self.per_principal = per_principal
+
+    def matches(self, request: Request) -> bool:
+        if self.methods is not None and request.method not in self.methods:
+            return False
+        if not request.url.path.startswith(self.prefixes):
+            return False
+        if self.query_param and not request.query_params.get(self.query_param):
+            return False
+        return True
+
+# Policies are checked in order; the first match wins
+RATE_LIMIT_POLICIES: List[RateLimitPolicy] = [
+    # Login/refresh are always keyed by IP - there is no principal yet
+    RateLimitPolicy("auth", auth_limiter, ["/auth/"], methods=["GET", "POST"], per_principal=False),
+    # Uploads and writes are the expensive admin operations
+    RateLimitPolicy("admin-write", admin_limiter, ["/admin/"], methods=["POST", "PUT", "DELETE"], cost=5),
+    RateLimitPolicy("admin-read", admin_limiter, ["/admin/"], methods=["GET"]),
+    # Free-text search runs ILIKE scans, so it costs more than a plain read
+    RateLimitPolicy("api-search", api_limiter, ["/api/"], methods=["GET"], cost=3, query_param="search"),
+    # Cheap catalog reads only count when they actually reach the database
+    RateLimitPolicy("api-read", api_limiter, ["/api/"], methods=["GET"], exempt_cached=True),
+    RateLimitPolicy("api-write", api_limiter, ["/api/"], methods=["POST", "PUT", "DELETE"], cost=2),
+    # Only first-time renders count; transforms served from the disk cache are free
+    RateLimitPolicy("img", image_limiter, ["/img/"], methods=["GET"], exempt_cached=True, per_principal=False),
+]
+
+def get_rate_limit_policy(request: Request) -> Optional[RateLimitPolicy]:
+    """Return the first policy matching the request, or None if it isn't limited"""
+    for policy in RATE_LIMIT_POLICIES:
+        if policy.matches(request):
+            return policy
+    return None
+
+def get_client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def get_principal(request: Request) -> Optional[str]:
+    """
+    Extract the authenticated principal from the bearer token, if any.
+    Only the signature and expiry are checked - no database lookup - so
+    forged or expired tokens fall back to IP based limiting.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+
+    username = payload.get("sub")
+    if not username or not isinstance(username, str):
+        return None
+    return username
+
+def get_rate_limit_key(request: Request, policy: RateLimitPolicy) -> str:
+    """
+    Build the bucket key: per principal when authenticated, otherwise per IP.
+    Policies sharing a limiter share the bucket, so costs add up across them.
+    """
+    if policy.per_principal:
+        principal = get_principal(request)
+        if principal:
+            return f"user_{principal}"
+    return f"{get_client_ip(request)}_ip"
+
+def rate_limit_exceeded(request: Request, reset: Optional[int]) -> HTTPException:
+    log_warning(f"Rate limit exceeded for endpoint: {request.url.path}",
+               extra={"client_ip": get_client_ip(request)}, request=request)
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"Rate limit exceeded. Try again in {reset} seconds.",
+        headers={"Retry-After": str(reset)}
+    )
@@ -0,0 +1,172 @@
+# app/utils/related_products.py
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import psycopg2.extras
+from app.database import DatabaseConnection
+from app.utils.cache import cache
+from app.utils.logging import log_info
+
+# "Customers also consider" lists: products are compared by TF-IDF over their
+# name, description, features and category, and each product's top
+# RELATED_COUNT neighbours are stored in product_related. Admin writes
+# refresh only the lists the change can affect; build_related.py at the
+# backend root rebuilds everything.
+
+RELATED_COUNT = 8
+# Category and name terms count this many times as often as description words
+CATEGORY_WEIGHT = 3
+NAME_WEIGHT = 2
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or our that the this to with "
+    "your you we can all any more most very".split()
+)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if len(t) > 1 and t not in STOP_WORDS]
+
+def product_terms(product: Dict) -> List[str]:
+    features = product.get("features") or []
+    if isinstance(features, str):
+        try:
+            features = json.loads(features)
+        except json.JSONDecodeError:
+            features = []
+    terms = tokenize(product.get("name")) * NAME_WEIGHT + tokenize(product.get("description"))
+    for feature in features if isinstance(features, list) else []:
+        terms.extend(tokenize(str(feature)))
+    # The whole category as one term, so "Metal and Wood Primer" doesn't just match "primer"
+    terms.extend([f"category:{product.get('category', '').lower()}"] * CATEGORY_WEIGHT)
+    return terms
+
+def tfidf_matrix(documents: Sequence[List[str]]) -> np.ndarray:
+    """
+    (documents, vocabulary) TF-IDF matrix with sublinear term frequency,
+    rows L2-normalized so a dot product is the cosine similarity
+    """
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, terms in enumerate(documents):
+        for term in terms:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+    counts = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)), 1)
+
+    present = counts > 0
+    document_frequency = present.sum(axis=0)
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    weights = np.where(present, 1 + np.log(np.maximum(counts, 1)), 0) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return (weights / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+def top_neighbours(matrix: np.ndarray, rows: Sequence[int], k: int = RELATED_COUNT) -> List[List[Tuple[int, float]]]:
+    """Top-k most similar other rows for each of `rows`: [[(row, score), ...], ...]"""
+    if not len(rows) or matrix.shape[0] < 2:
+        return [[] for _ in rows]
+    rows = np.asarray(rows, dtype=np.int64)
+    similarity = matrix[rows] @ matrix.T
+    similarity[np.arange(len(rows)), rows] = -np.inf
+
+    count = min(k, matrix.shape[0] - 1)
+    nearest = np.argpartition(-similarity, count - 1, axis=1)[:, :count]
+    result = []
+    for i, candidates in enumerate(nearest):
+        ordered = candidates[np.argsort(-similarity[i, candidates], kind="stable")]
+        result.append([(int(j), float(similarity[i, j])) for j in ordered if similarity[i, j] > 0])
+    return result
+
+def load_catalog(cursor) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (product IDs, TF-IDF matrix) for the whole catalogue. Also takes the
+    transaction-level lock that serializes writers of product_related.
+    """
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('product_related'))")
+    cursor.execute("SELECT id, name, description, features, category FROM products ORDER BY id")
+    products = cursor.fetchall()
+    ids = np.array([p["id"] for p in products], dtype=np.int64)
+    return ids, tfidf_matrix([product_terms(p) for p in products])
+
+def write_related(cursor, ids: np.ndarray, rows: Sequence[int], neighbours: List[List[Tuple[int, float]]]):
+    """Replace the stored lists of the products at `rows`"""
+    product_ids = [int(ids[row]) for row in rows]
+    cursor.execute("DELETE FROM product_related WHERE product_id = ANY(%s)", (product_ids,))
+    values = [
+        (product_id, int(ids[j]), rank, round(score, 6))
+        for product_id, product_neighbours in zip(product_ids, neighbours)
+        for rank, (j, score) in enumerate(product_neighbours, start=1)
+    ]
+    if values:
+        psycopg2.extras.execute_values(
+            cursor,
+            "INSERT INTO product_related (product_id, related_id, rank, score) VALUES %s",
+            values,
+            page_size=1000
+        )
+
+def rebuild_related(cursor, batch_size: int = 500) -> int:
+    """Recompute every product's list; returns the number of products"""
+    ids, matrix = load_catalog(cursor)
+    cursor.execute("DELETE FROM product_related")
+    for start in range(0, len(ids), batch_size):
+        rows = list(range(start, min(start + batch_size, len(ids))))
+        write_related(cursor, ids, rows, top_neighbours(matrix, rows))
+    return len(ids)
+
+def affected_rows(cursor, ids: np.ndarray, matrix: np.ndarray, product_id: int) -> List[int]:
+    """
+    Rows whose lists may change when `product_id` is added or edited: the
+    product itself, lists that already contain it, lists that aren't full,
+    and lists whose weakest entry it now beats
+    """
+    position = {int(pid): row for row, pid in enumerate(ids)}
+    row = position.get(product_id)
+    if row is None:
+        return []
+    similarity = matrix @ matrix[row]
+
+    cursor.execute(
+        """
+        SELECT product_id, MIN(score) AS weakest, COUNT(*) AS size,
+               BOOL_OR(related_id = %s) AS contains_product
+        FROM product_related
+        GROUP BY product_id
+        """,
+        (product_id,)
+    )
+    stored = {r["product_id"]: r for r in cursor.fetchall()}
+
+    affected = {row}
+    for pid, other in position.items():
+        if other == row:
+            continue
+        entry = stored.get(pid)
+        if (entry is None or entry["contains_product"] or entry["size"] < RELATED_COUNT
+                or similarity[other] > float(entry["weakest"])):
+            affected.add(other)
+    return sorted(affected)
+
+def refresh_related(product_id: int):
+    """Update the lists affected by a created or edited product (runs after the response)"""
+    with DatabaseConnection() as cursor:
+        ids, matrix = load_catalog(cursor)
+        rows = affected_rows(cursor, ids, matrix, product_id)
+        if rows:
+            write_related(cursor, ids, rows, top_neighbours(matrix, rows))
+    cache.delete_prefix("get_related_products")
+    log_info(f"Refreshed related products for {len(rows)} products after change to {product_id}")
+
+def refresh_related_after_delete(product_ids: Iterable[int]):
+    """Refill the lists that contained a deleted product"""
+    with DatabaseConnection() as cursor:
+        ids, matrix = load_catalog(cursor)
+        position = {int(pid): row for row, pid in enumerate(ids)}
+        rows = sorted(position[pid] for pid in set(product_ids) if pid in position)
+        if rows:
+            write_related(cursor, ids, rows, top_neighbours(matrix, rows))
+    cache.delete_prefix("get_related_products")
+    log_info(f"Refreshed related products for {len(rows)} products after a delete")
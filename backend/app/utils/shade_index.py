@@ -0,0 +1,75 @@
+# app/utils/shade_index.py
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.database import DatabaseConnection
+from app.utils.colors import ciede2000, color_to_lab, rgb_to_lab, unpack_rgb, parse_hex_color
+from app.utils.logging import log_info
+
+class ShadeIndex:
+    """
+    In-memory shade catalog for nearest-shade matching.
+
+    Lab values of every shade are kept in one (N, 3) array next to the
+    shade rows, so a match is one vectorized CIEDE2000 pass plus a partial
+    sort - no database round trip. The index is rebuilt after `ttl` seconds
+    or once invalidated by an admin change.
+    """
+    def __init__(self, ttl: int = 600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._lab = np.empty((0, 3), dtype=np.float64)
+        self._shades: List[Dict[str, Any]] = []
+        self._collections = np.empty(0, dtype=object)
+        self._built_at: Optional[float] = None
+
+    def invalidate(self):
+        """Rebuild on the next match (called when shades change)"""
+        with self._lock:
+            self._built_at = None
+
+    def match(self, color: int, limit: int = 5, collection: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The `limit` shades closest to `color`, nearest first, each with its delta_e"""
+        lab, shades, collections = self._snapshot()
+        if collection:
+            selected = np.flatnonzero(collections == collection)
+            lab = lab[selected]
+        else:
+            selected = None
+        if not len(lab):
+            return []
+
+        distances = ciede2000(np.asarray(color_to_lab(color)), lab)
+        count = min(limit, len(distances))
+        # Only the top `count` need sorting
+        nearest = np.argpartition(distances, count - 1)[:count]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+
+        matches = []
+        for i in nearest:
+            shade = shades[selected[i] if selected is not None else i]
+            matches.append({**shade, "delta_e": round(float(distances[i]), 2)})
+        return matches
+
+    def _snapshot(self) -> Tuple[np.ndarray, List[Dict[str, Any]], np.ndarray]:
+        with self._lock:
+            if self._built_at is None or time.time() - self._built_at > self.ttl:
+                self._lab, self._shades, self._collections = self._load()
+                self._built_at = time.time()
+            return self._lab, self._shades, self._collections
+
+    @staticmethod
+    def _load() -> Tuple[np.ndarray, List[Dict[str, Any]], np.ndarray]:
+        with DatabaseConnection() as cursor:
+            cursor.execute("SELECT id, code, name, hex, collection, product_id FROM shades ORDER BY id")
+            shades = [dict(row) for row in cursor.fetchall()]
+
+        packed = np.array([parse_hex_color(s["hex"]) for s in shades], dtype=np.int64)
+        lab = rgb_to_lab(unpack_rgb(packed)) if len(shades) else np.empty((0, 3), dtype=np.float64)
+        collections = np.array([s["collection"] for s in shades], dtype=object)
+        log_info(f"Built shade index: {len(shades)} shades")
+        return lab, shades, collections
+
+# Create index instance
+shade_index = ShadeIndex()
@@ -0,0 +1,14 @@
+# app/utils/static_files.py
+from fastapi.staticfiles import StaticFiles
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for content-addressed files: a URL's content never changes,
+    so browsers and CDNs may cache responses forever.
+    """
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,109 @@
+# app/utils/subrequests.py
+import asyncio
+import json
+from typing import Any, Dict, Optional
+from urllib.parse import unquote, urlsplit
+from app.utils.logging import log_error
+
+# In-process GET requests against the app itself. A sub-request is a fresh
+# ASGI call through the full middleware stack (rate limits, logging) carrying
+# the caller's credentials, so every route applies its own auth as if called
+# directly. Accept-Encoding isn't forwarded, so bodies come back uncompressed.
+
+# Caller headers a sub-request inherits
+FORWARDED_HEADERS = (b"authorization", b"cookie", b"accept-language", b"user-agent")
+
+# Response headers reported back with each result
+RESULT_HEADERS = ("etag", "cache-control", "retry-after", "x-request-id")
+
+SUBREQUEST_TIMEOUT = 30
+
+def subrequest_scope(parent: Dict[str, Any], target: str) -> Dict[str, Any]:
+    """
+    ASGI scope for a GET of `target` (percent-encoded path plus optional
+    query string) on behalf of `parent`. As for a real request, `path` is
+    decoded and `raw_path` keeps the encoded form.
+    """
+    url = urlsplit(target)
+    return {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": unquote(url.path),
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": [(name, value) for name, value in parent["headers"] if name in FORWARDED_HEADERS]
+                   + [(b"accept", b"application/json")],
+    }
+
+async def run_subrequest(app, parent: Dict[str, Any], target: str, follow_redirect: bool = True) -> Dict[str, Any]:
+    """
+    Run a GET through `app` and return {"status", "headers", "body"}. The
+    body is parsed JSON when the route returned JSON. Starlette's
+    trailing-slash redirect is followed; other redirects are returned as is.
+    """
+    response: Dict[str, Any] = {"status": 500, "headers": {}, "chunks": []}
+    finished = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Nothing more to read; report a disconnect once the route is done
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                name.decode("latin-1").lower(): value.decode("latin-1")
+                for name, value in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            response["chunks"].append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await asyncio.wait_for(app(subrequest_scope(parent, target), receive, send), SUBREQUEST_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"status": 504, "headers": {}, "body": {"detail": "Sub-request timed out"}}
+    except Exception as e:
+        # Unhandled errors are re-raised after the 500 response has been sent
+        log_error(f"Sub-request GET {target} failed: {e}")
+        if not response["chunks"]:
+            return {"status": 500, "headers": {}, "body": {"detail": "Internal server error"}}
+    finally:
+        finished.set()
+
+    status, headers = response["status"], response["headers"]
+    location = headers.get("location")
+    if follow_redirect and status in (307, 308) and location:
+        redirect = urlsplit(location)
+        if unquote(redirect.path).rstrip("/") == unquote(urlsplit(target).path).rstrip("/"):
+            path = redirect.path + (f"?{redirect.query}" if redirect.query else "")
+            return await run_subrequest(app, parent, path, follow_redirect=False)
+
+    return {
+        "status": status,
+        "headers": {name: headers[name] for name in RESULT_HEADERS if name in headers},
+        "body": decode_body(b"".join(response["chunks"]), headers.get("content-type")),
+    }
+
+def decode_body(body: bytes, content_type: Optional[str]) -> Any:
+    if not body:
+        return None
+    if content_type and content_type.startswith("application/json"):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
@@ -0,0 +1,97 @@
+# app/utils/sync.py
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.database import DatabaseConnection
+from app.utils.logging import log_info
+
+# Delta sync for clients that keep the catalogue locally. Triggers record the
+# last write to each row in sync_changes, stamped with the writing
+# transaction's ID (txid) and whether it was a delete.
+#
+# Timestamps can't order changes: a transaction that started before a
+# client's read may commit after it. The sync token instead carries the xmin
+# of the read's snapshot: every transaction below it had finished and was
+# visible to the read, so the next sync asks for changes with txid >= xmin.
+# A few changes may be sent twice while an older transaction is still open,
+# which is harmless since upserts and deletions are idempotent.
+
+SYNC_TABLES = ("products", "popular_products", "new_arrivals", "news_events")
+
+# Rows a client may see; a changed row that doesn't match is sent as a
+# deletion (news waiting for or past its publication window)
+SYNC_VISIBLE = {"news_events": "published"}
+
+# Tombstones older than this are purged; older tokens get a full reset (a
+# day early, as a deletion is dated from the start of its transaction)
+TOMBSTONE_RETENTION_DAYS = 30
+
+def parse_sync_token(token: str) -> Tuple[int, datetime]:
+    """'<snapshot xmin>@<database time>' -> (xmin, issued at)"""
+    xmin, _, issued = token.partition("@")
+    issued_at = datetime.fromisoformat(issued)
+    if issued_at.tzinfo is not None:
+        raise ValueError("Sync tokens carry database time without a zone")
+    return int(xmin), issued_at
+
+def get_changes(since: Optional[Tuple[int, datetime]]) -> Dict[str, Any]:
+    """
+    {"next", "reset", "changes": {table: {"upserts": [...], "deletions": [ids]}}}
+    with only the tables that changed. Without `since`, or with one older
+    than the tombstone retention, every row is returned with reset=True and
+    the client should replace its copy.
+    """
+    with DatabaseConnection() as cursor:
+        # One snapshot for every table; the first query takes it
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot()) AS xmin, LOCALTIMESTAMP AS now")
+        snapshot = cursor.fetchone()
+        now = snapshot["now"]
+
+        retention = timedelta(days=TOMBSTONE_RETENTION_DAYS - 1)
+        reset = since is None or since[1] < now - retention
+        changes: Dict[str, Dict[str, List[Any]]] = {}
+        if reset:
+            for table in SYNC_TABLES:
+                visible = SYNC_VISIBLE.get(table, "TRUE")
+                cursor.execute(f"SELECT * FROM {table} WHERE {visible} ORDER BY id")
+                changes[table] = {"upserts": [dict(row) for row in cursor.fetchall()], "deletions": []}
+        else:
+            cursor.execute(
+                """
+                SELECT table_name, record_id, deleted FROM sync_changes
+                WHERE txid >= %s AND table_name = ANY(%s)
+                """,
+                (since[0], list(SYNC_TABLES))
+            )
+            changed: Dict[str, List[int]] = {}
+            for row in cursor.fetchall():
+                if row["deleted"]:
+                    changes.setdefault(row["table_name"], {"upserts": [], "deletions": []})["deletions"].append(row["record_id"])
+                else:
+                    changed.setdefault(row["table_name"], []).append(row["record_id"])
+
+            for table, ids in changed.items():
+                visible = SYNC_VISIBLE.get(table, "TRUE")
+                cursor.execute(f"SELECT *, ({visible}) AS sync_visible FROM {table} WHERE id = ANY(%s) ORDER BY id", (ids,))
+                table_changes = changes.setdefault(table, {"upserts": [], "deletions": []})
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    if row.pop("sync_visible"):
+                        table_changes["upserts"].append(row)
+                    else:
+                        table_changes["deletions"].append(row["id"])
+
+            for table_changes in changes.values():
+                table_changes["deletions"].sort()
+
+    return {"next": f"{snapshot['xmin']}@{now.isoformat()}", "reset": reset, "changes": changes}
+
+def purge_sync_deletions():
+    """Remove tombstones past the retention period"""
+    with DatabaseConnection() as cursor:
+        cursor.execute(
+            "DELETE FROM sync_changes WHERE deleted AND changed_at < LOCALTIMESTAMP - make_interval(days => %s)",
+            (TOMBSTONE_RETENTION_DAYS,)
+        )
+        if cursor.rowcount:
+            log_info(f"Purged {cursor.rowcount} sync tombstones")
@@ -0,0 +1,87 @@
+# app/utils/transform_cache.py
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.config import settings
+from app.utils.logging import log_info, log_warning
+
+class DiskLRUCache:
+    """
+    Size-bounded on-disk cache for rendered image transforms.
+
+    Files live flat in `directory`; an in-memory index keeps them in least
+    recently used order (rebuilt from file mtimes at startup, and mtimes are
+    bumped on every hit so the order survives restarts). When the total size
+    goes over `max_bytes` the least recently used files are deleted.
+    """
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # name -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Index existing files, oldest first"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._total_bytes += size
+        log_info(f"Transform cache loaded: {len(self._entries)} files, {self._total_bytes} bytes")
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str) -> Optional[str]:
+        """Return the file path for a cached transform and mark it as recently used"""
+        path = self.path_for(name)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            if not os.path.isfile(path):
+                # Removed by another worker process sharing the directory
+                self._total_bytes -= self._entries.pop(name)
+                return None
+            self._entries.move_to_end(name)
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, name: str, size: int):
+        """Register a file written to path_for(name) and evict old files if over budget"""
+        evicted = []
+        with self._lock:
+            if name in self._entries:
+                self._total_bytes -= self._entries.pop(name)
+            self._entries[name] = size
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_name, old_size = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                evicted.append(old_name)
+
+        for old_name in evicted:
+            try:
+                os.remove(self.path_for(old_name))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log_warning(f"Failed to evict cached transform {old_name}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"files": len(self._entries), "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+transform_cache = DiskLRUCache(settings.TRANSFORM_CACHE_DIR, settings.TRANSFORM_CACHE_MAX_BYTES)
@@ -0,0 +1,95 @@
+# app/utils/upload_limits.py
+import json
+from typing import Iterable
+from app.config import settings
+from app.utils.logging import log_warning
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized multipart uploads while they are
+    still streaming in, instead of after the whole body has been spooled.
+
+    - A declared Content-Length above the limit is answered with 413 before
+      any of the body is read.
+    - For chunked bodies the received bytes are counted; once the limit is
+      passed a 413 is sent and the app sees a client disconnect, so it stops
+      parsing. Anything the app tries to send afterwards is dropped.
+    """
+    def __init__(self, app, max_body_size: int, path_prefixes: Iterable[str] = ("/admin/",)):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = self._header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            log_warning(f"Rejected upload of {content_length} bytes to {scope['path']}")
+            await self._send_413(send)
+            return
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    rejected = True
+                    log_warning(f"Upload to {scope['path']} exceeded {self.max_body_size} bytes while streaming")
+                    if not response_started:
+                        await self._send_413(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # The app fails on the simulated disconnect; the 413 is already sent
+            if not rejected:
+                raise
+
+    def _applies(self, scope) -> bool:
+        if scope["method"] not in ("POST", "PUT"):
+            return False
+        if not scope["path"].startswith(self.path_prefixes):
+            return False
+        content_type = self._header(scope, b"content-type") or ""
+        return content_type.startswith("multipart/form-data")
+
+    @staticmethod
+    def _header(scope, name: bytes):
+        for key, value in scope["headers"]:
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    async def _send_413(self, send):
+        limit_mb = settings.MAX_IMAGE_SIZE // (1024 * 1024)
+        body = json.dumps({"detail": f"File too large. Maximum size is {limit_mb}MB.", "request_id": None}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -69,4 +69,20 @@ class ContactForm(BaseModel):
             raise ValueError('Message must be at least 5 characters')
         return v
 
-# Add more validation models for other form inputs as needed
\ No newline at end of file
+# Add more validation models for other form inputs as needed
+def parse_id_list(value: str, max_ids: int = 100) -> List[int]:
+    """'1,5,9' -> [1, 5, 9], duplicates dropped, order kept. Raises ValueError."""
+    ids: List[int] = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit():
+            raise ValueError(f"Invalid ID: {part}")
+        if int(part) not in ids:
+            ids.append(int(part))
+    if not ids:
+        raise ValueError("No IDs given")
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} IDs per request")
+    return ids
@@ -0,0 +1,39 @@
+# app/utils/workers.py
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from app.config import settings
+from app.utils.logging import log_info
+
+# Shared pool for CPU-heavy work (Pillow decoding/encoding) so it never runs
+# on the event loop. Created lazily - most requests never need it.
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get (or create) the worker process pool"""
+    global _process_pool
+    if _process_pool is None:
+        # spawn avoids forking the server's threads and open connections
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        log_info(f"Started image worker pool with {settings.IMAGE_WORKERS} processes")
+    return _process_pool
+
+async def run_in_process(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a picklable, module-level function in the worker process pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+def shutdown_process_pool():
+    """Stop the worker processes (called on application shutdown)"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+        log_info("Stopped image worker pool")
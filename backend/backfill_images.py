@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Image metadata backfill for Paint Website API
+Generates the blurred placeholder (with dimensions) and the colour palette
+for records uploaded before they existed
+
+Usage:
+    python backfill_images.py --dry-run     # count records missing either
+    python backfill_images.py               # generate them
+    python backfill_images.py --force       # regenerate for every record
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+# Tables with image_url / image_placeholder / image_colors columns
+IMAGE_TABLES = ("popular_products", "new_arrivals", "products")
+
+MISSING_CONDITION = "AND (image_placeholder IS NULL OR image_colors IS NULL)"
+
+def fetch_batch(conn, table: str, after_id: int, batch_size: int, force: bool) -> List[Tuple[int, str]]:
+    """Next (id, image_url) rows to process, in id order"""
+    missing = "" if force else MISSING_CONDITION
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT id, image_url FROM {table}
+            WHERE id > %s AND image_url IS NOT NULL AND image_url <> '' {missing}
+            ORDER BY id
+            LIMIT %s
+            """,
+            (after_id, batch_size)
+        )
+        return [(row["id"], row["image_url"]) for row in cursor.fetchall()]
+
+def count_missing(conn, table: str, force: bool) -> int:
+    missing = "" if force else MISSING_CONDITION
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS count FROM {table} WHERE image_url IS NOT NULL AND image_url <> '' {missing}")
+        return cursor.fetchone()["count"]
+
+async def analyze_url(url: str, semaphore: asyncio.Semaphore) -> Optional[Tuple[Dict, List[int]]]:
+    """Fetch the image from whichever storage holds it and return (placeholder, colors)"""
+    from app.config import settings
+    from app.storage.factory import get_storage, get_local_storage
+    from app.utils.image_variants import analyze_image
+    from app.utils.workers import run_in_process
+
+    async with semaphore:
+        local = get_local_storage()
+        key = local.key_for_url(url)
+        if key is not None:
+            return await run_in_process(analyze_image, local.path_for(key))
+
+        storage = get_storage()
+        key = storage.key_for_url(url)
+        if key is None:
+            print(f"   ⚠️  Not in the configured storage, skipping: {url}")
+            return None
+
+        data = await storage.get(key)
+        fd, path = tempfile.mkstemp(dir=settings.PENDING_UPLOADS_DIR, suffix=os.path.splitext(key)[1])
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            return await run_in_process(analyze_image, path)
+        finally:
+            os.remove(path)
+
+async def backfill_table(conn, table: str, args) -> Dict[str, int]:
+    stats = {"updated": 0, "failed": 0, "skipped": 0}
+    semaphore = asyncio.Semaphore(args.workers)
+    after_id = 0
+
+    while True:
+        rows = fetch_batch(conn, table, after_id, args.batch_size, args.force)
+        if not rows:
+            break
+        after_id = rows[-1][0]
+
+        results = await asyncio.gather(
+            *(analyze_url(url, semaphore) for _, url in rows),
+            return_exceptions=True
+        )
+
+        with conn.cursor() as cursor:
+            for (record_id, url), result in zip(rows, results):
+                if isinstance(result, Exception):
+                    print(f"   ❌ {table} {record_id}: {result}")
+                    stats["failed"] += 1
+                    continue
+                if result is None:
+                    stats["skipped"] += 1
+                    continue
+                placeholder, colors = result
+                # Only if the image wasn't replaced in the meantime
+                cursor.execute(
+                    f"UPDATE {table} SET image_placeholder = %s, image_colors = %s WHERE id = %s AND image_url = %s",
+                    (json.dumps(placeholder), colors, record_id, url)
+                )
+                stats["updated"] += cursor.rowcount
+        conn.commit()
+        print(f"   {table}: {stats['updated']} updated so far (up to id {after_id})")
+
+    return stats
+
+def run_backfill(args) -> bool:
+    from app.config import settings
+    from app.database import get_connection
+    from app.utils.workers import shutdown_process_pool
+
+    os.makedirs(settings.PENDING_UPLOADS_DIR, exist_ok=True)
+    tables = [args.table] if args.table else list(IMAGE_TABLES)
+
+    conn = get_connection()
+    try:
+        for table in tables:
+            missing = count_missing(conn, table, args.force)
+            print(f"🖼️  {table}: {missing} records to process")
+            if args.dry_run or not missing:
+                continue
+            stats = asyncio.run(backfill_table(conn, table, args))
+            print(f"   {table}: updated {stats['updated']}, skipped {stats['skipped']}, failed {stats['failed']}")
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Image backfill failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        conn.close()
+        shutdown_process_pool()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate image placeholders and colours for existing records")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the records that need backfilling")
+    parser.add_argument("--force", action="store_true", help="Regenerate metadata that already exists")
+    parser.add_argument("--table", choices=IMAGE_TABLES, help="Only backfill this table")
+    parser.add_argument("--batch-size", type=int, default=100, help="Records fetched and committed at a time (default: 100)")
+    parser.add_argument("--workers", type=int, default=4, help="Images processed concurrently (default: 4)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    print("🚀 Backfilling image placeholders and colours...")
+    success = run_backfill(parse_args())
+
+    if success:
+        print("\n🎉 Image backfill completed!")
+    else:
+        print("\n💥 Image backfill failed!")
+        exit(1)
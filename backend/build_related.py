@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Related products builder for Paint Website API
+Recomputes every product's "customers also consider" list from scratch
+(admin edits keep them up to date incrementally)
+
+Usage:
+    python build_related.py             # rebuild all lists
+    python build_related.py --show 5    # rebuild and print the first 5 lists
+"""
+
+import argparse
+
+def run_build(args) -> bool:
+    from app.database import get_connection
+    from app.utils.related_products import rebuild_related
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cursor:
+            count = rebuild_related(cursor, args.batch_size)
+            print(f"🔗 Computed related products for {count} products")
+
+            if args.show:
+                cursor.execute(
+                    """
+                    SELECT p.name, array_agg(r.name ORDER BY rel.rank) AS related
+                    FROM products p
+                    JOIN product_related rel ON rel.product_id = p.id
+                    JOIN products r ON r.id = rel.related_id
+                    GROUP BY p.id, p.name
+                    ORDER BY p.id
+                    LIMIT %s
+                    """,
+                    (args.show,)
+                )
+                for row in cursor.fetchall():
+                    print(f"   {row['name']}: {', '.join(row['related'])}")
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Related products build failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        conn.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recompute related products for the whole catalogue")
+    parser.add_argument("--batch-size", type=int, default=500, help="Products scored per matrix product (default: 500)")
+    parser.add_argument("--show", type=int, default=0, help="Print this many lists after building (default: 0)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    print("🚀 Building related products...")
+    success = run_build(parse_args())
+
+    if success:
+        print("\n🎉 Related products build completed!")
+    else:
+        print("\n💥 Related products build failed!")
+        exit(1)
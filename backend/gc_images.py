@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Orphaned image garbage collector for Paint Website API
+Deletes uploaded images that no database record references any more
+
+Usage:
+    python gc_images.py --dry-run          # report only
+    python gc_images.py                    # delete orphans
+    python gc_images.py --max-rate 20      # at most 20 deletions per second
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Tables with image_url / image_variants columns
+IMAGE_TABLES = ("popular_products", "new_arrivals", "products")
+
+# Content-addressed blobs and their variants are stored under
+# cas/<2 hex>/<sha256>..., owned by an image_blobs row
+BLOB_KEY_PREFIX = "cas/"
+
+def blob_digest_for_key(key: str) -> Optional[str]:
+    """The content hash a blob (or blob variant) key belongs to"""
+    if not key.startswith(BLOB_KEY_PREFIX):
+        return None
+    digest = key.rsplit("/", 1)[-1][:64]
+    return digest if len(digest) == 64 else None
+
+def iter_variant_urls(variants) -> Iterator[str]:
+    """URLs inside an image_variants payload ({src, sources: [{srcset}]})"""
+    if not isinstance(variants, dict):
+        return
+    if variants.get("src"):
+        yield variants["src"]
+    for source in variants.get("sources") or []:
+        for entry in (source.get("srcset") or "").split(","):
+            url = entry.strip().split(" ")[0]
+            if url:
+                yield url
+
+def stream_references(conn) -> Iterator[Tuple[str, dict]]:
+    """
+    Stream (image_url, image_variants) for every record and every blob still
+    referenced, using a server-side cursor. Blobs count on their own: a save
+    acquires one before the record pointing at it is written.
+    """
+    query = " UNION ALL ".join(
+        [f"SELECT image_url, image_variants FROM {table}" for table in IMAGE_TABLES]
+        + ["SELECT url, variants FROM image_blobs WHERE ref_count > 0"]
+    )
+    with conn.cursor(name="gc_image_references") as cursor:
+        cursor.itersize = 1000
+        cursor.execute(query)
+        for row in cursor:
+            yield row["image_url"], row["image_variants"]
+
+def load_references(conn) -> Set[str]:
+    """Return every referenced URL, including variants"""
+    referenced: Set[str] = set()
+    for image_url, variants in stream_references(conn):
+        if image_url:
+            referenced.add(image_url)
+        referenced.update(iter_variant_urls(variants))
+    return referenced
+
+# -------------------------
+# Collection
+# -------------------------
+def lock_blobs(cursor, digests: List[str], min_age_seconds: int) -> Dict[str, dict]:
+    """
+    Lock the image_blobs rows of `digests` for the rest of the transaction, so
+    no save can acquire them meanwhile. Returns {hash: {ref_count, settled}}.
+    """
+    cursor.execute(
+        """
+        SELECT hash, ref_count, updated_at < NOW() - make_interval(secs => %s) AS settled
+        FROM image_blobs WHERE hash = ANY(%s)
+        FOR UPDATE
+        """,
+        (min_age_seconds, digests)
+    )
+    return {row["hash"]: row for row in cursor.fetchall()}
+
+async def collect(storage, referenced_keys: Set[str], min_age_seconds: int, args, conn) -> Dict[str, int]:
+    """
+    Stream a storage's objects, keep the unreferenced ones older than the
+    grace period and delete them in concurrent batches, throttled to
+    --max-rate deletions per second.
+
+    Blob files are re-checked right before deletion: with their image_blobs
+    rows locked, files of blobs in use are kept, and rows left with no
+    references are deleted together with their files.
+    """
+    stats = {"scanned": 0, "orphans": 0, "orphan_bytes": 0, "deleted": 0, "failed": 0, "kept": 0}
+    cutoff = time.time() - min_age_seconds
+    interval = args.batch_size / args.max_rate if args.max_rate else 0
+    semaphore = asyncio.Semaphore(args.workers)
+    blob_transaction = asyncio.Lock()  # the connection runs one transaction at a time
+    tasks: List[asyncio.Task] = []
+    batch: List[str] = []
+    last_submit = 0.0
+
+    async def deletable_blob_keys(cursor, keys: List[str]) -> Tuple[List[str], List[str]]:
+        """(blob keys that may go, hashes of the unreferenced rows to delete with them)"""
+        digests = {key: blob_digest_for_key(key) for key in keys}
+        rows = await asyncio.to_thread(lock_blobs, cursor, sorted(set(digests.values())), min_age_seconds)
+        deletable, released = [], set()
+        for key, digest in digests.items():
+            row = rows.get(digest)
+            if row is not None:
+                if row["ref_count"] > 0 or not row["settled"]:
+                    stats["kept"] += 1
+                    continue
+                released.add(digest)
+            else:
+                # No row: possibly put again just now by a save that hasn't
+                # registered the blob yet
+                entry = await storage.stat(key)
+                if entry is None or entry.modified > cutoff:
+                    stats["kept"] += 1
+                    continue
+            deletable.append(key)
+        return deletable, sorted(released)
+
+    async def delete_keys(keys: List[str]):
+        blob_keys = [key for key in keys if blob_digest_for_key(key)]
+        if not blob_keys:
+            return await storage.batch_delete(keys)
+        async with blob_transaction:
+            try:
+                with conn.cursor() as cursor:
+                    deletable, released = await deletable_blob_keys(cursor, blob_keys)
+                    keys = [key for key in keys if key not in blob_keys] + deletable
+                    results = await storage.batch_delete(keys) if keys else {}
+                    if released:
+                        await asyncio.to_thread(
+                            cursor.execute, "DELETE FROM image_blobs WHERE hash = ANY(%s)", (released,)
+                        )
+                        print(f"   🧹 Removed {len(released)} unreferenced image_blobs rows")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return results
+
+    async def delete_batch(keys: List[str]):
+        async with semaphore:
+            try:
+                results = await delete_keys(keys)
+            except Exception as e:
+                print(f"   ⚠️  Batch deletion failed: {e}")
+                stats["failed"] += len(keys)
+                return
+        for key, ok in results.items():
+            if ok:
+                stats["deleted"] += 1
+            else:
+                print(f"   ⚠️  Could not delete {key}")
+                stats["failed"] += 1
+
+    async def submit(keys: List[str]):
+        nonlocal last_submit
+        if interval:
+            wait = last_submit + interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            last_submit = time.monotonic()
+        tasks.append(asyncio.create_task(delete_batch(keys)))
+
+    async for entry in storage.list():
+        stats["scanned"] += 1
+        if entry.modified > cutoff:
+            continue  # may belong to an upload still in progress
+        if entry.key in referenced_keys:
+            continue
+        stats["orphans"] += 1
+        stats["orphan_bytes"] += entry.size
+        if args.dry_run:
+            if stats["orphans"] <= args.show:
+                print(f"   🗑️  {storage.url_for(entry.key)} ({entry.size} bytes)")
+            continue
+        batch.append(entry.key)
+        if len(batch) >= args.batch_size:
+            await submit(batch)
+            batch = []
+
+    if batch:
+        await submit(batch)
+    await asyncio.gather(*tasks)
+    return stats
+
+def referenced_keys_for(storage, referenced: Set[str]) -> Set[str]:
+    """Storage keys of the referenced URLs that belong to this storage"""
+    keys = set()
+    for url in referenced:
+        key = storage.key_for_url(url)
+        if key is not None:
+            keys.add(key)
+    return keys
+
+def reconcile_blobs(conn, min_age_seconds: int, dry_run: bool):
+    """
+    Fix image_blobs reference counts that drifted (e.g. a save that failed
+    after the blob was acquired). Rows left at zero stop protecting their
+    files, and collection deletes each such row together with its files.
+    """
+    references = " UNION ALL ".join(f"SELECT image_url FROM {table}" for table in IMAGE_TABLES)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT b.hash, b.url, b.ref_count, COUNT(r.image_url) AS actual
+            FROM image_blobs b
+            LEFT JOIN ({references}) r ON r.image_url = b.url
+            WHERE b.updated_at < NOW() - make_interval(secs => %s)
+            GROUP BY b.hash, b.url, b.ref_count
+            HAVING b.ref_count <> COUNT(r.image_url)
+            """,
+            (min_age_seconds,)
+        )
+        drifted = cursor.fetchall()
+        for row in drifted:
+            print(f"   🔢 {row['url']}: ref_count {row['ref_count']} -> {row['actual']}")
+        if dry_run:
+            return
+
+        for row in drifted:
+            # Skipped if a save acquired or released the blob since the count
+            cursor.execute(
+                """
+                UPDATE image_blobs SET ref_count = %s
+                WHERE hash = %s AND updated_at < NOW() - make_interval(secs => %s)
+                """,
+                (row["actual"], row["hash"], min_age_seconds)
+            )
+    conn.commit()
+
+def run_gc(args) -> bool:
+    from app.database import get_connection
+    from app.storage.factory import get_storage, get_local_storage
+
+    min_age_seconds = int(args.min_age_hours * 3600)
+    mode = "DRY RUN" if args.dry_run else "DELETE"
+    print(f"🔧 Mode: {mode}, grace period: {args.min_age_hours}h, batch size: {args.batch_size}, workers: {args.workers}")
+
+    # Local uploads always exist (staging, legacy files); the configured
+    # backend is scanned too when it is a different one
+    storages = [get_local_storage()]
+    storage = get_storage()
+    if storage is not storages[0] and not args.local_only:
+        storages.append(storage)
+
+    conn = get_connection()
+    try:
+        print("🔢 Checking stored image reference counts...")
+        reconcile_blobs(conn, min_age_seconds, args.dry_run)
+
+        print("📖 Loading image references from the database...")
+        referenced = load_references(conn)
+        conn.commit()  # end the read transaction; deletions run their own
+        print(f"   {len(referenced)} referenced URLs")
+
+        for storage in storages:
+            print(f"📂 Scanning {storage.name} storage...")
+            stats = asyncio.run(collect(storage, referenced_keys_for(storage, referenced), min_age_seconds, args, conn))
+            report(storage.name.capitalize(), stats, args.dry_run)
+        return True
+    except Exception as e:
+        print(f"❌ Image garbage collection failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        conn.close()
+
+def report(label: str, stats: Dict[str, int], dry_run: bool):
+    size_mb = stats["orphan_bytes"] / (1024 * 1024)
+    print(f"   {label}: scanned {stats['scanned']}, orphaned {stats['orphans']} ({size_mb:.1f} MB)")
+    if not dry_run:
+        print(f"   {label}: deleted {stats['deleted']}, failed {stats['failed']}, kept in use {stats['kept']}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Delete uploaded images no record references")
+    parser.add_argument("--dry-run", action="store_true", help="Report orphans without deleting anything")
+    parser.add_argument("--min-age-hours", type=float, default=24,
+                        help="Skip files newer than this, they may belong to uploads in progress (default: 24)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Deletions per batch request (default: 50)")
+    parser.add_argument("--workers", type=int, default=4, help="Batches deleted concurrently (default: 4)")
+    parser.add_argument("--max-rate", type=float, default=0,
+                        help="Maximum deletions per second, 0 for unlimited (default: 0)")
+    parser.add_argument("--show", type=int, default=50, help="Orphans listed in a dry run (default: 50)")
+    parser.add_argument("--local-only", action="store_true", help="Only scan local uploads, not the configured remote storage")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    print("🚀 Collecting orphaned images...")
+    success = run_gc(parse_args())
+
+    if success:
+        print("\n🎉 Image garbage collection completed!")
+    else:
+        print("\n💥 Image garbage collection failed!")
+        exit(1)
@@ -22,6 +22,10 @@ CREATE TABLE IF NOT EXISTS popular_products (
     features JSONB NULL,         -- Stored as JSONB array
     rating DECIMAL(2,1) NOT NULL CHECK (rating >= 1 AND rating <= 5),
     image_url VARCHAR(255) NULL,
+    image_variants JSONB NULL,   -- Responsive sizes: {width, height, src, sources[]}
+    image_placeholder JSONB NULL,   -- Blurred preview: {width, height, lqip}
+    image_colors INTEGER[] NULL,    -- Dominant colour first, then the palette, as 0xRRGGBB
+    image_state VARCHAR(10) NOT NULL DEFAULT 'ready' CHECK (image_state IN ('pending', 'ready', 'failed')),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -32,6 +36,10 @@ CREATE TABLE IF NOT EXISTS new_arrivals (
     name VARCHAR(100) NOT NULL,
     description TEXT NOT NULL,
     image_url VARCHAR(255) NULL,
+    image_variants JSONB NULL,   -- Responsive sizes: {width, height, src, sources[]}
+    image_placeholder JSONB NULL,   -- Blurred preview: {width, height, lqip}
+    image_colors INTEGER[] NULL,    -- Dominant colour first, then the palette, as 0xRRGGBB
+    image_state VARCHAR(10) NOT NULL DEFAULT 'ready' CHECK (image_state IN ('pending', 'ready', 'failed')),
     release_date DATE NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -46,6 +54,9 @@ CREATE TABLE IF NOT EXISTS news_events (
     date DATE NOT NULL,
     end_date DATE NULL,
     highlighted BOOLEAN DEFAULT FALSE,
+    publish_at TIMESTAMPTZ NULL,
+    unpublish_at TIMESTAMPTZ NULL,
+    published BOOLEAN NOT NULL DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -73,9 +84,11 @@ CREATE TABLE IF NOT EXISTS static_contact_info (
 CREATE TABLE IF NOT EXISTS products (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
+    slug VARCHAR(255) NULL,          -- URL name, e.g. "royal-silk-emulsion"
     category VARCHAR(100) NOT NULL,
     description TEXT NOT NULL,
     features JSONB NULL,         -- Stored as JSONB array of features
+    coverage_rate NUMERIC(6, 2) NULL CHECK (coverage_rate > 0),  -- m² per litre (or kg) for one coat
     price1L VARCHAR(50),
     price4L VARCHAR(50),
     price5L VARCHAR(50),         -- Price for 5 Liters
@@ -90,6 +103,10 @@ CREATE TABLE IF NOT EXISTS products (
     price50g VARCHAR(50),        -- Price for 50g
     stock VARCHAR(50) DEFAULT 'In Stock',
     image_url VARCHAR(255),
+    image_variants JSONB NULL,   -- Responsive sizes: {width, height, src, sources[]}
+    image_placeholder JSONB NULL,   -- Blurred preview: {width, height, lqip}
+    image_colors INTEGER[] NULL,    -- Dominant colour first, then the palette, as 0xRRGGBB
+    image_state VARCHAR(10) NOT NULL DEFAULT 'ready' CHECK (image_state IN ('pending', 'ready', 'failed')),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -103,6 +120,123 @@ CREATE TABLE IF NOT EXISTS revoked_tokens (
     revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Content-addressed image store: one row per distinct image, see app/utils/image_store.py
+CREATE TABLE IF NOT EXISTS image_blobs (
+    hash CHAR(64) PRIMARY KEY,          -- SHA-256 of the normalized image
+    url VARCHAR(255) NOT NULL UNIQUE,   -- Local /static/uploads/cas/... path or Cloudinary URL
+    variants JSONB NULL,
+    byte_size INTEGER NOT NULL DEFAULT 0,
+    ref_count INTEGER NOT NULL DEFAULT 0,   -- Records using this image
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Background image jobs (Cloudinary uploads/deletes), see app/utils/jobs.py
+CREATE TABLE IF NOT EXISTS image_jobs (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,          -- upload/delete
+    payload JSONB NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'running', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMP NULL,        -- Lease of the worker running the job
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Shade card catalog: named colours sold on top of base paints, see app/utils/shade_index.py
+CREATE TABLE IF NOT EXISTS shades (
+    id SERIAL PRIMARY KEY,
+    code VARCHAR(50) NOT NULL UNIQUE,   -- Code printed on the shade card, e.g. "N-1234"
+    name VARCHAR(255) NOT NULL,
+    hex CHAR(7) NOT NULL CHECK (hex ~ '^#[0-9a-f]{6}$'),
+    collection VARCHAR(100) NULL,       -- Shade card / colour family
+    product_id INTEGER NULL REFERENCES products(id) ON DELETE SET NULL,  -- Base paint
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Numeric product prices, one row per pack size, see app/utils/prices.py.
+-- Kept in sync with the priceXX columns (the display text) by the admin API.
+CREATE TABLE IF NOT EXISTS product_prices (
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    size INTEGER NOT NULL,              -- e.g. 500 for 500ml, 1 for 1L
+    unit VARCHAR(2) NOT NULL CHECK (unit IN ('ml', 'L', 'g', 'kg')),
+    amount NUMERIC(12, 2) NULL CHECK (amount > 0),  -- NULL for labels like "On request"
+    label VARCHAR(50) NOT NULL,         -- Price as entered, e.g. "Rs. 8,500"
+    PRIMARY KEY (product_id, size, unit)
+);
+
+-- Precomputed "customers also consider" lists, see app/utils/related_products.py
+CREATE TABLE IF NOT EXISTS product_related (
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    related_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    rank SMALLINT NOT NULL,             -- 1 = most similar
+    score REAL NOT NULL,                -- TF-IDF cosine similarity
+    PRIMARY KEY (product_id, rank)
+);
+
+-- Change log for delta sync: the last write to each catalogue row, kept by
+-- the log_sync_change triggers below, see app/utils/sync.py
+CREATE TABLE IF NOT EXISTS sync_changes (
+    table_name VARCHAR(50) NOT NULL,
+    record_id INTEGER NOT NULL,
+    txid BIGINT NOT NULL,               -- txid_current() of the writing transaction
+    deleted BOOLEAN NOT NULL DEFAULT FALSE,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, record_id)
+);
+
+-- Columns added after the initial release (no-ops on fresh databases)
+ALTER TABLE popular_products ADD COLUMN IF NOT EXISTS image_variants JSONB NULL;
+ALTER TABLE new_arrivals ADD COLUMN IF NOT EXISTS image_variants JSONB NULL;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS image_variants JSONB NULL;
+ALTER TABLE popular_products ADD COLUMN IF NOT EXISTS image_state VARCHAR(10) NOT NULL DEFAULT 'ready';
+ALTER TABLE new_arrivals ADD COLUMN IF NOT EXISTS image_state VARCHAR(10) NOT NULL DEFAULT 'ready';
+ALTER TABLE products ADD COLUMN IF NOT EXISTS image_state VARCHAR(10) NOT NULL DEFAULT 'ready';
+ALTER TABLE popular_products ADD COLUMN IF NOT EXISTS image_placeholder JSONB NULL;
+ALTER TABLE new_arrivals ADD COLUMN IF NOT EXISTS image_placeholder JSONB NULL;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS image_placeholder JSONB NULL;
+ALTER TABLE popular_products ADD COLUMN IF NOT EXISTS image_colors INTEGER[] NULL;
+ALTER TABLE new_arrivals ADD COLUMN IF NOT EXISTS image_colors INTEGER[] NULL;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS image_colors INTEGER[] NULL;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS coverage_rate NUMERIC(6, 2) NULL CHECK (coverage_rate > 0);
+ALTER TABLE products ADD COLUMN IF NOT EXISTS slug VARCHAR(255) NULL;
+ALTER TABLE news_events ADD COLUMN IF NOT EXISTS publish_at TIMESTAMPTZ NULL;
+ALTER TABLE news_events ADD COLUMN IF NOT EXISTS unpublish_at TIMESTAMPTZ NULL;
+ALTER TABLE news_events ADD COLUMN IF NOT EXISTS published BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE product_prices ALTER COLUMN amount DROP NOT NULL;
+
+-- Backfill product_prices from the priceXX columns (skips prices already done);
+-- labels without a positive number are kept with a NULL amount
+INSERT INTO product_prices (product_id, size, unit, amount, label)
+SELECT id, size, unit, CASE WHEN amount > 0 THEN amount END, label FROM (
+    SELECT p.id, c.size, c.unit, TRIM(c.label) AS label,
+           REPLACE(SUBSTRING(c.label FROM '[0-9][0-9,]*[.]?[0-9]*'), ',', '')::NUMERIC(12, 2) AS amount
+    FROM products p
+    CROSS JOIN LATERAL (VALUES
+        (200, 'ml', p.price200ml), (500, 'ml', p.price500ml),
+        (1, 'L', p.price1L), (4, 'L', p.price4L), (5, 'L', p.price5L), (10, 'L', p.price10L), (20, 'L', p.price20L),
+        (50, 'g', p.price50g), (100, 'g', p.price100g), (200, 'g', p.price200g), (500, 'g', p.price500g),
+        (1, 'kg', p.price1kg)
+    ) AS c(size, unit, label)
+    WHERE TRIM(c.label) <> ''
+) parsed
+ON CONFLICT (product_id, size, unit) DO NOTHING;
+
+-- Backfill product slugs from names; repeated names get the ID appended
+UPDATE products p SET slug = s.slug
+FROM (
+    SELECT id, CASE WHEN ROW_NUMBER() OVER (PARTITION BY base ORDER BY id) = 1 THEN base ELSE base || '-' || id END AS slug
+    FROM (
+        SELECT id, COALESCE(NULLIF(TRIM(BOTH '-' FROM LOWER(REGEXP_REPLACE(name, '[^a-zA-Z0-9]+', '-', 'g'))), ''), 'product') AS base
+        FROM products
+        WHERE slug IS NULL
+    ) names
+) s
+WHERE p.id = s.id;
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_popular_products_type ON popular_products(type);
 CREATE INDEX IF NOT EXISTS idx_popular_products_rating ON popular_products(rating);
@@ -112,8 +246,15 @@ CREATE INDEX IF NOT EXISTS idx_news_events_date ON news_events(date);
 CREATE INDEX IF NOT EXISTS idx_news_events_highlighted ON news_events(highlighted);
 CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
 CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_slug ON products(slug);
 CREATE INDEX IF NOT EXISTS idx_revoked_tokens_token ON revoked_tokens(token);
 CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_shades_collection ON shades(collection);
+CREATE INDEX IF NOT EXISTS idx_product_related_related_id ON product_related(related_id);
+CREATE INDEX IF NOT EXISTS idx_product_prices_size_amount ON product_prices(size, unit, amount, product_id);
+CREATE INDEX IF NOT EXISTS idx_image_jobs_due ON image_jobs(run_after, id) WHERE status IN ('pending', 'running');
+CREATE INDEX IF NOT EXISTS idx_sync_changes_txid ON sync_changes(txid);
+CREATE INDEX IF NOT EXISTS idx_sync_changes_deleted_at ON sync_changes(changed_at) WHERE deleted;
 
 -- Create triggers to automatically update updated_at columns
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -130,3 +271,51 @@ CREATE TRIGGER update_new_arrivals_updated_at BEFORE UPDATE ON new_arrivals FOR
 CREATE TRIGGER update_news_events_updated_at BEFORE UPDATE ON news_events FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_static_contact_info_updated_at BEFORE UPDATE ON static_contact_info FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 CREATE TRIGGER update_products_updated_at BEFORE UPDATE ON products FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_shades_updated_at BEFORE UPDATE ON shades FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Record each write to a catalogue row for delta sync
+CREATE OR REPLACE FUNCTION log_sync_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_changes (table_name, record_id, txid, deleted)
+    VALUES (TG_TABLE_NAME, CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END, txid_current(), TG_OP = 'DELETE')
+    ON CONFLICT (table_name, record_id) DO UPDATE
+    SET txid = EXCLUDED.txid, deleted = EXCLUDED.deleted, changed_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER log_products_sync_change AFTER INSERT OR UPDATE OR DELETE ON products FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+CREATE TRIGGER log_popular_products_sync_change AFTER INSERT OR UPDATE OR DELETE ON popular_products FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+CREATE TRIGGER log_new_arrivals_sync_change AFTER INSERT OR UPDATE OR DELETE ON new_arrivals FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+CREATE TRIGGER log_news_events_sync_change AFTER INSERT OR UPDATE OR DELETE ON news_events FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+
+-- Announce committed catalogue changes to the /api/events listeners, see app/utils/events.py
+CREATE OR REPLACE FUNCTION notify_catalog_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('catalog_changes', json_build_object(
+        'table', TG_TABLE_NAME,
+        'op', LOWER(TG_OP),
+        'id', CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END
+    )::text);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER notify_products_change AFTER INSERT OR UPDATE OR DELETE ON products FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+CREATE TRIGGER notify_popular_products_change AFTER INSERT OR UPDATE OR DELETE ON popular_products FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+CREATE TRIGGER notify_new_arrivals_change AFTER INSERT OR UPDATE OR DELETE ON new_arrivals FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+CREATE TRIGGER notify_news_events_change AFTER INSERT OR UPDATE OR DELETE ON news_events FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+
+-- Keep news_events.published in line with publish_at/unpublish_at, see app/utils/news_schedule.py
+CREATE OR REPLACE FUNCTION set_news_published()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.published = (NEW.publish_at IS NULL OR NEW.publish_at <= now())
+        AND (NEW.unpublish_at IS NULL OR NEW.unpublish_at > now());
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER set_news_events_published BEFORE INSERT OR UPDATE ON news_events FOR EACH ROW EXECUTE FUNCTION set_news_published();